@@ -0,0 +1,124 @@
+"""Gemini の判断キャッシュ
+
+同じ局面（座席・ハンド・オークション履歴・見えているダミー・トリック履歴・バルネラビリティ）で
+判断のモード（bid_mode / play_mode）も同じなら、リモートのモデルに問い合わせず前回の判断を返す。
+- メモリ上の LRU（件数上限つき）
+- 任意で SQLite の永続層（再起動後も残る）。`BRIDGE_AI_CACHE_DB` で既定のパスを指定できる
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def _call_code(call: Dict) -> str:
+    if call['type'] == 'bid':
+        return f"{call['level']}{call['suit']}"
+    return {'pass': 'P', 'double': 'X', 'redouble': 'XX'}[call['type']]
+
+
+def decision_key(game, player: str, kind: str) -> str:
+    """判断に効く状態だけを正規化して並べたキー（SHA-1 の16進）"""
+    state: Dict[str, Any] = {
+        'kind': kind,
+        'seat': player,
+        'hand': game.players[player].mask,
+        'dealer': game.dealer,
+        'vul': [game.vulnerable['NS'], game.vulnerable['EW']],
+        'auction': [[call['player'], _call_code(call)] for call in game.auction_history],
+        'mode': game.bid_mode if kind == 'auction' else game.play_mode,
+    }
+    if kind == 'play':
+        state['contract'] = [game.contract_level, game.trump_suit, game.doubled, game.declarer]
+        if game.dummy_revealed and game.dummy != player:
+            state['dummy'] = game.players[game.dummy].mask
+        state['tricks'] = [[[play['player'], play['card'].index] for play in trick['cards']]
+                           for trick in game.tricks]
+        state['trick'] = [[play['player'], play['card'].index] for play in game.current_trick]
+    encoded = json.dumps(state, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+class DecisionCache:
+    """LRU + 任意の SQLite 永続層。値は JSON にできるもの"""
+
+    def __init__(self, max_size: int = 4096, db_path: Optional[str] = None):
+        self.max_size = max_size
+        self.db_path = db_path
+        self._entries: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS decisions (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._db.commit()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM decisions WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO decisions (key, value) VALUES (?, ?)",
+                                 (key, json.dumps(value, ensure_ascii=False)))
+                self._db.commit()
+
+    def _remember(self, key: str, value: Any):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM decisions")
+                self._db.commit()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'persistent': self._db is not None,
+        }
+
+
+_default_cache: Optional[DecisionCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache() -> DecisionCache:
+    """プロセス内で共有する既定のキャッシュ"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = DecisionCache(db_path=os.getenv('BRIDGE_AI_CACHE_DB') or None)
+        return _default_cache
@@ -0,0 +1,192 @@
+"""インクリメンタルなオークションの状態機械
+
+`AuctionState` はコールを1つ適用するたびに、最後のビッド・そのビッダー・ダブル状態・連続パス数・
+サイドごと／ストレインごとに最初にそのストレインをビッドした座席（ディクレアラー候補）を更新する。
+履歴を走査し直さないので、合法なコールの判定・列挙・適用・取り消しはどれも O(1)。
+ビッディングの探索やシミュレーションでは `copy` と `undo` で局面を行き来できる。
+
+コールは 0..37 の整数コードで表す:
+0 = パス、1 = ダブル、2 = リダブル、3 + (レベル - 1) * 5 + ストレイン = ビッド
+（ストレインは ♣=0, ♦=1, ♥=2, ♠=3, NT=4。コードの大小がビッドの高低と一致する）
+座席は solver と同じ South=0, West=1, North=2, East=3 で、サイドは座席 % 2（NS=0, EW=1）。
+"""
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from solver import SEATS, SEAT_INDEX
+
+STRAINS = ['♣', '♦', '♥', '♠', 'NT']
+STRAIN_INDEX = {strain: i for i, strain in enumerate(STRAINS)}
+
+PASS = 0
+DOUBLE = 1
+REDOUBLE = 2
+FIRST_BID = 3
+NUM_CALLS = FIRST_BID + 35
+
+
+def bid_code(level: int, strain) -> int:
+    """ビッドのコード（strain は '♠' などの文字列か 0..4）"""
+    if isinstance(strain, str):
+        strain = STRAIN_INDEX[strain]
+    return FIRST_BID + (level - 1) * 5 + strain
+
+
+def call_code(call: Dict) -> int:
+    """{'type': ..., 'level': ..., 'suit': ...} 形式のコールをコードにする"""
+    kind = call['type']
+    if kind == 'bid':
+        return bid_code(call['level'], call['suit'])
+    return {'pass': PASS, 'double': DOUBLE, 'redouble': REDOUBLE}[kind]
+
+
+def _call_dict(code: int) -> Dict:
+    if code == PASS:
+        return {'type': 'pass'}
+    if code == DOUBLE:
+        return {'type': 'double'}
+    if code == REDOUBLE:
+        return {'type': 'redouble'}
+    level, strain = divmod(code - FIRST_BID, 5)
+    return {'type': 'bid', 'level': level + 1, 'suit': STRAINS[strain]}
+
+
+# コード -> コールの dict（共有なので書き換えないこと。渡すときは dict(...) でコピーする）
+CALLS: Tuple[Dict, ...] = tuple(_call_dict(code) for code in range(NUM_CALLS))
+
+
+def code_level(code: int) -> int:
+    return (code - FIRST_BID) // 5 + 1
+
+
+def code_strain(code: int) -> int:
+    return (code - FIRST_BID) % 5
+
+
+def _legal_sets(last_bid: int) -> Tuple[FrozenSet[int], FrozenSet[int], FrozenSet[int]]:
+    base = frozenset((PASS,) + tuple(range(max(last_bid + 1, FIRST_BID), NUM_CALLS)))
+    return base, base | {DOUBLE}, base | {REDOUBLE}
+
+
+# 合法なコードの集合の表: [最後のビッドのコード + 1（ビッドなしは 0）][0: パスとビッドのみ, 1: +ダブル, 2: +リダブル]
+_LEGAL_TABLE = [_legal_sets(last_bid) for last_bid in range(-1, NUM_CALLS)]
+
+
+class AuctionState:
+    """オークションの状態（インクリメンタル更新・O(1) の合法手判定・undo・コール数に比例する copy）"""
+
+    __slots__ = ('dealer', 'turn', 'last_bid', 'last_bidder', 'doubled', 'passes', 'calls',
+                 'first_bidder', '_undo')
+
+    def __init__(self, dealer='South'):
+        self.dealer = SEAT_INDEX[dealer] if isinstance(dealer, str) else dealer
+        self.turn = self.dealer
+        self.last_bid = -1        # 最後のビッドのコード（なければ -1）
+        self.last_bidder = -1
+        self.doubled = 0          # 0: なし, 1: ダブル, 2: リダブル
+        self.passes = 0           # 連続パス数
+        self.calls: List[int] = []
+        # first_bidder[サイド][ストレイン] = そのサイドで最初にそのストレインをビッドした座席（-1 は未ビッド）
+        self.first_bidder = [[-1] * 5, [-1] * 5]
+        self._undo: List[tuple] = []
+
+    def copy(self) -> 'AuctionState':
+        """独立したコピー。コールの列と取り消し用の記録を写すので O(コール数)（O(1) ではない）"""
+        other = AuctionState.__new__(AuctionState)
+        other.dealer = self.dealer
+        other.turn = self.turn
+        other.last_bid = self.last_bid
+        other.last_bidder = self.last_bidder
+        other.doubled = self.doubled
+        other.passes = self.passes
+        other.calls = list(self.calls)
+        other.first_bidder = [list(self.first_bidder[0]), list(self.first_bidder[1])]
+        other._undo = list(self._undo)
+        return other
+
+    # --- 状態の問い合わせ ---
+
+    @property
+    def finished(self) -> bool:
+        """3 連続パスでビッドがある、または 4 人ともパス"""
+        return self.passes >= 3 and len(self.calls) >= 4
+
+    @property
+    def passed_out(self) -> bool:
+        return self.finished and self.last_bid < 0
+
+    @property
+    def can_double(self) -> bool:
+        # 最後のビッドが相手のもので、まだダブルされていない（間のパスは構わない）
+        return self.last_bid >= 0 and self.doubled == 0 and (self.last_bidder - self.turn) % 2 == 1
+
+    @property
+    def can_redouble(self) -> bool:
+        # 自分たちのビッドが相手にダブルされている
+        return self.doubled == 1 and (self.last_bidder - self.turn) % 2 == 0
+
+    def legal_calls(self) -> FrozenSet[int]:
+        """今の手番で合法なコードの集合（事前計算した表を引くだけ）"""
+        if self.finished:
+            return frozenset()
+        return _LEGAL_TABLE[self.last_bid + 1][2 if self.can_redouble else 1 if self.can_double else 0]
+
+    def is_legal(self, code: int) -> bool:
+        return code in self.legal_calls()
+
+    def declarer(self) -> int:
+        """最後のビッドのストレインを、そのサイドで最初にビッドした座席（ビッドがなければ -1）"""
+        if self.last_bid < 0:
+            return -1
+        return self.first_bidder[self.last_bidder % 2][code_strain(self.last_bid)]
+
+    def contract(self) -> Optional[Tuple[int, str, int, int]]:
+        """(レベル, ストレイン, ダブル状態, ディクレアラーの座席)。ビッドがなければ None"""
+        if self.last_bid < 0:
+            return None
+        return code_level(self.last_bid), STRAINS[code_strain(self.last_bid)], self.doubled, self.declarer()
+
+    # --- 適用と取り消し ---
+
+    def apply(self, code: int):
+        """コールを適用する（不正なコールは ValueError）"""
+        if code not in self.legal_calls():
+            raise ValueError(f"illegal call {CALLS[code] if 0 <= code < NUM_CALLS else code} "
+                             f"by {SEATS[self.turn]}")
+        first = None
+        saved = (self.last_bid, self.last_bidder, self.doubled, self.passes)
+        if code == PASS:
+            self.passes += 1
+        else:
+            self.passes = 0
+            if code == DOUBLE:
+                self.doubled = 1
+            elif code == REDOUBLE:
+                self.doubled = 2
+            else:
+                self.last_bid = code
+                self.last_bidder = self.turn
+                self.doubled = 0
+                side, strain = self.turn % 2, code_strain(code)
+                if self.first_bidder[side][strain] < 0:
+                    self.first_bidder[side][strain] = self.turn
+                    first = (side, strain)
+        self._undo.append(saved + (first,))
+        self.calls.append(code)
+        self.turn = (self.turn + 1) % 4
+
+    def undo(self) -> int:
+        """最後のコールを取り消し、そのコードを返す"""
+        code = self.calls.pop()
+        self.last_bid, self.last_bidder, self.doubled, self.passes, first = self._undo.pop()
+        if first is not None:
+            self.first_bidder[first[0]][first[1]] = -1
+        self.turn = (self.turn - 1) % 4
+        return code
+
+    @classmethod
+    def from_history(cls, dealer, history) -> 'AuctionState':
+        """{'type': ...} 形式のコールの列から作る"""
+        state = cls(dealer)
+        for call in history:
+            state.apply(call_code(call))
+        return state
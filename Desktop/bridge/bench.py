@@ -0,0 +1,292 @@
+"""ゲームエンジンのベンチマーク（マイクロとマクロ）
+
+ホットパス（配札・合法手・トリック判定・スコア・オークション）と、AI をルールベース／ヒューリスティックに
+差し替えたヘッドレスの1ボード全体を計測し、JSON に書き出す。ベースラインの JSON と比べて、
+閾値より遅くなったベンチマークがあれば終了コード 1 で終わる（CI で回帰を止める用）。
+比べるのは既定で最小値（他のプロセスの影響を受けにくい）、`--metric median` で中央値。
+
+- 状態を変える操作（complete_trick, make_auction_call）は、事前に `BridgeGame.fork` したゲームを
+  人数分用意して、その操作だけを計る
+- 1回の計測は `number` 回の呼び出しで、それを `repeat` 回くり返した1回あたりの中央値と最小値を記録する
+- ダブルダミー: `dd_opening_lead` は空の TT から既定の時間制限（`dd_time_limit`）で選ぶ最初のリード
+  （解けなければ並べ替えの先頭で、制限で頭打ちになる）、`dd_solve_trick5` は4トリック後の局面の完全な解
+
+    python bench.py --out bench.json
+    python bench.py --out bench.json --baseline baseline.json --threshold 0.2
+    python bench.py --save-baseline baseline.json --filter deal
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from auction import CALLS
+from game import BridgeGame
+from simulate import heuristic_card_play, play_board, rule_auction_call
+from solver import DoubleDummySolver, SEAT_INDEX, hands_from_game, trump_code
+
+# 1回の計測: 前準備（計時しない）を受け取り、number 回の呼び出しを実行する関数を返す
+Runner = Callable[[int], Callable[[], None]]
+
+
+class Benchmark(NamedTuple):
+    name: str
+    make: Runner
+    number: int   # 1回の計測での呼び出し回数
+
+
+def _auction_game(seed: int = 1) -> BridgeGame:
+    game = BridgeGame(use_gemini=False, seed=seed)
+    game.determine_partnerships_and_dealer()
+    game.deal_cards()
+    game.start_auction()
+    return game
+
+
+def _play_game(seed: int = 1, cards_in_trick: int = 0) -> BridgeGame:
+    """ルールでオークションを終え、1トリック目に cards_in_trick 枚出した局面（パスアウトならシードを変える）"""
+    while True:
+        game = _auction_game(seed)
+        while game.game_phase == 'auction':
+            game.make_auction_call(rule_auction_call(game, game.current_bidder))
+        if game.game_phase == 'play':
+            break
+        seed += 1
+    for _ in range(cards_in_trick):
+        player = game.get_current_player()
+        game.play_card(player, heuristic_card_play(game, player))
+    return game
+
+
+def _bench_create_deck(number: int):
+    game = BridgeGame(use_gemini=False, seed=1)
+
+    def run():
+        for _ in range(number):
+            game.create_deck()
+    return run
+
+
+def _bench_deal_cards(number: int):
+    game = BridgeGame(use_gemini=False, seed=1)
+    game.determine_partnerships_and_dealer()
+
+    def run():
+        for _ in range(number):
+            game.deal_cards()
+    return run
+
+
+def _bench_get_valid_cards(number: int):
+    game = _play_game(cards_in_trick=1)
+    player = game.get_current_player()
+
+    def run():
+        for _ in range(number):
+            game.get_valid_cards(player)
+    return run
+
+
+def _bench_determine_trick_winner(number: int):
+    game = _play_game(cards_in_trick=4)
+
+    def run():
+        for _ in range(number):
+            game.determine_trick_winner()
+    return run
+
+
+def _bench_complete_trick(number: int):
+    base = _play_game(cards_in_trick=4)
+    games = [base.fork() for _ in range(number)]
+
+    def run():
+        for game in games:
+            game.complete_trick()
+    return run
+
+
+def _bench_calculate_score(number: int):
+    game = _play_game()
+    game.tricks_won = {'NS': 9, 'EW': 4}
+
+    def run():
+        for _ in range(number):
+            game.calculate_score()
+    return run
+
+
+def _bench_is_valid_bid(number: int):
+    game = _auction_game()
+    game.make_auction_call({'type': 'bid', 'level': 1, 'suit': '♥'})
+    calls = [dict(call) for call in CALLS]
+
+    def run():
+        for _ in range(number // len(calls)):
+            for call in calls:
+                game.is_valid_bid(call)
+    return run
+
+
+def _bench_make_auction_call(number: int):
+    # 1回 = 決まったオークション（1♥ パス 2♥ パス パス パス）を最後まで
+    sequence = [{'type': 'bid', 'level': 1, 'suit': '♥'}, {'type': 'pass'},
+                {'type': 'bid', 'level': 2, 'suit': '♥'}, {'type': 'pass'}, {'type': 'pass'}, {'type': 'pass'}]
+    base = _auction_game()
+    games = [base.fork() for _ in range(number)]
+
+    def run():
+        for game in games:
+            for call in sequence:
+                game.make_auction_call(dict(call))
+    return run
+
+
+def _bench_rule_auction(number: int):
+    games = [_auction_game(seed) for seed in range(1, number + 1)]
+
+    def run():
+        for game in games:
+            while game.game_phase == 'auction':
+                game.make_auction_call(rule_auction_call(game, game.current_bidder))
+    return run
+
+
+def _bench_dd_opening_lead(number: int):
+    base = _play_game()
+    games = [base.fork() for _ in range(number)]
+
+    def run():
+        for game in games:
+            game.get_dd_card_play(game.get_current_player())
+    return run
+
+
+def _bench_dd_solve_trick5(number: int):
+    game = _play_game()
+    while len(game.tricks) < 4:
+        player = game.get_current_player()
+        game.play_card(player, heuristic_card_play(game, player))
+        if len(game.current_trick) == 4:
+            game.complete_trick()
+    hands = hands_from_game(game.players)
+    leader = SEAT_INDEX[game.trick_leader]
+    trump = trump_code(game.trump_suit)
+
+    def run():
+        for _ in range(number):
+            DoubleDummySolver(trump).solve(hands, leader)
+    return run
+
+
+def _bench_full_round(number: int):
+    def run():
+        for board in range(1, number + 1):
+            play_board(board, 0, rule_auction_call, heuristic_card_play)
+    return run
+
+
+BENCHMARKS = [
+    Benchmark('create_deck', _bench_create_deck, 2000),
+    Benchmark('deal_cards', _bench_deal_cards, 2000),
+    Benchmark('get_valid_cards', _bench_get_valid_cards, 20000),
+    Benchmark('determine_trick_winner', _bench_determine_trick_winner, 20000),
+    Benchmark('complete_trick', _bench_complete_trick, 2000),
+    Benchmark('calculate_score', _bench_calculate_score, 20000),
+    Benchmark('is_valid_bid', _bench_is_valid_bid, 38 * 500),
+    Benchmark('make_auction_call', _bench_make_auction_call, 1000),
+    Benchmark('rule_auction', _bench_rule_auction, 50),
+    Benchmark('full_round', _bench_full_round, 20),
+    Benchmark('dd_opening_lead', _bench_dd_opening_lead, 2),
+    Benchmark('dd_solve_trick5', _bench_dd_solve_trick5, 2),
+]
+
+
+def measure(benchmark: Benchmark, repeat: int = 5, scale: float = 1.0) -> Dict[str, float]:
+    """1回あたりの秒数の中央値と最小値（scale で呼び出し回数を増減する）"""
+    number = max(1, int(benchmark.number * scale))
+    times = []
+    for _ in range(repeat):
+        run = benchmark.make(number)
+        started = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - started) / number)
+    return {'median': statistics.median(times), 'min': min(times), 'number': number, 'repeat': repeat}
+
+
+def run_benchmarks(names: Optional[List[str]] = None, repeat: int = 5, scale: float = 1.0) -> Dict:
+    results = {}
+    for benchmark in BENCHMARKS:
+        if names and not any(name in benchmark.name for name in names):
+            continue
+        results[benchmark.name] = measure(benchmark, repeat, scale)
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float, metric: str = 'min') -> List[Dict[str, object]]:
+    """両方にあるベンチマークの比（current / baseline）。threshold を超えて遅ければ regression"""
+    rows = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        ratio = result[metric] / base[metric] if base[metric] > 0 else float('inf')
+        rows.append({'name': name, 'baseline': base[metric], 'current': result[metric],
+                     'ratio': ratio, 'regression': ratio > 1.0 + threshold})
+    return rows
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (('s', 1.0), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks for the game engine hot paths')
+    parser.add_argument('--out', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='compare with this results JSON')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed slowdown before failing (0.2 = 20%%)')
+    parser.add_argument('--metric', choices=['min', 'median'], default='min',
+                        help='statistic to compare (min is the least sensitive to noise from other processes)')
+    parser.add_argument('--save-baseline', help='write results to this file as the new baseline')
+    parser.add_argument('--filter', action='append', default=[], help='only benchmarks containing this text')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply the calls per measurement')
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.filter, args.repeat, args.scale)
+    for name, result in current['results'].items():
+        print(f"{name:<24} median {_format_time(result['median']):>10}  min {_format_time(result['min']):>10}")
+    for path in filter(None, (args.out, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    rows = compare(current, baseline, args.threshold, args.metric)
+    for row in rows:
+        flag = 'REGRESSION' if row['regression'] else 'ok'
+        print(f"{row['name']:<24} {_format_time(row['baseline']):>10} -> {_format_time(row['current']):>10} "
+              f"({row['ratio']:.2f}x) {flag}")
+    regressions = [row['name'] for row in rows if row['regression']]
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
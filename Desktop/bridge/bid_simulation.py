@@ -0,0 +1,312 @@
+"""シミュレーションによるビッディング
+
+候補のコールごとに、見えないハンドをオークションと矛盾しないようにサンプルし（`DealSampler`）、
+各配置でそのコールの後のオークションをルールベースのエンジン（4人とも同じシステム）で最後まで進め、
+最終コントラクトのトリック数を見積もって、今のバルネラビリティでの期待スコアを比べる。
+
+- トリック数はサイドの HCP・トランプの枚数・ショートネスからの見積もり（`estimate_tricks`）。
+  13枚のダブルダミー探索は1配置で数秒かかるので、1秒以内に決めるためにこちらを使う
+- 締め切り（time_budget）までにロールアウトできた配置だけで比べる（全候補を同じ配置で比べる）
+- ロールアウトの相手はルールどおりにしか応じないので、候補はゲームレベルまでのビッドに限り、
+  ルールのコールとの差（配置ごとの対の差）の信頼下限が min_gain 点を超えるときだけ別のコールにする
+- 配置・トリックの見積もり・ロールアウトの結果は `RolloutCache` に残す。同じオークションの次の判断では
+  今のオークションと矛盾しない配置を使い回し、ロールアウトも以前の道筋に乗れば結果を再利用する
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ai_cache import decision_key
+from auction import CALLS, PASS, bid_code, call_code, code_level, code_strain
+from bidding import GAME_LEVEL, AuctionView, choose_call, seat_evaluation
+from sampler import DealSampler, hand_hcp, suit_lengths
+from scoring import score_batch
+from solver import SEATS
+
+NT = 4
+
+# ロールアウトの結果（最終コントラクト）: (レベル, ストレイン, ダブル状態, ディクレアラーのサイド)。パスアウトはレベル 0
+Outcome = Tuple[int, int, int, int]
+PASSED_OUT: Outcome = (0, 0, 0, 0)
+
+
+# --- トリック数の見積もり ---
+
+def estimate_tricks(deals: np.ndarray) -> np.ndarray:
+    """配置（L × 4 の座席順マスク）-> 各サイド・各ストレインでディクレアラー側が取るトリック数（L × 2 × 5）
+
+    NT は合計 HCP から（20HCP で約6トリック、26 で 9、33 で 11）、長いスートがあれば少し足す。
+    スーツは HCP からの値（20HCP で約7トリック）に、トランプの合計枚数（8枚フィットを基準）と、
+    トランプの短い方のハンドのショートネス（ラフの数はそのハンドのトランプの枚数まで）を足す。
+    係数はダブルダミーの結果と大まかに合わせたもの。
+    """
+    hcp = hand_hcp(deals).astype(np.float32)            # L × 4
+    lengths = suit_lengths(deals).astype(np.float32)     # L × 4 × 4
+    tricks = np.zeros((len(deals), 2, 5), dtype=np.float32)
+    for side in range(2):
+        a, b = side, side + 2
+        side_hcp = hcp[:, a] + hcp[:, b]
+        combined = lengths[:, a] + lengths[:, b]          # L × 4
+        tricks[:, side, NT] = 6.2 + (side_hcp - 20) * 0.4 + np.maximum(combined.max(axis=1) - 8, 0) * 0.4
+        base = 6.8 + (side_hcp - 20) * 0.33
+        for trump in range(4):
+            fit = combined[:, trump]
+            short_hand = np.where(lengths[:, a, trump] <= lengths[:, b, trump], a, b)
+            short = lengths[np.arange(len(deals)), short_hand]                   # L × 4
+            short_trumps = short[:, trump]
+            side_suits = np.delete(short, trump, axis=1)
+            ruffs = ((side_suits == 0) * 1.0 + (side_suits == 1) * 0.6 + (side_suits == 2) * 0.2).sum(axis=1)
+            ruffs = np.minimum(ruffs, short_trumps * 0.7)
+            fit_bonus = np.where(fit >= 8, (fit - 8) * 0.8, (fit - 8) * 1.2)
+            tricks[:, side, trump] = base + fit_bonus + ruffs
+    return np.clip(np.rint(tricks), 0, 13).astype(np.int8)
+
+
+# --- ロールアウト ---
+
+class _RolloutTable:
+    """ロールアウト用の軽いテーブル（`choose_call` が使う属性とメソッドだけを持つ）"""
+    __slots__ = ('players', 'auction_history', 'auction_state')
+
+    def __init__(self, masks, history: List[Dict], state):
+        self.players = dict(zip(SEATS, masks))  # evaluate_hand はマスクの int も受け付ける
+        self.auction_history = history
+        self.auction_state = state
+
+    def is_valid_bid(self, bid: Dict) -> bool:
+        return call_code(bid) in self.auction_state.legal_calls()
+
+    def can_double(self) -> bool:
+        return self.auction_state.can_double
+
+    def can_redouble(self) -> bool:
+        return self.auction_state.can_redouble
+
+
+def _outcome(state) -> Outcome:
+    contract = state.contract()
+    if contract is None:
+        return PASSED_OUT
+    return code_level(state.last_bid), code_strain(state.last_bid), state.doubled, contract[3] % 2
+
+
+def rollout(masks, state, history: List[Dict], memo: Dict, layout: int, max_calls: int = 60) -> Tuple[Outcome, bool]:
+    """state（と同じ内容の history）から全員がルールでコールしたときの最終コントラクトと、memo に当たったか
+
+    途中の局面もすべて memo（(配置の番号, コードの列) -> 結果）に入れるので、後の判断で実際のオークションが
+    この道筋に乗れば結果をそのまま使える。state と history は呼び出し後に元へ戻す。
+    """
+    key = (layout, tuple(state.calls))
+    if key in memo:
+        return memo[key], True
+    table = _RolloutTable(masks, history, state)
+    path = [key]
+    applied = 0
+    while not state.finished and applied < max_calls:
+        seat = SEATS[state.turn]
+        call = choose_call(table, seat)
+        state.apply(call_code(call))
+        history.append(dict(call, player=seat))
+        applied += 1
+        key = (layout, tuple(state.calls))
+        if key in memo:
+            break
+        path.append(key)
+    result = memo.get(key) or _outcome(state)
+    for step in path:
+        memo[step] = result
+    for _ in range(applied):
+        state.undo()
+        history.pop()
+    return result, False
+
+
+# --- 候補のコール ---
+
+def candidate_calls(game, player: str, rule_call: Dict, max_candidates: int = 6) -> List[int]:
+    """比べる候補のコード（ルールのコール、パス、関係するストレインの最低レベルのビッド）
+
+    ルールのコール以外のビッドはゲームレベルまで（スラムはルールに任せる）。ロールアウトの相手は
+    ダブルされても逃げないので、ダブル/リダブルはルールが選んだときだけ候補になる。
+    """
+    legal = game.auction_state.legal_calls()
+    view = AuctionView(game, player)
+    ev = seat_evaluation(game, player)
+    candidates = [call_code(rule_call), PASS]
+    strains = view.our_suits()
+    strains += [suit for suit, length in sorted(ev.lengths.items(), key=lambda item: -item[1]) if length >= 5]
+    if ev.balanced or view.our_bids:
+        strains.append('NT')
+    for strain in strains:
+        level = view.cheapest_level(strain)
+        if level <= GAME_LEVEL[strain] and bid_code(level, strain) in legal:
+            candidates.append(bid_code(level, strain))
+    unique = list(dict.fromkeys(candidates))
+    return unique[:max_candidates]
+
+
+# --- ロールアウトのキャッシュ ---
+
+class _Entry:
+    """1座席・1ディール分の配置のプールと、その見積もり・ロールアウトの結果"""
+    __slots__ = ('deals', 'tricks', 'memo')
+
+    def __init__(self):
+        self.deals = np.zeros((0, 4), dtype=np.uint64)
+        self.tricks = np.zeros((0, 2, 5), dtype=np.int8)
+        self.memo: Dict = {}
+
+
+class RolloutCache:
+    """(座席, ハンド, ディーラー, バルネラビリティ) ごとの配置のプール（LRU、件数上限つき）"""
+
+    def __init__(self, max_entries: int = 64, max_pool: int = 1024, max_memo: int = 200_000):
+        self.max_entries = max_entries
+        self.max_pool = max_pool
+        self.max_memo = max_memo
+        self._entries: 'OrderedDict[tuple, _Entry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.layout_hits = 0
+        self.rollout_hits = 0
+        self.rollouts = 0
+
+    def entry(self, game, player: str) -> _Entry:
+        key = (player, game.players[player].mask, game.dealer, game.vulnerable['NS'], game.vulnerable['EW'])
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(key)
+            return entry
+
+    def layouts(self, entry: _Entry, sampler: DealSampler, n: int) -> np.ndarray:
+        """今の局面と矛盾しないプールの配置の番号を n 個まで返す（足りなければサンプルして足す）"""
+        with self._lock:
+            reusable = np.flatnonzero(sampler.consistent(entry.deals))[:n] if len(entry.deals) else \
+                np.zeros(0, dtype=np.intp)
+            self.layout_hits += len(reusable)
+            missing = n - len(reusable)
+            if missing <= 0:
+                return reusable
+            fresh = sampler.sample(missing)
+            if len(entry.deals) + len(fresh) > self.max_pool:
+                # 使えない配置を捨てて詰める（番号が変わるのでロールアウトの結果も捨てる）
+                entry.deals = entry.deals[reusable]
+                entry.tricks = entry.tricks[reusable]
+                entry.memo = {}
+                reusable = np.arange(len(entry.deals))
+            start = len(entry.deals)
+            entry.deals = np.concatenate([entry.deals, fresh])
+            entry.tricks = np.concatenate([entry.tricks, estimate_tricks(fresh)])
+            if len(entry.memo) > self.max_memo:
+                entry.memo = {}
+            return np.concatenate([reusable, np.arange(start, len(entry.deals))])
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self._entries), 'layout_hits': self.layout_hits,
+                'rollouts': self.rollouts, 'rollout_hits': self.rollout_hits}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_default_cache: Optional[RolloutCache] = None
+_default_lock = threading.Lock()
+
+
+def get_rollout_cache() -> RolloutCache:
+    """プロセス内で共有するロールアウトのキャッシュ"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = RolloutCache()
+        return _default_cache
+
+
+# --- 本体 ---
+
+def choose_call_by_simulation(game, player: str, samples: int = 48, time_budget: Optional[float] = 1.0,
+                              min_gain: float = 30.0, confidence: float = 2.0, cache: Optional[RolloutCache] = None,
+                              seed: Optional[int] = None) -> Tuple[Dict, Dict]:
+    """player のコールと判断の統計（候補ごとの期待スコア・使った配置数など）を返す
+
+    候補に乗り換えるのは、ルールのコールとの対の差の平均から confidence × 標準誤差を引いた値が
+    min_gain を超えるときだけ（配置が少ないときの偶然の差で乗り換えない）。
+    """
+    started = time.perf_counter()
+    deadline = started + time_budget if time_budget is not None else None
+    cache = cache or get_rollout_cache()
+    rule_call = choose_call(game, player)
+    candidates = candidate_calls(game, player, rule_call)
+    stats: Dict = {'rule_call': rule_call, 'layouts': 0, 'rollouts': 0, 'cached_rollouts': 0,
+                   'elapsed': 0.0, 'expected': {}}
+    if len(candidates) == 1:
+        return rule_call, stats
+
+    if seed is None:
+        # 同じ局面なら同じサンプルになるように、見えている情報から決める
+        seed = int(decision_key(game, player, 'auction')[:8], 16)
+    sampler = DealSampler(game, player, seed=seed)
+    entry = cache.entry(game, player)
+    indices = cache.layouts(entry, sampler, samples)
+    deals, tricks = entry.deals, entry.tricks
+
+    side = SEATS.index(player) % 2
+    state = game.auction_state.copy()
+    history = list(game.auction_history)
+    outcomes: List[List[Outcome]] = [[] for _ in candidates]
+    used: List[int] = []
+    # 配置ごとに全候補をロールアウトする（締め切りで止めても全候補が同じ配置で比べられる）
+    for layout in indices.tolist():
+        if deadline is not None and time.perf_counter() > deadline and used:
+            break
+        masks = [int(mask) for mask in deals[layout]]
+        for i, code in enumerate(candidates):
+            state.apply(code)
+            history.append(dict(CALLS[code], player=player))
+            outcome, hit = rollout(masks, state, history, entry.memo, layout)
+            state.undo()
+            history.pop()
+            outcomes[i].append(outcome)
+            stats['rollouts'] += 1
+            stats['cached_rollouts'] += hit
+        used.append(layout)
+    cache.rollouts += stats['rollouts']
+    cache.rollout_hits += stats['cached_rollouts']
+
+    vulnerable = np.array([game.vulnerable['NS'], game.vulnerable['EW']])
+    used_index = np.array(used, dtype=np.intp)
+    per_layout = []
+    for i, code in enumerate(candidates):
+        level, strain, doubled, declarer_side = (np.array(column) for column in zip(*outcomes[i]))
+        scores = score_batch(level, strain, doubled, vulnerable[declarer_side],
+                             tricks[used_index, declarer_side, strain])
+        ours = np.where(declarer_side == side, scores, -scores)
+        per_layout.append(ours)
+    expected = [float(ours.mean()) for ours in per_layout]
+    stats['layouts'] = len(used)
+    stats['expected'] = {_label(code): round(value, 1) for code, value in zip(candidates, expected)}
+    stats['elapsed'] = time.perf_counter() - started
+
+    # 候補ごとのルールのコールに対する上積みの信頼下限
+    lower = [0.0]
+    for ours in per_layout[1:]:
+        gain = ours - per_layout[0]
+        stderr = float(gain.std(ddof=1)) / np.sqrt(len(gain)) if len(gain) > 1 else float('inf')
+        lower.append(float(gain.mean()) - confidence * stderr)
+    best = max(range(len(candidates)), key=lambda i: lower[i])
+    if best == 0 or lower[best] < min_gain:
+        return rule_call, stats
+    return dict(CALLS[candidates[best]]), stats
+
+
+def _label(code: int) -> str:
+    call = CALLS[code]
+    return f"{call['level']}{call['suit']}" if call['type'] == 'bid' else call['type']
@@ -0,0 +1,1012 @@
+"""ルールベースのビッディング・エンジン
+
+ハンド評価（HCP・配分点・ルーザーズトリックカウント）と、戦略ドキュメント（prompts.py）にある
+標準的なシステムで AI のコールを決める。Gemini を使わない既定の AI であり、
+Gemini が使えない・遅いときのフォールバックでもある。
+
+- オープニング: 1NT 15-17 / 2NT 20-21（バランス）、5枚メジャー、ベターマイナー、
+  強い 2♣（22HCP 以上）、弱い 2♦/2♥/2♠、7枚スートの 3 レベル・プリエンプト
+- 応答: レイズ（シンプル/リミット/ゲーム）、ジャコビー 2NT、1 レベルの新スート、2/1、NT 応答
+- 1NT/2NT の後: ステイマン、ジャコビー・トランスファー、クォンティタティブ 4NT
+- 競り合い: オーバーコール、1NT オーバーコール、テイクアウト・ダブルとその応答、リダブル
+- スラム: スートが決まった後の 4NT ブラックウッド（5♣=0/4, 5♦=1, 5♥=2, 5♠=3）
+- それ以外はパートナーの範囲の推定と合計点からストレインとレベルを決める
+
+どのコールも最後に `is_valid_bid` / `can_double` / `can_redouble` で確認し、
+合法でなければ同じストレインで上げられる範囲に直すかパスにする。
+"""
+from typing import Dict, List, Optional, Tuple
+
+from cards import ACES, KINGS, QUEENS, JACKS, SUIT_CODES, SUIT_MASKS, hcp as count_hcp
+
+MAJORS = ('♥', '♠')
+MINORS = ('♣', '♦')
+SUIT_ORDER = ['♣', '♦', '♥', '♠']  # ビッドの低い順
+STRAIN_ORDER = SUIT_ORDER + ['NT']
+PASS = {'type': 'pass'}
+DOUBLE = {'type': 'double'}
+REDOUBLE = {'type': 'redouble'}
+
+# ゲームに必要なレベル
+GAME_LEVEL = {'♣': 5, '♦': 5, '♥': 4, '♠': 4, 'NT': 3}
+
+
+def bid(level: int, suit: str) -> Dict:
+    return {'type': 'bid', 'level': level, 'suit': suit}
+
+
+def bid_rank(level: int, strain: str) -> int:
+    return level * 5 + STRAIN_ORDER.index(strain)
+
+
+# --- ハンド評価 ---
+
+class HandEvaluation:
+    """ハンドの評価値（HCP・スートの枚数・バランス・LTC など）"""
+    __slots__ = ('mask', 'hcp', 'lengths', 'balanced', 'ltc', 'aces', 'kings')
+
+    def __init__(self, mask: int):
+        self.mask = mask
+        self.hcp = count_hcp(mask)
+        self.lengths = {suit: (mask & SUIT_MASKS[SUIT_CODES[suit]]).bit_count() for suit in SUIT_ORDER}
+        shape = sorted(self.lengths.values())
+        # 4-3-3-3, 4-4-3-2, 5-3-3-2
+        self.balanced = shape[0] >= 2 and shape[1] >= 3
+        self.ltc = losing_trick_count(mask)
+        self.aces = (mask & ACES).bit_count()
+        self.kings = (mask & KINGS).bit_count()
+
+    def length(self, suit: str) -> int:
+        return self.lengths[suit]
+
+    def suit_mask(self, suit: str) -> int:
+        return self.mask & SUIT_MASKS[SUIT_CODES[suit]]
+
+    def suit_hcp(self, suit: str) -> int:
+        return count_hcp(self.suit_mask(suit))
+
+    def length_points(self) -> int:
+        """5枚目以降1枚につき1点"""
+        return sum(max(0, n - 4) for n in self.lengths.values())
+
+    def total_points(self) -> int:
+        return self.hcp + self.length_points()
+
+    def support_points(self, trump: str) -> int:
+        """トランプが決まったときのダミー・ポイント（ショートネスを加点）"""
+        if trump == 'NT' or self.lengths[trump] < 3:
+            return self.hcp
+        bonus = {0: 5, 1: 3, 2: 1} if self.lengths[trump] >= 4 else {0: 3, 1: 2, 2: 1}
+        return self.hcp + sum(bonus.get(n, 0) for s, n in self.lengths.items() if s != trump)
+
+    def longest_suit(self, exclude: Tuple[str, ...] = ()) -> Optional[str]:
+        """最長スート（同じ枚数なら上位スート）"""
+        candidates = [s for s in SUIT_ORDER if s not in exclude]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda s: (self.lengths[s], SUIT_ORDER.index(s)))
+
+    def stopper(self, suit: str) -> bool:
+        """A, Kx, Qxx, Jxxx 以上"""
+        cards = self.suit_mask(suit)
+        n = self.lengths[suit]
+        return bool(cards & ACES or (cards & KINGS and n >= 2) or (cards & QUEENS and n >= 3)
+                    or (cards & JACKS and n >= 4))
+
+    def good_suit(self, suit: str) -> bool:
+        """上位5枚のうち2枚以上のオナー（またはA/K を含む長いスート）"""
+        top = self.suit_mask(suit) & (ACES | KINGS | QUEENS | JACKS)
+        return top.bit_count() >= 2 or bool(self.suit_mask(suit) & (ACES | KINGS) and self.lengths[suit] >= 6)
+
+
+def losing_trick_count(mask: int) -> int:
+    """ルーザーズトリックカウント（各スート上位3枚までの A/K/Q の欠け）"""
+    losers = 0
+    for code in range(4):
+        cards = mask & SUIT_MASKS[code]
+        n = cards.bit_count()
+        top = (ACES | KINGS | QUEENS) & cards
+        if n == 0:
+            continue
+        if n == 1:
+            losers += 0 if cards & ACES else 1
+        elif n == 2:
+            losers += 2 - (bool(cards & ACES) + bool(cards & KINGS))
+        else:
+            losers += 3 - top.bit_count()
+    return losers
+
+
+def evaluate_hand(hand) -> HandEvaluation:
+    return HandEvaluation(hand if isinstance(hand, int) else hand.mask)
+
+
+def seat_evaluation(game, player: str) -> HandEvaluation:
+    """席のハンドの評価（BridgeGame なら配札時の特徴量に一度だけ作ったものを使う）"""
+    hand_features = getattr(game, 'hand_features', None)
+    if hand_features is None:  # ロールアウト用の軽いテーブル
+        return evaluate_hand(game.players[player])
+    return hand_features(player).evaluation
+
+
+# --- パートナーの推定 ---
+
+class PartnerProfile:
+    """パートナーのコールから推定した HCP の範囲と各スートの最低枚数"""
+    __slots__ = ('lo', 'hi', 'lengths', 'balanced')
+
+    def __init__(self):
+        self.lo, self.hi = 0, 37
+        self.lengths = {suit: 0 for suit in SUIT_ORDER}
+        self.balanced = False
+
+    def shows(self, lo: int, hi: int, suit: Optional[str] = None, length: int = 0):
+        self.lo, self.hi = max(self.lo, lo), max(min(self.hi, hi), max(self.lo, lo))
+        if suit in self.lengths:
+            self.lengths[suit] = max(self.lengths[suit], length)
+
+    @property
+    def mid(self) -> float:
+        """範囲の下寄りの代表値（広い範囲は下限の近くに偏る）"""
+        return self.lo + min(self.hi - self.lo, 10) * 0.4
+
+
+class AuctionView:
+    """ある座席から見たオークションの整理"""
+
+    def __init__(self, game, player: str):
+        self.game = game
+        self.player = player
+        seats = ['South', 'West', 'North', 'East']
+        i = seats.index(player)
+        self.partner = seats[(i + 2) % 4]
+        self.side = {player, self.partner}
+        self.history: List[Dict] = list(game.auction_history)
+        self.bids = [c for c in self.history if c['type'] == 'bid']
+        self.last_bid = self.bids[-1] if self.bids else None
+        self.mine = [c for c in self.history if c['player'] == player]
+        self.partners = [c for c in self.history if c['player'] == self.partner]
+        self.our_bids = [c for c in self.bids if c['player'] in self.side]
+        self.their_bids = [c for c in self.bids if c['player'] not in self.side]
+        self.opening = self.bids[0] if self.bids else None
+
+    @property
+    def we_opened(self) -> bool:
+        return self.opening is not None and self.opening['player'] in self.side
+
+    @property
+    def contract_is_ours(self) -> bool:
+        return self.last_bid is not None and self.last_bid['player'] in self.side
+
+    def cheapest_level(self, strain: str) -> int:
+        """strain を合法にビッドできる最低レベル（8 ならビッド不可）"""
+        if self.last_bid is None:
+            return 1
+        last = bid_rank(self.last_bid['level'], self.last_bid['suit'])
+        for level in range(1, 8):
+            if bid_rank(level, strain) > last:
+                return level
+        return 8
+
+    def bid_at_least(self, level: int, strain: str) -> Optional[Dict]:
+        """level 以上で strain をビッド（合法な最低レベルに上げる。7 を超えるなら None）"""
+        level = max(level, self.cheapest_level(strain))
+        return bid(level, strain) if level <= 7 else None
+
+    def opponents_suits(self) -> List[str]:
+        return [c['suit'] for c in self.their_bids if c['suit'] != 'NT']
+
+    def our_suits(self) -> List[str]:
+        return [c['suit'] for c in self.our_bids if c['suit'] != 'NT']
+
+    def last_call_by_rho(self) -> Optional[Dict]:
+        return self.history[-1] if self.history else None
+
+
+def partner_profile(view: AuctionView) -> PartnerProfile:
+    """パートナーのコールの意味を（自分のシステムで）大まかに解釈する"""
+    prof = PartnerProfile()
+    history = view.history
+    partner = view.partner
+    for i, call in enumerate(history):
+        if call['player'] != partner:
+            continue
+        before = [c for c in history[:i] if c['type'] == 'bid']
+        ours_before = [c for c in before if c['player'] in view.side]
+        if call['type'] == 'pass':
+            if not before:
+                prof.shows(0, 11)  # オープンしなかった
+            elif (before[-1] is view.opening and view.we_opened and view.opening['level'] == 1
+                  and not any(c['player'] == partner and c['type'] != 'pass' for c in history[:i])):
+                # 自分のオープンに応答しなかった
+                prof.shows(0, 5)
+            continue
+        if call['type'] == 'double':
+            if not ours_before:
+                prof.shows(12, 37)  # テイクアウト・ダブル
+                for suit in SUIT_ORDER:
+                    if suit not in [c['suit'] for c in before]:
+                        prof.lengths[suit] = max(prof.lengths[suit], 3)
+            continue
+        if call['type'] != 'bid':
+            continue
+        level, suit = call['level'], call['suit']
+        partner_prior = [c for c in ours_before if c['player'] == partner]
+        my_prior = [c for c in ours_before if c['player'] == view.player]
+        if not before:
+            _profile_opening(prof, level, suit)
+        elif not partner_prior and not my_prior and any(
+                c['type'] == 'double' for c in history[:i] if c['player'] == view.player):
+            # 自分のテイクアウト・ダブルへの応答（ジャンプなら 9-11）
+            jump = level - _cheapest_after(before[-1], suit)
+            prof.shows(*((9, 11) if jump > 0 else (0, 8)), suit, 4)
+        elif not ours_before:
+            # オーバーコール
+            if suit == 'NT':
+                prof.shows(15, 18)
+                prof.balanced = True
+            else:
+                prof.shows(8 if level == 1 else 10, 17, suit, 5)
+        elif not partner_prior and my_prior and my_prior[0] is not view.opening:
+            _profile_advance(prof, my_prior[0], level, suit, before[-1])
+        elif not partner_prior and my_prior:
+            _profile_response(prof, my_prior[0], level, suit, view)
+        else:
+            # 再ビッド: 同じスートなら長さ、新しいスートなら4枚（2♣ オープン後は5枚）
+            opened_by_partner = view.opening is not None and view.opening['player'] == partner
+            strong = opened_by_partner and view.opening['level'] == 2 and view.opening['suit'] == '♣'
+            transfer = _completes_transfer(partner_prior, my_prior, level, suit)
+            transferred = bool(partner_prior) and _completes_transfer(
+                partner_prior[:1], my_prior[:1], my_prior[0]['level'] if my_prior else 0, suit)
+            if suit != 'NT' and not transfer:
+                same = any(c['suit'] == suit for c in partner_prior)
+                mine = sum(c['suit'] == suit for c in my_prior)
+                if transferred or mine:
+                    # 自分のスートのレイズ（2回ビッドして6枚を示した後なら2枚で足りる）
+                    prof.lengths[suit] = max(prof.lengths[suit], 2 if mine >= 2 else 3)
+                else:
+                    prof.lengths[suit] = max(prof.lengths[suit], 6 if same else 5 if strong else 4)
+            # 1 レベルのオープンの後のリビッド: 最低レベルならミニマム、ジャンプなら強い
+            jacoby = (my_prior and my_prior[0]['suit'] == 'NT' and my_prior[0]['level'] == 2
+                      and opened_by_partner and view.opening['suit'] in MAJORS)
+            if jacoby and len(partner_prior) == 1:
+                # ジャコビー 2NT への答え: ゲームへのジャンプはミニマム、3M は余裕あり
+                prof.shows(*((11, 15) if level >= 4 else (16, 21)))
+            elif opened_by_partner and view.opening['level'] == 1 and len(partner_prior) == 1:
+                jump = level - _cheapest_after(before[-1], suit)
+                response = my_prior[0] if my_prior else None
+                two_over_one = (response is not None and response['level'] == 2 and response['suit'] != 'NT'
+                                and response['suit'] != view.opening['suit'])
+                if jump > 0:
+                    # ジャンプは強い（レイズのジャンプはサポート・ポイント込みなので少し下から）
+                    raise_ = response is not None and suit == response['suit']
+                    prof.shows(14 if raise_ else 15 if suit == view.opening['suit'] else 16, prof.hi)
+                elif two_over_one or level > 2:
+                    pass  # 2/1 の後やゲームへの受諾はミニマムとは限らない
+                elif suit != view.opening['suit'] or suit == 'NT':
+                    prof.shows(prof.lo, 16 if suit != 'NT' else 14)
+                else:
+                    prof.shows(prof.lo, 14)
+    return prof
+
+
+def _completes_transfer(partner_prior: List[Dict], my_prior: List[Dict], level: int, suit: str) -> bool:
+    """NT オープンのパートナーが、自分のトランスファー（♦→♥, ♥→♠）を完了させたビッドか"""
+    if len(partner_prior) != 1 or partner_prior[0]['suit'] != 'NT' or not my_prior:
+        return False
+    relay = my_prior[-1]
+    return (relay['level'] == partner_prior[0]['level'] + 1 and relay['suit'] in ('♦', '♥')
+            and suit == ('♥' if relay['suit'] == '♦' else '♠') and level == relay['level'])
+
+
+def _cheapest_after(last_bid: Dict, strain: str) -> int:
+    last = bid_rank(last_bid['level'], last_bid['suit'])
+    return next((level for level in range(1, 8) if bid_rank(level, strain) > last), 8)
+
+
+def _profile_opening(prof: PartnerProfile, level: int, suit: str):
+    if suit == 'NT':
+        prof.shows(*((15, 17) if level == 1 else (20, 21) if level == 2 else (25, 27)))
+        prof.balanced = True
+        for s in SUIT_ORDER:
+            prof.lengths[s] = max(prof.lengths[s], 2)
+    elif level == 1:
+        prof.shows(11, 21, suit, 5 if suit in MAJORS else 3)
+    elif level == 2 and suit == '♣':
+        prof.shows(22, 37)
+    elif level == 2:
+        prof.shows(6, 10, suit, 6)
+    else:
+        prof.shows(5, 10, suit, 7)
+
+
+def _profile_advance(prof: PartnerProfile, my_call: Dict, level: int, suit: str, last_bid: Dict):
+    """自分のオーバーコールへのパートナーの応答（競り合いなのでジャンプ・レイズはプリエンプティブ）"""
+    jump = level - _cheapest_after(last_bid, suit)
+    if suit == my_call['suit'] and suit != 'NT':
+        prof.shows(*((0, 9) if jump > 0 else (6, 12)), suit, 3)
+    elif suit == 'NT':
+        prof.shows(8, 15)
+    else:
+        prof.shows(8, 37, suit, 5)
+
+
+def _profile_response(prof: PartnerProfile, my_opening: Dict, level: int, suit: str, view: AuctionView):
+    mine = my_opening['suit']
+    if my_opening['suit'] == 'NT':
+        if suit == '♣' and level == my_opening['level'] + 1:
+            prof.shows(8, 37)  # ステイマン
+        elif level == my_opening['level'] + 1 and suit in ('♦', '♥'):
+            transfer_to = '♥' if suit == '♦' else '♠'
+            prof.lengths[transfer_to] = max(prof.lengths[transfer_to], 5)
+        elif suit == 'NT':
+            prof.shows(*{2: (8, 9), 3: (10, 15), 4: (16, 17), 6: (18, 20)}.get(level, (0, 37)))
+        return
+    if mine == '♣' and my_opening['level'] == 2:
+        prof.shows(0, 37)
+        return
+    if suit == mine:
+        jump = level - my_opening['level']
+        prof.shows(*((6, 9) if jump == 1 else (10, 12) if jump == 2 else (6, 12)), suit,
+                   4 if mine in MINORS else 3)
+    elif suit == 'NT':
+        prof.shows(*{1: (6, 10), 2: (11, 12) if mine in MINORS else (13, 37), 3: (13, 15)}.get(level, (6, 37)))
+        if level == 2 and mine in MAJORS:
+            prof.lengths[mine] = max(prof.lengths[mine], 4)  # ジャコビー 2NT
+        prof.balanced = level != 1
+    elif level == 1:
+        prof.shows(6, 37, suit, 4)
+    else:
+        prof.shows(10, 37, suit, 5 if suit == '♥' else 4)
+
+
+# --- 本体 ---
+
+def choose_call(game, player: str) -> Dict:
+    """game の現局面で player のコールを決める（必ず合法なコールを返す）"""
+    view = AuctionView(game, player)
+    ev = seat_evaluation(game, player)
+    call = (_blackwood_reply(view, ev)
+            or _nt_convention(view, ev)
+            or _choose(view, ev))
+    return legalize(game, call)
+
+
+def legalize(game, call: Optional[Dict]) -> Dict:
+    if not call:
+        return dict(PASS)
+    if call['type'] == 'bid':
+        if game.is_valid_bid(call):
+            return call
+        return dict(PASS)
+    if call['type'] == 'double':
+        return call if game.can_double() else dict(PASS)
+    if call['type'] == 'redouble':
+        return call if game.can_redouble() else dict(PASS)
+    return dict(PASS)
+
+
+def _choose(view: AuctionView, ev: HandEvaluation) -> Optional[Dict]:
+    if view.opening is None:
+        return opening_call(ev)
+
+    partner_bids = [c for c in view.our_bids if c['player'] == view.partner]
+    my_bids = [c for c in view.our_bids if c['player'] == view.player]
+    rho = view.last_call_by_rho()
+
+    # パートナーのオープンがダブルされた: 10HCP 以上ならリダブル
+    if (rho and rho['type'] == 'double' and rho['player'] not in view.side and partner_bids
+            and not my_bids and ev.hcp >= 10 and view.game.can_redouble()):
+        return dict(REDOUBLE)
+
+    if not view.our_bids:
+        partner_doubled = any(c['type'] == 'double' for c in view.partners)
+        if partner_doubled:
+            return _advance_takeout_double(view, ev)
+        if any(c['type'] != 'pass' for c in view.mine):
+            return _placement(view, ev)  # 既にダブルした: 2回目は控えめに
+        return _competitive_entry(view, ev)
+
+    if view.we_opened and view.opening['player'] == view.partner and not my_bids:
+        return _respond_to_opening(view, ev)
+
+    if view.we_opened and view.opening['player'] == view.player and len(my_bids) == 1:
+        if partner_bids:
+            return _opener_rebid(view, ev, partner_bids[0])
+        # パートナーがパスした: 競り合いの中でのリビッド
+        return _rebid_after_pass(view, ev)
+
+    i_doubled = any(c['type'] == 'double' for c in view.mine)
+    if not view.we_opened and partner_bids and not my_bids and not i_doubled:
+        return _advance_overcall(view, ev, partner_bids[0])
+
+    return _placement(view, ev)
+
+
+# --- オープニング ---
+
+def opening_call(ev: HandEvaluation) -> Dict:
+    hcp = ev.hcp
+    two_longest = sum(sorted(ev.lengths.values())[-2:])
+    if hcp >= 22:
+        return bid(2, '♣')
+    if ev.balanced and 20 <= hcp <= 21:
+        return bid(2, 'NT')
+    if ev.balanced and 15 <= hcp <= 17:
+        return bid(1, 'NT')
+    if hcp >= 12 or (hcp >= 10 and hcp + two_longest >= 20):
+        return bid(1, _opening_suit(ev))
+    longest = ev.longest_suit()
+    if 5 <= hcp <= 10 and ev.length(longest) >= 7 and ev.good_suit(longest):
+        return bid(3, longest)
+    for suit in ('♠', '♥', '♦'):
+        if 6 <= hcp <= 10 and ev.length(suit) == 6 and ev.good_suit(suit):
+            return bid(2, suit)
+    return dict(PASS)
+
+
+def _opening_suit(ev: HandEvaluation) -> str:
+    longest = ev.longest_suit()
+    if ev.length(longest) >= 5:
+        # 5枚以上: 最長スート（メジャーとマイナーが同じ長さならメジャー）
+        same = [s for s in SUIT_ORDER if ev.length(s) == ev.length(longest)]
+        majors = [s for s in same if s in MAJORS]
+        return majors[-1] if majors else same[-1]
+    # 5枚メジャーがない: ベターマイナー（4-4 は ♦、3-3 は ♣）
+    if ev.length('♦') > ev.length('♣') or (ev.length('♦') == ev.length('♣') == 4):
+        return '♦'
+    return '♣'
+
+
+# --- 応答 ---
+
+def _respond_to_opening(view: AuctionView, ev: HandEvaluation) -> Optional[Dict]:
+    opening = view.opening
+    level, suit = opening['level'], opening['suit']
+    interfered = bool(view.their_bids)
+
+    if suit == 'NT':
+        if interfered:
+            return _placement(view, ev)
+        return _respond_to_nt(view, ev, level)
+    if level == 2 and suit == '♣':
+        return view.bid_at_least(2, '♦') if not interfered else _placement(view, ev)
+    if level >= 2:
+        return _respond_to_preempt(view, ev, suit)
+
+    hcp = ev.hcp
+    support = ev.length(suit)
+    if hcp < 6:
+        return dict(PASS)
+    if suit in MAJORS and support >= 3:
+        pts = ev.support_points(suit)
+        if support >= 4 and hcp >= 13 and not interfered:
+            return bid(2, 'NT')  # ジャコビー 2NT
+        if pts >= 13:
+            return view.bid_at_least(4, suit)
+        if pts >= 10:
+            return view.bid_at_least(3, suit)
+        return view.bid_at_least(2, suit)
+
+    # 1 レベルで 4枚メジャー（4-4 は ♥ から、5-5 は ♠ から）
+    for major in (('♠', '♥') if ev.length('♠') >= 5 and ev.length('♠') >= ev.length('♥') else ('♥', '♠')):
+        if ev.length(major) >= 4 and view.cheapest_level(major) == 1 and major not in view.opponents_suits():
+            return bid(1, major)
+
+    # 2/1: 10HCP 以上で 5枚（マイナーは4枚）
+    if hcp >= 10:
+        for new in sorted((s for s in SUIT_ORDER if s != suit and s not in view.opponents_suits()),
+                          key=lambda s: (ev.length(s), SUIT_ORDER.index(s)), reverse=True):
+            need = 4 if new in MINORS else 5
+            if ev.length(new) >= need and view.cheapest_level(new) <= 2:
+                return view.bid_at_least(1, new)
+
+    # マイナーのレイズ
+    if suit in MINORS and support >= (5 if suit == '♣' else 4):
+        if hcp >= 13 and ev.balanced and _stoppers_in_unbid(view, ev, exclude=(suit,)):
+            return view.bid_at_least(3, 'NT')
+        return view.bid_at_least(3 if hcp >= 10 else 2, suit)
+
+    their = view.opponents_suits()
+    if ev.balanced and all(ev.stopper(s) for s in their):
+        if 13 <= hcp <= 15:
+            return view.bid_at_least(3, 'NT')
+        if 11 <= hcp <= 12 and suit in MINORS and not interfered:
+            return bid(2, 'NT')
+    if hcp <= 10:
+        if not interfered:
+            return bid(1, 'NT') if view.cheapest_level('NT') == 1 else dict(PASS)
+        return dict(PASS)
+    # 強い手でフィットも NT もない: 最長スートで応答（フォーシング）
+    longest = ev.longest_suit(exclude=tuple(their) + (suit,))
+    return view.bid_at_least(1, longest) if longest else None
+
+
+def _respond_to_nt(view: AuctionView, ev: HandEvaluation, level: int) -> Optional[Dict]:
+    """1NT / 2NT への応答（ステイマン・トランスファー・NT レイズ）"""
+    hcp = ev.hcp
+    offset = level - 1  # 2NT なら 1 レベル上
+    # 5枚以上のメジャー: トランスファー（♦ → ♥、♥ → ♠）
+    long_major = max(MAJORS, key=lambda s: (ev.length(s), s == '♠'))
+    if ev.length(long_major) >= 5:
+        return bid(2 + offset, '♦' if long_major == '♥' else '♥')
+    if (ev.length('♥') == 4 or ev.length('♠') == 4) and hcp >= 8 - 4 * offset:
+        return bid(2 + offset, '♣')  # ステイマン
+    if level == 1:
+        if hcp >= 18:
+            return bid(6, 'NT')
+        if hcp >= 16:
+            return bid(4, 'NT')  # クォンティタティブ
+        if hcp >= 10:
+            return bid(3, 'NT')
+        if hcp >= 8:
+            return bid(2, 'NT')
+        return dict(PASS)
+    if hcp >= 13:
+        return bid(6, 'NT')
+    if hcp >= 11:
+        return bid(4, 'NT')
+    return bid(3, 'NT') if hcp >= 4 else dict(PASS)
+
+
+def _respond_to_preempt(view: AuctionView, ev: HandEvaluation, suit: str) -> Optional[Dict]:
+    hcp = ev.hcp
+    support = ev.length(suit)
+    game_values = 16 if view.opening['level'] == 2 else 15
+    if suit in MAJORS and support >= 3:
+        if hcp >= game_values or support >= 4 and hcp >= 10:
+            return view.bid_at_least(4, suit)
+        if view.opening['level'] == 2 and support >= 3 and hcp >= 6:
+            return view.bid_at_least(3, suit)  # プリエンプティブ・レイズ
+        return dict(PASS)
+    if hcp >= game_values and (support >= 2 or ev.balanced) and _stoppers_in_unbid(view, ev, exclude=(suit,)):
+        return view.bid_at_least(3, 'NT')
+    if suit in MINORS and support >= 3 and hcp >= 8 and view.opening['level'] == 2:
+        return view.bid_at_least(3, suit)
+    if hcp >= game_values + 2 and ev.length(ev.longest_suit()) >= 6:
+        longest = ev.longest_suit()
+        return view.bid_at_least(GAME_LEVEL[longest] if longest in MAJORS else 3, longest)
+    return dict(PASS)
+
+
+def _stoppers_in_unbid(view: AuctionView, ev: HandEvaluation, exclude: Tuple[str, ...] = ()) -> bool:
+    our = set(view.our_suits()) | set(exclude)
+    return all(ev.stopper(s) for s in SUIT_ORDER if s not in our)
+
+
+# --- オープナーのリビッド ---
+
+def _opener_rebid(view: AuctionView, ev: HandEvaluation, response: Dict) -> Optional[Dict]:
+    opening = view.opening
+    mine = opening['suit']
+    if mine == 'NT' or (opening['level'] == 2 and mine == '♣'):
+        return _strong_rebid(view, ev, response)
+    if opening['level'] >= 2:
+        return _placement(view, ev)  # プリエンプトの後はパートナーに任せる
+
+    pts = ev.total_points()
+    r_level, r_suit = response['level'], response['suit']
+
+    if r_suit == mine:
+        jump = r_level - opening['level']
+        if r_level >= GAME_LEVEL[mine]:
+            return _placement(view, ev)
+        if jump == 1:
+            if pts >= 19 or (ev.ltc <= 5 and mine in MAJORS):
+                return view.bid_at_least(GAME_LEVEL[mine] if mine in MAJORS else 3,
+                                         mine if mine in MAJORS or not ev.balanced else 'NT')
+            if pts >= 16 or ev.ltc == 6:
+                return view.bid_at_least(3, mine)
+            return dict(PASS)
+        if pts >= 14 or ev.ltc <= 7:
+            if mine in MAJORS:
+                return view.bid_at_least(4, mine)
+            return view.bid_at_least(3, 'NT') if _stoppers_in_unbid(view, ev) else view.bid_at_least(5, mine)
+        return dict(PASS)
+
+    if r_suit == 'NT':
+        if r_level == 2 and mine in MAJORS:
+            # ジャコビー 2NT: ミニマムならゲーム、余裕があれば 3 レベルでスラムの意思表示
+            return view.bid_at_least(3 if pts >= 16 else 4, mine)
+        if r_level == 1:
+            if ev.balanced and 18 <= ev.hcp <= 19:
+                return view.bid_at_least(2, 'NT')
+            if ev.balanced and ev.hcp >= 20:
+                return view.bid_at_least(3, 'NT')
+            if ev.length(mine) >= 6:
+                return view.bid_at_least(3 if pts >= 17 else 2, mine)
+            second = _second_suit(ev, mine, allow_reverse=pts >= 17)
+            if second:
+                return view.bid_at_least(2, second)
+            return dict(PASS)
+        if r_level == 2:
+            return view.bid_at_least(3, 'NT') if ev.hcp >= 14 else dict(PASS)
+        return dict(PASS)
+
+    # 新しいスートの応答
+    support_needed = 4 if r_level == 1 or r_suit in MINORS else 3
+    if ev.length(r_suit) >= support_needed:
+        dummy_pts = ev.support_points(r_suit)
+        if dummy_pts >= 19:
+            game = GAME_LEVEL[r_suit]
+            if r_suit in MINORS and _stoppers_in_unbid(view, ev):
+                return view.bid_at_least(3, 'NT')
+            return view.bid_at_least(game, r_suit)
+        if dummy_pts >= 16:
+            return view.bid_at_least(min(view.cheapest_level(r_suit) + 1, 3 if r_suit in MINORS else 4), r_suit)
+        return view.bid_at_least(1, r_suit)
+    if r_level == 1 and r_suit == '♥' and ev.length('♠') >= 4 and view.cheapest_level('♠') == 1:
+        return bid(1, '♠')
+    stopped = all(ev.stopper(s) for s in view.opponents_suits())
+    if ev.balanced and ev.hcp <= 14 and stopped:
+        nt = view.bid_at_least(1 if r_level == 1 else 2, 'NT')
+        if nt and nt['level'] <= (1 if r_level == 1 else 2):
+            return nt
+    if ev.balanced and 18 <= ev.hcp <= 19 and stopped:
+        return view.bid_at_least(2 if r_level == 1 else 3, 'NT')
+    if view.their_bids and ev.total_points() <= 14 and view.cheapest_level(mine) > 2:
+        return dict(PASS)
+    if ev.length(mine) >= 6:
+        return view.bid_at_least(view.cheapest_level(mine) + (1 if pts >= 16 else 0), mine)
+    second = _second_suit(ev, mine, allow_reverse=pts >= 17, exclude=(r_suit,) + tuple(view.opponents_suits()))
+    if second and view.cheapest_level(second) <= 2:
+        return view.bid_at_least(1, second)
+    if ev.balanced and stopped and view.cheapest_level('NT') <= 2:
+        return view.bid_at_least(1, 'NT')
+    if view.cheapest_level(mine) <= 2:
+        return view.bid_at_least(1, mine)
+    return dict(PASS)
+
+
+def _second_suit(ev: HandEvaluation, first: str, allow_reverse: bool,
+                 exclude: Tuple[str, ...] = ()) -> Optional[str]:
+    """4枚以上の第2スート（リバースは強い手のときだけ）"""
+    candidates = [s for s in SUIT_ORDER if s != first and s not in exclude and ev.length(s) >= 4
+                  and (allow_reverse or SUIT_ORDER.index(s) < SUIT_ORDER.index(first))]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda s: (ev.length(s), SUIT_ORDER.index(s)))
+
+
+def _strong_rebid(view: AuctionView, ev: HandEvaluation, response: Dict) -> Optional[Dict]:
+    """2♣ オープン後のオープナーのリビッド（NT オープン後は _nt_convention が扱う）"""
+    opening = view.opening
+    if opening['suit'] == 'NT':
+        return _placement(view, ev)
+    if response['suit'] == '♦' and response['level'] == 2:
+        if ev.balanced and ev.hcp <= 24:
+            return bid(2, 'NT')
+        if ev.balanced:
+            return bid(3, 'NT')
+        longest = ev.longest_suit()
+        return view.bid_at_least(2, longest)
+    return _placement(view, ev)
+
+
+def _rebid_after_pass(view: AuctionView, ev: HandEvaluation) -> Optional[Dict]:
+    """パートナーが応答できなかった後（相手が競ってきたとき）"""
+    mine = view.opening['suit']
+    if not view.their_bids or view.contract_is_ours:
+        return dict(PASS)
+    if mine != 'NT' and ev.length(mine) >= 6 and view.cheapest_level(mine) <= 2:
+        return view.bid_at_least(2, mine)
+    their = view.last_bid['suit']
+    if ev.hcp >= 17 and view.game.can_double() and (their == 'NT' or ev.length(their) <= 2):
+        return dict(DOUBLE)
+    return dict(PASS)
+
+
+# --- 1NT/2NT の約束事の続き ---
+
+def _nt_convention(view: AuctionView, ev: HandEvaluation) -> Optional[Dict]:
+    """ステイマン・トランスファー・クォンティタティブの続き（相手の競りがないときのみ）"""
+    opening = view.opening
+    if not opening or opening['suit'] != 'NT' or opening['level'] > 2 or not view.we_opened:
+        return None
+    if view.their_bids or any(c['type'] != 'pass' and c['type'] != 'bid' for c in view.history):
+        return None
+    base = opening['level']  # 1NT なら 1, 2NT なら 2
+    opener = opening['player']
+    seq = [c for c in view.our_bids]
+    if len(seq) < 2:
+        return None
+    ask = seq[1]
+    if ask['player'] == opener:
+        return None
+
+    # オープナー: 約束事への答え
+    if view.player == opener and len(seq) == 2:
+        if ask['level'] == base + 1 and ask['suit'] == '♣':
+            if ev.length('♥') >= 4:
+                return bid(base + 1, '♥')
+            if ev.length('♠') >= 4:
+                return bid(base + 1, '♠')
+            return bid(base + 1, '♦')
+        if ask['level'] == base + 1 and ask['suit'] in ('♦', '♥'):
+            target = '♥' if ask['suit'] == '♦' else '♠'
+            if base == 1 and ev.hcp == 17 and ev.length(target) >= 4:
+                return bid(3, target)  # スーパー・アクセプト
+            return bid(base + 1, target)
+        if ask['suit'] == 'NT' and ask['level'] == 2 and base == 1:
+            return bid(3, 'NT') if ev.hcp >= 16 else dict(PASS)
+        if ask['suit'] == 'NT' and ask['level'] == 4:
+            top = 17 if base == 1 else 21
+            return bid(6, 'NT') if ev.hcp >= top else dict(PASS)
+        return None
+
+    # 応答者: オープナーの答えを見て決める
+    if view.player != opener and len(seq) == 3:
+        reply = seq[2]
+        hcp = ev.hcp
+        game_pts = 10 if base == 1 else 5
+        invite_pts = 8 if base == 1 else 99
+        if ask['suit'] == '♣' and ask['level'] == base + 1:
+            fit = reply['suit'] if reply['suit'] in MAJORS and ev.length(reply['suit']) >= 4 else None
+            if fit:
+                if hcp >= game_pts:
+                    return view.bid_at_least(4, fit)
+                return view.bid_at_least(3, fit) if hcp >= invite_pts else dict(PASS)
+            if hcp >= game_pts:
+                return view.bid_at_least(3, 'NT')
+            return view.bid_at_least(2, 'NT') if hcp >= invite_pts else dict(PASS)
+        if ask['suit'] in ('♦', '♥') and ask['level'] == base + 1:
+            major = '♥' if ask['suit'] == '♦' else '♠'
+            length = ev.length(major)
+            if reply['level'] == 3 and base == 1:
+                return view.bid_at_least(4, major) if hcp >= 6 else dict(PASS)
+            if hcp >= game_pts + 5 and length >= 6:
+                return view.bid_at_least(4, 'NT')  # スラムを探る（ブラックウッド）
+            if hcp >= game_pts:
+                return view.bid_at_least(4, major) if length >= 6 else view.bid_at_least(3, 'NT')
+            if hcp >= invite_pts:
+                return view.bid_at_least(3, major) if length >= 6 else view.bid_at_least(2, 'NT')
+            return dict(PASS)
+        return None
+
+    # オープナー: 応答者の2回目のビッドへ
+    if view.player == opener and len(seq) == 4:
+        ask_major = {'♦': '♥', '♥': '♠'}.get(ask['suit']) if ask['level'] == base + 1 else None
+        last = seq[3]
+        top = ev.hcp >= (16 if base == 1 else 21)
+        # ステイマンで ♥ と答えた後に応答者が NT: 応答者は ♠ を4枚持っている
+        other_major = '♠' if ask['suit'] == '♣' and seq[2]['suit'] == '♥' and ev.length('♠') >= 4 else None
+        fit = ask_major if ask_major and ev.length(ask_major) >= 3 else other_major
+        if last['suit'] == 'NT' and last['level'] == base + 2:
+            return view.bid_at_least(4, fit) if fit else dict(PASS)
+        if last['suit'] == 'NT' and last['level'] == base + 1:
+            if fit:
+                return view.bid_at_least(4 if top else 3, fit)
+            return view.bid_at_least(3, 'NT') if top else dict(PASS)
+        if last['suit'] in MAJORS and last['level'] == 3:
+            return view.bid_at_least(4, last['suit']) if top else dict(PASS)
+        return None
+    return None
+
+
+# --- 競り合い ---
+
+def _competitive_entry(view: AuctionView, ev: HandEvaluation) -> Optional[Dict]:
+    """相手がオープンし、自分側はまだビッドしていない"""
+    hcp = ev.hcp
+    their = view.opponents_suits()
+    last = view.last_bid
+    rho_bid = view.history[-1]['type'] == 'bid' if view.history else False
+    # 1NT オーバーコール
+    if (15 <= hcp <= 18 and ev.balanced and all(ev.stopper(s) for s in their)
+            and view.cheapest_level('NT') == 1 and rho_bid):
+        return bid(1, 'NT')
+    # スートのオーバーコール
+    for suit in sorted((s for s in SUIT_ORDER if s not in their), key=lambda s: (ev.length(s), SUIT_ORDER.index(s)), reverse=True):
+        if ev.length(suit) < 5:
+            break
+        level = view.cheapest_level(suit)
+        need = 8 if level == 1 else 10 if level == 2 else 13
+        if need <= hcp <= 17 and ev.good_suit(suit) and level <= 3:
+            return bid(level, suit)
+    # テイクアウト・ダブル（3 レベルまで。4 レベルは強い手だけ）
+    if last and view.game.can_double() and (last['level'] <= 3 or last['level'] == 4 and hcp >= 17):
+        if last['suit'] == 'NT':
+            return dict(DOUBLE) if hcp >= 16 else dict(PASS)
+        unbid = [s for s in SUIT_ORDER if s not in their]
+        short = ev.length(last['suit']) <= 2
+        support = all(ev.length(s) >= 3 for s in unbid)
+        if (hcp >= 12 and short and support) or hcp >= 18:
+            return dict(DOUBLE)
+    if hcp >= 18:
+        longest = ev.longest_suit(exclude=tuple(their))
+        if longest and view.cheapest_level(longest) <= 3:
+            return view.bid_at_least(1, longest)
+    return dict(PASS)
+
+
+def _advance_takeout_double(view: AuctionView, ev: HandEvaluation) -> Optional[Dict]:
+    """パートナーのテイクアウト・ダブルへの応答（間に相手のビッドがなければ必ずビッドする）"""
+    their = view.opponents_suits()
+    forced = view.history[-1]['type'] == 'pass'
+    hcp = ev.hcp
+    if not forced and hcp < 6:
+        return dict(PASS)
+    unbid = [s for s in SUIT_ORDER if s not in their]
+    if not unbid:
+        return dict(PASS)
+    # メジャー優先で最長の未ビッド・スート
+    best = max(unbid, key=lambda s: (ev.length(s) + (0.5 if s in MAJORS else 0), SUIT_ORDER.index(s)))
+    if 6 <= hcp <= 10 and ev.balanced and all(ev.stopper(s) for s in their) and ev.length(best) < 5:
+        return view.bid_at_least(1, 'NT')
+    level = view.cheapest_level(best)
+    if hcp >= 12:
+        if best in MAJORS and ev.length(best) >= 4:
+            return view.bid_at_least(4, best)
+        if all(ev.stopper(s) for s in their):
+            return view.bid_at_least(3, 'NT')
+        return view.bid_at_least(level + (1 if level <= 2 else 0), best)
+    if level >= 4 and not forced or level >= 5:
+        return dict(PASS)  # 高いレベルではペナルティとしてパス
+    if hcp >= 9 and level <= 2:
+        return view.bid_at_least(level + 1, best)
+    return view.bid_at_least(level, best)
+
+
+def _advance_overcall(view: AuctionView, ev: HandEvaluation, overcall: Dict) -> Optional[Dict]:
+    """パートナーのオーバーコールへの応答"""
+    suit = overcall['suit']
+    hcp = ev.hcp
+    their = view.opponents_suits()
+    if suit == 'NT':
+        if hcp >= 10:
+            return view.bid_at_least(3, 'NT')
+        if hcp >= 8:
+            return view.bid_at_least(2, 'NT')
+        return dict(PASS)
+    if ev.length(suit) >= 3:
+        pts = ev.support_points(suit)
+        if pts >= 13 and suit in MAJORS:
+            return view.bid_at_least(4, suit)
+        if pts >= 10 or ev.length(suit) >= 4:
+            return view.bid_at_least(view.cheapest_level(suit) + (1 if pts >= 10 else 0), suit)
+        if pts >= 7:
+            return view.bid_at_least(1, suit)
+        return dict(PASS)
+    if 10 <= hcp and ev.balanced and all(ev.stopper(s) for s in their):
+        return view.bid_at_least(3 if hcp >= 13 else 2, 'NT')
+    longest = ev.longest_suit(exclude=tuple(their) + (suit,))
+    if longest and ev.length(longest) >= 6 and hcp >= 10 and view.cheapest_level(longest) <= 2:
+        return view.bid_at_least(1, longest)
+    return dict(PASS)
+
+
+# --- ブラックウッド ---
+
+def _blackwood_used(view: AuctionView) -> bool:
+    return any(c['suit'] == 'NT' and c['level'] == 4 and _is_blackwood(view, c) for c in view.our_bids)
+
+
+def _is_blackwood(view: AuctionView, ask: Dict) -> bool:
+    """4NT がブラックウッドか（それまでに自分側でスートがビッドされていればブラックウッド）"""
+    before = view.our_bids[:view.our_bids.index(ask)]
+    if view.opening and view.we_opened and view.opening['suit'] == 'NT' and all(c['suit'] == 'NT' for c in before):
+        return False
+    suit_bids = [c for c in before if c['suit'] != 'NT']
+    # NT オープンの後のステイマン・トランスファーだけならクォンティタティブ扱い
+    if view.opening and view.we_opened and view.opening['suit'] == 'NT':
+        return len(suit_bids) >= 2 or any(c['level'] >= 3 for c in suit_bids)
+    return bool(suit_bids)
+
+
+def _blackwood_reply(view: AuctionView, ev: HandEvaluation) -> Optional[Dict]:
+    our = view.our_bids
+    if not our:
+        return None
+    last = our[-1]
+    if last['player'] == view.partner and last['suit'] == 'NT' and last['level'] == 4 and _is_blackwood(view, last):
+        if view.last_bid is not last:
+            return None  # 相手が間に入った: 通常の判断に任せる
+        return bid(5, {0: '♣', 4: '♣', 1: '♦', 2: '♥', 3: '♠'}[ev.aces])
+    # 自分がブラックウッドを使い、パートナーが答えた
+    if (len(our) >= 2 and last['player'] == view.partner and last['level'] == 5 and last['suit'] != 'NT'
+            and our[-2]['player'] == view.player and our[-2]['suit'] == 'NT' and our[-2]['level'] == 4
+            and _is_blackwood(view, our[-2])):
+        shown = {'♣': 0, '♦': 1, '♥': 2, '♠': 3}[last['suit']]
+        if last['suit'] == '♣' and ev.aces == 0:
+            shown = 4
+        aces = ev.aces + shown
+        fit = _agreed_suit(view, ev) or 'NT'
+        prof = partner_profile(view)
+        strength = ev.support_points(fit) + prof.mid
+        if aces >= 4 and strength >= 37:
+            return view.bid_at_least(7, fit)
+        if aces >= 3:
+            return view.bid_at_least(6, fit)
+        signoff = view.bid_at_least(5, fit)
+        return signoff if signoff and signoff['level'] == 5 else view.bid_at_least(6, fit)
+    return None
+
+
+def _agreed_suit(view: AuctionView, ev: HandEvaluation) -> Optional[str]:
+    prof = partner_profile(view)
+    fits = [s for s in SUIT_ORDER if ev.length(s) + prof.lengths[s] >= 8]
+    if not fits:
+        return None
+    return max(fits, key=lambda s: (s in MAJORS, ev.length(s) + prof.lengths[s], SUIT_ORDER.index(s)))
+
+
+# --- 一般的な配置（ストレインとレベルの決定） ---
+
+def _placement(view: AuctionView, ev: HandEvaluation) -> Optional[Dict]:
+    """パートナーの推定範囲と合計点からストレインとレベルを決める"""
+    prof = partner_profile(view)
+    fit = _agreed_suit(view, ev)
+    my_pts = ev.support_points(fit) if fit else ev.total_points()
+    est = my_pts + prof.mid
+    low = my_pts + prof.lo
+    game_forcing = view.we_opened and view.opening['level'] == 2 and view.opening['suit'] == '♣'
+    if game_forcing:
+        est = max(est, 26)
+
+    # 相手の契約への罰のダブル
+    last = view.last_bid
+    if (last and not view.contract_is_ours and view.game.can_double() and view.our_bids
+            and last['level'] >= 2 and low >= 23 and (last['suit'] == 'NT' or ev.length(last['suit']) >= 3)):
+        if not fit or bid_rank(GAME_LEVEL[fit], fit) <= bid_rank(last['level'], last['suit']):
+            return dict(DOUBLE)
+
+    # スラム: フィットがあり合計 33 点以上ならブラックウッド
+    if fit and est >= 33 and not _blackwood_used(view) and view.cheapest_level('NT') <= 4:
+        return bid(4, 'NT')
+    if not fit and est >= 33 and ev.balanced and prof.balanced:
+        return view.bid_at_least(6, 'NT')
+
+    # 自分側がすでにゲーム以上: スラムの見込みがなければ止める
+    if view.contract_is_ours and last['level'] >= GAME_LEVEL[last['suit']]:
+        return dict(PASS)
+
+    strain = fit or _nt_or_suit(view, ev, prof)
+    if strain is None and game_forcing:
+        # ゲームフォーシング中: パートナーのスートか NT で続ける
+        shown = [s for s in SUIT_ORDER if prof.lengths[s] >= 5]
+        strain = max(shown, key=lambda s: prof.lengths[s]) if shown else 'NT'
+    if strain is None:
+        return dict(PASS)
+    game = GAME_LEVEL[strain]
+    if strain in MINORS and est < 29 and _stoppers_in_unbid(view, ev) and view.cheapest_level('NT') <= 3:
+        strain, game = 'NT', 3
+
+    if est >= 25:
+        target = game
+    elif est >= 23 and not view.contract_is_ours:
+        target = game - 1
+    elif est >= 23:
+        target = game - 1 if view.cheapest_level(strain) < game else 0
+    else:
+        # パートスコア: 自分側の契約なら止める。相手の契約ならトータル・トリックの法則まで競る
+        if view.contract_is_ours:
+            return dict(PASS)
+        total = ev.length(strain) + prof.lengths[strain] if strain != 'NT' else 0
+        target = min(total - 6, 3) if total >= 8 else 0
+        if not view.our_bids:
+            target = 0
+
+    current = view.last_bid
+    if view.contract_is_ours and current['suit'] == strain and current['level'] >= target:
+        return dict(PASS)
+    level = view.cheapest_level(strain)
+    if target <= 0 or level > max(target, 1):
+        return dict(PASS)
+    return bid(target if est >= 25 else level, strain)
+
+
+def _nt_or_suit(view: AuctionView, ev: HandEvaluation, prof: PartnerProfile) -> Optional[str]:
+    """フィットがないときのストレイン"""
+    their = view.opponents_suits()
+    if ev.balanced and all(ev.stopper(s) for s in their):
+        return 'NT'
+    longest = ev.longest_suit(exclude=tuple(their))
+    if longest and ev.length(longest) >= 6:
+        return longest
+    partner_suits = [s for s in SUIT_ORDER if prof.lengths[s] >= 5 and ev.length(s) >= 2]
+    if partner_suits:
+        return max(partner_suits, key=lambda s: prof.lengths[s])
+    partner_stops = any(c['suit'] == 'NT' for c in view.our_bids if c['player'] == view.partner)
+    if (prof.balanced or ev.balanced) and (partner_stops or all(ev.stopper(s) for s in their)):
+        return 'NT'
+    return None
@@ -0,0 +1,266 @@
+"""カードとハンドのビットボード表現
+
+52枚のカードは `Card` のフライウェイト（同じスート・ランクなら常に同一インスタンス）として
+インターンされ、ハンドは52ビット整数で表現する。
+ビット位置は ``スートコード * 13 + ランクインデックス`` で、スートコードは
+♣=0, ♦=1, ♥=2, ♠=3（ビッドのストレイン順と同じ）、ランクインデックスは 2=0 ... A=12。
+"""
+from math import comb
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+SUITS = ['♠', '♥', '♦', '♣']
+RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
+
+# スート -> スートコード（ビット上のブロック位置）
+SUIT_CODES = {'♣': 0, '♦': 1, '♥': 2, '♠': 3}
+SUIT_BY_CODE = ['♣', '♦', '♥', '♠']
+RANK_INDEX = {rank: i for i, rank in enumerate(RANKS)}
+
+FULL_SUIT = (1 << 13) - 1
+SUIT_MASKS = [FULL_SUIT << (13 * code) for code in range(4)]
+FULL_DECK = (1 << 52) - 1
+
+
+def _rank_mask(rank: str) -> int:
+    i = RANK_INDEX[rank]
+    return sum(1 << (13 * code + i) for code in range(4))
+
+
+ACES = _rank_mask('A')
+KINGS = _rank_mask('K')
+QUEENS = _rank_mask('Q')
+JACKS = _rank_mask('J')
+
+
+class Card:
+    """インターンされたカード。`Card(suit, rank)` は常に同じインスタンスを返す"""
+    __slots__ = ('suit', 'rank', 'value', 'index', 'bit')
+    _interned: Dict[Tuple[str, str], 'Card'] = {}
+
+    def __new__(cls, suit: str, rank: str):
+        card = cls._interned.get((suit, rank))
+        if card is None:
+            card = object.__new__(cls)
+            card.suit = suit
+            card.rank = rank
+            card.value = RANK_INDEX[rank] + 2
+            card.index = SUIT_CODES[suit] * 13 + RANK_INDEX[rank]
+            card.bit = 1 << card.index
+            cls._interned[(suit, rank)] = card
+        return card
+
+    def __reduce__(self):
+        # pickle/deepcopy でもインターン済みインスタンスに戻す
+        return (Card, (self.suit, self.rank))
+
+    def get_suit_rank(self):
+        return SUIT_CODES[self.suit] + 1
+
+    def __str__(self):
+        return f"{self.rank}{self.suit}"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+# ビット位置 -> Card
+CARDS: Tuple[Card, ...] = tuple(Card(SUIT_BY_CODE[i // 13], RANKS[i % 13]) for i in range(52))
+# 表示順（♠→♣、各スート A→2）のデッキ
+DECK: Tuple[Card, ...] = tuple(Card(suit, rank) for suit in SUITS for rank in RANKS)
+
+
+def card_mask(cards: Iterable[Card]) -> int:
+    """カードの集合をビットマスクに変換"""
+    if isinstance(cards, Hand):
+        return cards.mask
+    mask = 0
+    for card in cards:
+        mask |= card.bit
+    return mask
+
+
+def iter_cards(mask: int) -> Iterator[Card]:
+    """ビットマスクのカードを表示順（♠A→♣2）で列挙"""
+    while mask:
+        i = mask.bit_length() - 1
+        yield CARDS[i]
+        mask ^= 1 << i
+
+
+def cards_from_mask(mask: int) -> List[Card]:
+    return list(iter_cards(mask))
+
+
+def suit_of_mask(mask: int, suit: str) -> int:
+    return mask & SUIT_MASKS[SUIT_CODES[suit]]
+
+
+def hcp(mask: int) -> int:
+    """ハイカードポイント（A=4, K=3, Q=2, J=1）"""
+    return (4 * (mask & ACES).bit_count() + 3 * (mask & KINGS).bit_count()
+            + 2 * (mask & QUEENS).bit_count() + (mask & JACKS).bit_count())
+
+
+def suit_lengths(mask: int) -> Dict[str, int]:
+    return {suit: (mask & SUIT_MASKS[SUIT_CODES[suit]]).bit_count() for suit in SUITS}
+
+
+def legal_mask(hand_mask: int, led_suit: Optional[str]) -> int:
+    """フォロースートのルールに従ってプレイ可能なカードのマスクを返す"""
+    if led_suit is None:
+        return hand_mask
+    follow = hand_mask & SUIT_MASKS[SUIT_CODES[led_suit]]
+    return follow or hand_mask
+
+
+def trick_winner_index(trick_mask: int, led_suit: str, trump_suit: Optional[str]) -> int:
+    """トリック内のカードから勝ちカードのビット位置を返す（trump_suit は 'NT' か None で切り札なし）"""
+    if trump_suit in SUIT_CODES:
+        trumps = trick_mask & SUIT_MASKS[SUIT_CODES[trump_suit]]
+        if trumps:
+            return trumps.bit_length() - 1
+    return (trick_mask & SUIT_MASKS[SUIT_CODES[led_suit]]).bit_length() - 1
+
+
+DEAL_BYTES = 13
+
+
+def encode_deal(hands: Sequence[int]) -> bytes:
+    """4人の13枚（座席順のマスク）-> 13バイト（カードごとに持ち主の座席番号を2ビットで詰めたもの）
+
+    同じディールなら常に同じバイト列になるので、そのままディールの正規形・キーとして使える。
+    """
+    if sum(hands) != FULL_DECK or any(hands[i] & hands[j] for i in range(4) for j in range(i + 1, 4)):
+        raise ValueError("hands must partition the deck")
+    value = 0
+    for seat in range(1, 4):
+        mask = hands[seat]
+        while mask:
+            i = mask.bit_length() - 1
+            value |= seat << (2 * i)
+            mask ^= 1 << i
+    return value.to_bytes(DEAL_BYTES, 'little')
+
+
+def decode_deal(data: bytes) -> List[int]:
+    """encode_deal の逆（座席順のマスクのリスト）"""
+    value = int.from_bytes(data, 'little')
+    hands = [0, 0, 0, 0]
+    for i in range(52):
+        hands[value >> (2 * i) & 3] |= 1 << i
+    return hands
+
+
+# --- ディール番号 ---
+# ディール <-> [0, NUM_DEALS) の整数の全単射。South・West・North の13枚をそれぞれ残りのカードからの
+# 組み合わせの番号（colex 順）にし、番号 = k_S + C(52,13) * (k_W + C(39,13) * k_N) とする（East は残り）。
+# 96 ビットに収まり、ランダムな番号1つで一様なディールになる。
+
+# _BINOM[k][n] = C(n, k)（内側のループで同じ k の列を引くので k を外側にする）
+_BINOM = [[comb(n, k) for n in range(53)] for k in range(14)]
+_HAND_CHOICES = [_BINOM[13][52], _BINOM[13][39], _BINOM[13][26]]
+NUM_DEALS = _HAND_CHOICES[0] * _HAND_CHOICES[1] * _HAND_CHOICES[2]
+
+
+def rank_deal(hands: Sequence[int]) -> int:
+    """4人の13枚（座席順のマスク）-> ディール番号"""
+    encode_deal(hands)  # 52枚をちょうど分けているか確かめる
+    remaining = list(range(52))
+    number, scale = 0, 1
+    for seat in range(3):
+        mask = hands[seat]
+        k = taken = 0
+        rest = []
+        for pos, idx in enumerate(remaining):
+            if mask >> idx & 1:
+                taken += 1
+                k += _BINOM[taken][pos]
+            else:
+                rest.append(idx)
+        number += k * scale
+        scale *= _HAND_CHOICES[seat]
+        remaining = rest
+    return number
+
+
+def unrank_deal(number: int) -> List[int]:
+    """ディール番号 -> 4人の13枚（座席順のマスク）"""
+    if not 0 <= number < NUM_DEALS:
+        raise ValueError(f"deal number must be in [0, {NUM_DEALS})")
+    remaining = list(range(52))
+    hands = [0, 0, 0, 0]
+    for seat in range(3):
+        number, k = divmod(number, _HAND_CHOICES[seat])
+        # 大きい位置から貪欲に選ぶ（picked は降順なので、後ろから消しても位置がずれない）
+        pos = len(remaining) - 1
+        picked = []
+        for taken in range(13, 0, -1):
+            column = _BINOM[taken]
+            while column[pos] > k:
+                pos -= 1
+            k -= column[pos]
+            picked.append(pos)
+            pos -= 1
+        for pos in picked:
+            hands[seat] |= 1 << remaining[pos]
+            del remaining[pos]
+    for idx in remaining:
+        hands[3] |= 1 << idx
+    return hands
+
+
+class Hand:
+    """ビットマスクの上に載せた `List[Card]` 互換の薄いビュー"""
+    __slots__ = ('mask',)
+
+    def __init__(self, cards: Iterable[Card] = (), mask: int = 0):
+        self.mask = mask | card_mask(cards)
+
+    def __iter__(self):
+        return iter_cards(self.mask)
+
+    def __len__(self):
+        return self.mask.bit_count()
+
+    def __bool__(self):
+        return self.mask != 0
+
+    def __contains__(self, card):
+        return isinstance(card, Card) and bool(self.mask & card.bit)
+
+    def __getitem__(self, i):
+        return cards_from_mask(self.mask)[i]
+
+    def __eq__(self, other):
+        if isinstance(other, Hand):
+            return self.mask == other.mask
+        if isinstance(other, list):
+            return cards_from_mask(self.mask) == other
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(cards_from_mask(self.mask))
+
+    def __reduce__(self):
+        return (Hand, ((), self.mask))
+
+    def append(self, card: Card):
+        self.mask |= card.bit
+
+    def remove(self, card: Card):
+        if not self.mask & card.bit:
+            raise ValueError(f"{card} is not in hand")
+        self.mask ^= card.bit
+
+    def copy(self) -> 'Hand':
+        return Hand(mask=self.mask)
+
+    def suit_cards(self, suit: str) -> List[Card]:
+        return cards_from_mask(suit_of_mask(self.mask, suit))
+
+    def suit_length(self, suit: str) -> int:
+        return suit_of_mask(self.mask, suit).bit_count()
+
+    @property
+    def hcp(self) -> int:
+        return hcp(self.mask)
@@ -0,0 +1,326 @@
+"""ダブルダミー表とパーの分析
+
+終わったディールについて、ディクレアラー（4座席）× ストレイン（5）のダブルダミーのトリック表と
+パー・コントラクト／パー・スコアを求め、実際の結果をパーと比べる（AI と人間の成績の評価用）。
+
+- 表はストレインごとにソルバー（TT）を1つ作って4人のディクレアラーで使い回す。最初の探索は
+  ハンドからの見積もり（`bid_simulation.estimate_tricks`）、以後は直前の値から始める
+- 表はディールの正規形（`cards.encode_deal` の13バイト）の SHA-1 と `TABLE_VERSION` をキーにキャッシュする
+  （LRU と任意の SQLite の永続層。`BRIDGE_DD_CACHE_DB` で既定のパスを指定できる）
+- バッチはキャッシュにないディールだけを ProcessPoolExecutor で並列に解き、入力順に結果を返す
+- パーは表だけから決まるので、バルネラビリティやディーラーが違っても表は使い回せる
+
+純 Python のソルバーなので1ディールの表に数分かかることがある。UI では `start_analysis` で
+バックグラウンドのプロセスに投げ、`lookup` で結果を受け取る。
+
+    python dd_analysis.py --boards 20 --seed 0 --workers 0   # simulate と同じ配札を対局してパーと比べる
+    python dd_analysis.py deals.txt --out tables.jsonl         # 1行1ディールの PBN の Deal 文字列
+    python dd_analysis.py boards.pbn                           # PBN / LIN / アーカイブのボード（結果とパーを比べる）
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ai_cache import DecisionCache
+from bid_simulation import estimate_tricks
+from cards import encode_deal
+from deal_archive import format_pbn_deal, load_records, parse_pbn_deal
+from scoring import STRAINS, declarer_score
+from solver import SEATS, SEAT_INDEX, DoubleDummySolver
+
+# table[座席][ストレイン] = その座席がディクレアラーのときに取るトリック数（座席は SEATS 順、ストレインは ♣♦♥♠NT）
+DDTable = List[List[int]]
+
+
+def deal_hash(hands: Sequence[int]) -> str:
+    """ディールの正規化ハッシュ（座席順のマスク -> 13バイトの正規形の SHA-1 の16進）"""
+    return hashlib.sha1(encode_deal(hands)).hexdigest()
+
+
+# 表のキャッシュのキーに付ける版。ソルバーの結果が変わる修正をしたら上げる（永続層に残った古い表は使わない）
+# 2: 同等カードの枝刈りで TT のエントリが同等でない局面にも当たり、表の値が狂うことがあったのを直した
+TABLE_VERSION = 2
+
+
+def table_key(hands: Sequence[int]) -> str:
+    """表のキャッシュのキー"""
+    return f"{deal_hash(hands)}.v{TABLE_VERSION}"
+
+
+# --- ダブルダミー表 ---
+
+def strain_row(hands: Sequence[int], strain: int) -> List[int]:
+    """1ストレイン分（4人のディクレアラー）のトリック数"""
+    solver = DoubleDummySolver(None if strain == 4 else strain)
+    estimate = estimate_tricks(np.array([hands], dtype=np.uint64))[0]
+    row = [0, 0, 0, 0]
+    ns_guess = int(estimate[0, strain])
+    # South, North（NS の値）-> West, East の順に解き、直前の NS の値から探索を始める
+    for declarer in (0, 2, 1, 3):
+        ns_tricks = solver.solve(hands, (declarer + 1) % 4, guess=ns_guess)
+        row[declarer] = ns_tricks if declarer % 2 == 0 else 13 - ns_tricks
+        ns_guess = ns_tricks
+    return row
+
+
+def dd_table(hands: Sequence[int]) -> DDTable:
+    """4 × 5 のダブルダミー表を解く（キャッシュを通さない）"""
+    rows = [strain_row(hands, strain) for strain in range(5)]
+    return [[rows[strain][seat] for strain in range(5)] for seat in range(4)]
+
+
+# --- パー ---
+
+class Par(NamedTuple):
+    """パー・コントラクトとパー・スコア（score は NS から見た点数、level 0 はパスアウト）"""
+    score: int
+    level: int
+    strain: int
+    doubled: int
+    declarer: Optional[str]
+
+    @property
+    def contract(self) -> str:
+        if self.level == 0:
+            return "Pass Out"
+        return f"{self.level}{STRAINS[self.strain]}{'x' * self.doubled} by {self.declarer}"
+
+
+def par(table: DDTable, vulnerable: Dict[str, bool], dealer: str = 'North') -> Par:
+    """表からパーを求める
+
+    1. 各サイドのメイクできる最も高いビッドを比べ、高い方（同じならディーラーから先にビッドできる方）が競り勝つ
+    2. 競り勝つサイドは、相手のメイクできる最高のビッドより上で、自分たちがメイクできるコントラクトのうち
+       「そのまま取れる点」と「相手がその上でダブルされてダウンするセーブの最小の失点」の小さい方が最大のものを選ぶ
+    3. セーブの方が安ければ（同点ならセーブしない）パーはそのセーブ（ダブル）になる
+    セーブに対するさらに上へのビッドは、より高いコントラクトを候補にすることで扱っている。
+    """
+    vul = [vulnerable['NS'], vulnerable['EW']]
+    order = [(SEAT_INDEX[dealer] + i) % 4 for i in range(4)]
+    # (サイド, ストレイン) -> (最大のトリック数, ディクレアラー)。同じならディーラーから先の座席
+    best = {}
+    for side in range(2):
+        seats = [seat for seat in order if seat % 2 == side]
+        for strain in range(5):
+            seat = max(seats, key=lambda s: table[s][strain])
+            best[side, strain] = (table[seat][strain], seat)
+
+    def top_rank(side: int) -> int:
+        ranks = [(tricks - 7) * 5 + strain for strain in range(5)
+                 for tricks, _ in [best[side, strain]] if tricks >= 7]
+        return max(ranks, default=-1)
+
+    ranks = [top_rank(0), top_rank(1)]
+    if max(ranks) < 0:
+        return Par(0, 0, 0, 0, None)
+    if ranks[0] != ranks[1]:
+        winner = 0 if ranks[0] > ranks[1] else 1
+    else:
+        rank = ranks[0]
+        winner = next(seat % 2 for seat in order if table[seat][rank % 5] >= rank // 5 + 7)
+    other = 1 - winner
+
+    choice = None  # (winner から見た値, (レベル, ストレイン, ダブル, ディクレアラー, ディクレアラー側の点))
+    for rank in range(ranks[other] + 1, 35):
+        level, strain = rank // 5 + 1, rank % 5
+        tricks, seat = best[winner, strain]
+        if tricks < level + 6:
+            continue
+        made = declarer_score(level, strain, 0, vul[winner], tricks)
+        value, result = made, (level, strain, 0, seat, made)
+        for save_strain in range(5):
+            save_level = level if save_strain > strain else level + 1
+            if save_level > 7:
+                continue
+            save_tricks, save_seat = best[other, save_strain]
+            penalty = -declarer_score(save_level, save_strain, 1, vul[other], save_tricks)
+            if penalty < value:
+                value, result = penalty, (save_level, save_strain, 1, save_seat, -penalty)
+        if choice is None or value > choice[0]:
+            choice = (value, result)
+    level, strain, doubled, seat, declarer_points = choice[1]
+    ns_score = declarer_points if seat % 2 == 0 else -declarer_points
+    return Par(ns_score, level, strain, doubled, SEATS[seat])
+
+
+# --- キャッシュ ---
+
+_default_cache: Optional[DecisionCache] = None
+_default_lock = threading.Lock()
+
+
+def get_table_cache() -> DecisionCache:
+    """プロセス内で共有する表のキャッシュ（ディールの正規化ハッシュ -> 表）"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = DecisionCache(max_size=65536, db_path=os.getenv('BRIDGE_DD_CACHE_DB') or None)
+        return _default_cache
+
+
+def cached_table(hands: Sequence[int], cache: Optional[DecisionCache] = None) -> DDTable:
+    """キャッシュ越しに表を求める（なければ解いて入れる）"""
+    cache = cache or get_table_cache()
+    key = table_key(hands)
+    table = cache.get(key)
+    if table is None:
+        table = dd_table(hands)
+        cache.put(key, table)
+    return table
+
+
+# --- バッチ ---
+
+def iter_tables(deals: Iterable[Sequence[int]], workers: int = 1,
+                cache: Optional[DecisionCache] = None) -> Iterator[Tuple[List[int], DDTable]]:
+    """ディールごとの (ハンド, 表) を入力順に逐次返す
+
+    キャッシュにあるものはそのまま返し、ないものだけを workers 個のプロセスで解く（結果はこのプロセスで
+    キャッシュに入れる）。投入数は workers の数倍までに抑える。
+    """
+    cache = cache or get_table_cache()
+    deals = iter(deals)
+    if workers <= 1:
+        for hands in deals:
+            yield list(hands), cached_table(hands, cache)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        def submit(hands) -> Tuple[List[int], str, object]:
+            hands = list(hands)
+            key = table_key(hands)
+            table = cache.get(key)
+            return hands, key, table if table is not None else pool.submit(dd_table, hands)
+
+        pending = deque(submit(hands) for hands in islice(deals, workers * 4))
+        while pending:
+            hands, key, result = pending.popleft()
+            if isinstance(result, Future):
+                result = result.result()
+                cache.put(key, result)
+            following = next(deals, None)
+            if following is not None:
+                pending.append(submit(following))
+            yield hands, result
+
+
+# --- UI からのバックグラウンド分析 ---
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_running: Dict[str, Future] = {}
+
+
+def start_analysis(hands: Sequence[int]) -> str:
+    """表の計算をバックグラウンドのプロセスで始め（キャッシュにあれば何もしない）、キャッシュのキーを返す"""
+    global _pool
+    key = table_key(hands)
+    with _pool_lock:
+        if key in _running or get_table_cache().get(key) is not None:
+            return key
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=1)
+        _running[key] = _pool.submit(dd_table, list(hands))
+    return key
+
+
+def lookup(key: str) -> Optional[DDTable]:
+    """start_analysis の結果（まだなら None）"""
+    with _pool_lock:
+        future = _running.get(key)
+        if future is not None and future.done():
+            del _running[key]
+            get_table_cache().put(key, future.result())
+    return get_table_cache().get(key)
+
+
+# --- 表示と CLI ---
+
+def format_table(table: DDTable) -> List[Dict[str, object]]:
+    """表を行（ディクレアラー）ごとの dict にする（st.table や JSON 用）"""
+    return [dict([('Declarer', seat)] + [(strain, table[SEAT_INDEX[seat]][i]) for i, strain in enumerate(STRAINS)])
+            for seat in ('North', 'South', 'East', 'West')]
+
+
+def _board_records(args) -> Iterator[Dict]:
+    """simulate と同じボードを対局し、配札と結果を返す"""
+    from simulate import AUCTION_STRATEGIES, PLAY_STRATEGIES, play_board
+    for board in range(args.first_board, args.first_board + args.boards):
+        result = play_board(board, args.seed, AUCTION_STRATEGIES[args.auction], PLAY_STRATEGIES[args.play])
+        yield {'board': board, 'hands': result['hands'], 'dealer': result['dealer'],
+               'vulnerable': {'NS': False, 'EW': False}, 'contract': result['contract'],
+               'declarer': result['declarer'], 'ns_score': result['ns_score'] - result['ew_score']}
+
+
+def _file_records(paths: Sequence[str]) -> Iterator[Dict]:
+    for path in paths:
+        if os.path.splitext(path)[1].lower() in ('.pbn', '.lin', '.bda'):
+            # ハンドレコード（結果があればパーと比べる）
+            for record in load_records(path):
+                row = {'hands': record.hands, 'dealer': record.dealer, 'vulnerable': record.vulnerable}
+                if record.contract is not None:
+                    row.update(board=record.board, ns_score=record.ns_score)
+                yield row
+            continue
+        with (sys.stdin if path == '-' else open(path, encoding='utf-8')) as f:
+            for line in f:
+                if line.strip() and (line.startswith('[Deal') or ':' in line[:2]):
+                    yield {'hands': parse_pbn_deal(line), 'dealer': 'North',
+                           'vulnerable': {'NS': False, 'EW': False}}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Double-dummy tables and par for deals')
+    parser.add_argument('files', nargs='*', help="PBN deal strings, one per line ('-' for stdin), or .pbn / .lin / .bda board files")
+    parser.add_argument('--boards', type=int, default=0, help='play this many simulate boards and compare with par')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--first-board', type=int, default=1)
+    parser.add_argument('--auction', default='rules')
+    parser.add_argument('--play', default='heuristic')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes (0 = all cores)')
+    parser.add_argument('--out', help='write one JSON line per deal to this file')
+    args = parser.parse_args(argv)
+    if not args.files and not args.boards:
+        parser.error('give deal files or --boards')
+
+    workers = args.workers or os.cpu_count() or 1
+    records = list(_file_records(args.files)) if args.files else list(_board_records(args))
+    started = time.perf_counter()
+    out = open(args.out, 'w', encoding='utf-8') if args.out else None
+    deltas = []
+    try:
+        for record, (hands, table) in zip(records, iter_tables((r['hands'] for r in records), workers)):
+            result = par(table, record['vulnerable'], record['dealer'])
+            row = {'deal': format_pbn_deal(hands), 'hash': deal_hash(hands), 'table': table,
+                   'par': {'contract': result.contract, 'ns_score': result.score}}
+            line = f"{row['deal']}  par {result.contract} {result.score:+}"
+            if 'ns_score' in record:
+                delta = record['ns_score'] - result.score
+                deltas.append(delta)
+                row.update(board=record['board'], ns_score=record['ns_score'], vs_par=delta)
+                line = f"board {record['board']:>4} {line}  result {record['ns_score']:+} ({delta:+} vs par)"
+            print(line, flush=True)
+            if out:
+                out.write(json.dumps(row, ensure_ascii=False) + '\n')
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - started
+    summary = f"deals={len(records)} elapsed={elapsed:.1f}s cache={get_table_cache().stats()['hits']} hits"
+    if deltas:
+        summary += f" NS vs par: mean {sum(deltas) / len(deltas):+.1f} mean abs {sum(map(abs, deltas)) / len(deltas):.1f}"
+    print(summary)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,633 @@
+"""ボードの記録とバイナリ・アーカイブ（PBN / LIN の入出力つき）
+
+1ボード（配札・オークション・プレイ・結果）を `BoardRecord` にまとめ、固定長 128 バイトの
+レコードとしてファイルに追記する。読み出しは `np.memmap` なので、何百万ボードでも
+パースせずに列（スコア・コントラクトなど）をそのまま走査できる。
+
+レコード（リトルエンディアン、`RECORD_DTYPE`）:
+- deal: 13 バイト（カードごとに持ち主の座席番号を2ビット。`cards.encode_deal`）
+- board, flags（ディーラー・バルネラビリティ・結果の有無・コールの切り詰め）, contract（レベル・ストレイン・ダブル）,
+  declarer, tricks（ディクレアラー側のトリック）, ns_score
+- calls: オークションのコード（`auction.py` の 0..37）を最大 48 個、plays: プレイ順のカードを最大 52 枚
+  （プレイした座席は配札から分かるので持たない。クレームで終わったボードは途中まで）
+- 48 コールより長い（合法な）オークションは先頭の 48 個だけを持ち、flags の bit 5 を立てる。
+  コントラクトと結果はそのまま残るので、集計には使えるがオークションの最後までは再生できない
+
+ファイルの先頭には 16 バイトのヘッダ（マジック・バージョン・レコード長）がある。書き込みは1プロセスから。
+
+外部のハンドレコードは PBN / LIN から `BoardRecord` にし、`to_game` で `BridgeGame` に読み込んで
+リプレイや分析に使える:
+
+    python deal_archive.py convert boards.pbn boards.bda   # 拡張子で形式を決める（.pbn / .lin / .bda）
+    python deal_archive.py info boards.bda
+"""
+import argparse
+import os
+import re
+import threading
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, TextIO, Tuple
+
+import numpy as np
+
+from auction import CALLS, AuctionState, bid_code, call_code
+from cards import CARDS, DEAL_BYTES, RANKS, SUIT_CODES, SUITS, decode_deal, encode_deal, rank_deal, trick_winner_index
+from scoring import STRAINS, declarer_score
+from solver import SEATS, SEAT_INDEX
+
+MAX_CALLS = 48
+RECORD_SIZE = 128
+MAGIC = b'BRDA'
+VERSION = 1
+HEADER_SIZE = 16
+NO_SEAT = 255
+
+RECORD_DTYPE = np.dtype([
+    ('deal', 'u1', DEAL_BYTES),
+    ('board', '<u4'),
+    ('flags', 'u1'),        # bit 0-1: ディーラー, bit 2: NS バル, bit 3: EW バル, bit 4: 結果あり, bit 5: calls が途中まで
+    ('contract', 'u1'),     # bit 0-2: レベル（0 はパスアウト）, bit 3-5: ストレイン, bit 6-7: ダブル
+    ('declarer', 'u1'),     # 座席番号（なければ 255）
+    ('tricks', 'u1'),       # ディクレアラー側のトリック数
+    ('ns_score', '<i2'),
+    ('n_calls', 'u1'),
+    ('n_plays', 'u1'),
+    ('calls', 'u1', MAX_CALLS),
+    ('plays', 'u1', 52),
+    ('reserved', 'u1', 3),
+])
+assert RECORD_DTYPE.itemsize == RECORD_SIZE
+
+# (レベル, ストレインのインデックス, ダブル状態, ディクレアラー)。パスアウトは (0, 0, 0, None)
+Contract = Tuple[int, int, int, Optional[str]]
+PASSED_OUT: Contract = (0, 0, 0, None)
+
+
+class BoardRecord(NamedTuple):
+    """1ボードの記録（contract が None なら結果は不明で、tricks と ns_score は 0）"""
+    hands: List[int]                 # 配られたときのハンド（座席順のマスク）
+    dealer: str
+    vulnerable: Dict[str, bool]
+    auction: List[int]               # オークションのコード
+    plays: List[int]                 # プレイ順のカードのビット位置
+    contract: Optional[Contract]
+    tricks: int
+    ns_score: int
+    board: int = 0
+    auction_truncated: bool = False  # アーカイブに入りきらず auction が途中まで（contract は最後のもの）
+
+    @property
+    def deal_number(self) -> int:
+        """配札のディール番号（`cards.rank_deal`、96 ビット）"""
+        return rank_deal(self.hands)
+
+    @property
+    def contract_text(self) -> str:
+        if self.contract is None:
+            return ''
+        level, strain, doubled, declarer = self.contract
+        if level == 0:
+            return "Pass Out"
+        return f"{level}{STRAINS[strain]}{'x' * doubled} by {declarer}"
+
+
+def contract_from_auction(dealer: str, auction: Sequence[int]) -> Optional[Contract]:
+    """終わったオークションからコントラクト（終わっていなければ None）"""
+    state = AuctionState(dealer)
+    for code in auction:
+        state.apply(code)
+    if not state.finished:
+        return None
+    contract = state.contract()
+    if contract is None:
+        return PASSED_OUT
+    level, strain, doubled, seat = contract
+    return level, STRAINS.index(strain), doubled, SEATS[seat]
+
+
+def score_for(contract: Optional[Contract], vulnerable: Dict[str, bool], tricks: int) -> int:
+    """NS から見た点数"""
+    if contract is None or contract[0] == 0:
+        return 0
+    level, strain, doubled, declarer = contract
+    side = 'NS' if declarer in ('North', 'South') else 'EW'
+    score = declarer_score(level, strain, doubled, vulnerable[side], tricks)
+    return score if side == 'NS' else -score
+
+
+def trick_leaders(hands: Sequence[int], contract: Contract, plays: Sequence[int]) -> Tuple[List[int], int]:
+    """各トリックのリーダーの座席番号（最後の未完のトリックを含む）と、ディクレアラー側が取ったトリック数"""
+    owners = {idx: seat for seat in range(4) for idx in range(52) if hands[seat] >> idx & 1}
+    _, strain, _, declarer = contract
+    trump = STRAINS[strain] if strain < 4 else None
+    leader = (SEAT_INDEX[declarer] + 1) % 4
+    leaders, won = [leader], 0
+    for start in range(0, len(plays) - len(plays) % 4, 4):
+        trick = plays[start:start + 4]
+        mask = sum(1 << idx for idx in trick)
+        winner = owners[trick_winner_index(mask, CARDS[trick[0]].suit, trump)]
+        won += winner % 2 == SEAT_INDEX[declarer] % 2
+        leader = winner
+        leaders.append(leader)
+    return leaders, won
+
+
+def record_from_game(game, board: Optional[int] = None) -> BoardRecord:
+    """終わった（または進行中の）BridgeGame の今のボード"""
+    auction = [call_code(call) for call in game.auction_history]
+    plays = [play['card'].index for trick in game.tricks for play in trick['cards']]
+    plays += [play['card'].index for play in game.current_trick]
+    contract = contract_from_auction(game.dealer, auction)
+    tricks = 0
+    if contract is not None and contract[0]:
+        tricks = game.tricks_won[game.get_partnership(contract[3])]
+    return BoardRecord(game.deal_masks(), game.dealer, dict(game.vulnerable), auction, plays, contract,
+                       tricks, score_for(contract, game.vulnerable, tricks),
+                       game.current_round if board is None else board)
+
+
+def to_game(record: BoardRecord, calls: Optional[int] = None, plays: Optional[int] = None):
+    """記録を BridgeGame に読み込む（calls / plays を渡すとそこまで進めた局面、None なら最後まで）
+
+    auction_truncated の記録は残っているコールまでしか進まない（オークションの途中の局面になる）。
+    """
+    from game import BridgeGame
+    from cards import Hand
+
+    game = BridgeGame(use_gemini=False)
+    game.partnerships = {'NS': ['North', 'South'], 'EW': ['East', 'West']}
+    game.dealer = record.dealer
+    game.vulnerable = dict(record.vulnerable)
+    game.current_round = record.board or 1
+    for seat, mask in zip(SEATS, record.hands):
+        game.players[seat] = Hand(mask=mask)
+    game.start_auction()
+    for code in record.auction[:calls]:
+        game.make_auction_call(dict(CALLS[code]))
+    if game.game_phase != 'play':
+        return game
+    for idx in record.plays[:plays]:
+        player = game.get_current_player()
+        card = CARDS[idx]
+        if card not in game.get_valid_cards(player):
+            raise ValueError(f"{card} is not a legal play for {player}")
+        game.play_card(player, card)
+        if len(game.current_trick) == 4:
+            game.complete_trick()
+    return game
+
+
+# --- バイナリ・アーカイブ ---
+
+def pack(record: BoardRecord) -> np.ndarray:
+    """BoardRecord -> 1件分の構造化配列（MAX_CALLS を超えるオークションは先頭だけを持ち、フラグを立てる）"""
+    calls = record.auction[:MAX_CALLS]
+    truncated = record.auction_truncated or len(record.auction) > MAX_CALLS
+    row = np.zeros((), dtype=RECORD_DTYPE)
+    row['deal'] = np.frombuffer(encode_deal(record.hands), dtype=np.uint8)
+    row['board'] = record.board
+    row['flags'] = (SEAT_INDEX[record.dealer] | record.vulnerable['NS'] << 2 | record.vulnerable['EW'] << 3
+                    | (record.contract is not None) << 4 | truncated << 5)
+    level, strain, doubled, declarer = record.contract or PASSED_OUT
+    row['contract'] = level | strain << 3 | doubled << 6
+    row['declarer'] = SEAT_INDEX[declarer] if declarer else NO_SEAT
+    row['tricks'] = record.tricks
+    row['ns_score'] = record.ns_score
+    row['n_calls'] = len(calls)
+    row['n_plays'] = len(record.plays)
+    row['calls'][:len(calls)] = calls
+    row['plays'][:len(record.plays)] = record.plays
+    return row
+
+
+def unpack(row) -> BoardRecord:
+    """1件分の構造化配列（memmap の行でもよい）-> BoardRecord"""
+    flags = int(row['flags'])
+    contract = None
+    if flags & 16:
+        code = int(row['contract'])
+        declarer = int(row['declarer'])
+        contract = (code & 7, code >> 3 & 7, code >> 6, SEATS[declarer] if declarer != NO_SEAT else None)
+    return BoardRecord(
+        hands=decode_deal(bytes(row['deal'])),
+        dealer=SEATS[flags & 3],
+        vulnerable={'NS': bool(flags & 4), 'EW': bool(flags & 8)},
+        auction=[int(code) for code in row['calls'][:int(row['n_calls'])]],
+        plays=[int(idx) for idx in row['plays'][:int(row['n_plays'])]],
+        contract=contract,
+        tricks=int(row['tricks']),
+        ns_score=int(row['ns_score']),
+        board=int(row['board']),
+        auction_truncated=bool(flags & 32),
+    )
+
+
+def _header() -> bytes:
+    return MAGIC + VERSION.to_bytes(2, 'little') + RECORD_SIZE.to_bytes(2, 'little') + bytes(8)
+
+
+class DealArchive:
+    """固定長レコードのアーカイブ（読み出しは memmap、追記はファイル末尾への書き込み）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._map: Optional[np.ndarray] = None
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, 'wb') as f:
+                f.write(_header())
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        if header[:4] != MAGIC or int.from_bytes(header[6:8], 'little') != RECORD_SIZE:
+            raise ValueError(f"{path} is not a deal archive")
+
+    def __len__(self) -> int:
+        return (os.path.getsize(self.path) - HEADER_SIZE) // RECORD_SIZE
+
+    @property
+    def records(self) -> np.ndarray:
+        """全レコードの構造化配列（memmap。ファイルが伸びていれば張り直す）"""
+        with self._lock:
+            count = len(self)
+            if self._map is None or len(self._map) != count:
+                if count == 0:
+                    return np.zeros(0, dtype=RECORD_DTYPE)
+                self._map = np.memmap(self.path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,))
+            return self._map
+
+    def __getitem__(self, i: int) -> BoardRecord:
+        return unpack(self.records[i])
+
+    def __iter__(self) -> Iterator[BoardRecord]:
+        records = self.records
+        for i in range(len(records)):
+            yield unpack(records[i])
+
+    def extend(self, records: Iterable[BoardRecord]):
+        rows = [pack(record) for record in records]
+        if not rows:
+            return
+        with self._lock, open(self.path, 'ab') as f:
+            f.write(np.stack(rows).tobytes())
+
+    def append(self, record: BoardRecord):
+        self.extend([record])
+
+
+# --- PBN ---
+
+_PBN_SEATS = {'N': 'North', 'E': 'East', 'S': 'South', 'W': 'West'}
+_SEAT_LETTERS = {seat: letter for letter, seat in _PBN_SEATS.items()}
+_PBN_ORDER = ['North', 'East', 'South', 'West']
+_RANK_LETTERS = ['T' if rank == '10' else rank for rank in RANKS]
+_SUIT_LETTERS = {'S': '♠', 'H': '♥', 'D': '♦', 'C': '♣'}
+_STRAIN_LETTERS = ['C', 'D', 'H', 'S', 'NT']
+_VULNERABLE = {'None': (False, False), 'Love': (False, False), '-': (False, False), 'NS': (True, False),
+               'EW': (False, True), 'All': (True, True), 'Both': (True, True)}
+
+
+def _holding(mask: int, suit: str) -> str:
+    code = SUIT_CODES[suit]
+    return ''.join(_RANK_LETTERS[i] for i in range(12, -1, -1) if mask >> (code * 13 + i) & 1)
+
+
+def _card_index(text: str) -> int:
+    """'SA' / 'h10' / 'DT' -> ビット位置"""
+    text = text.upper().replace('10', 'T')
+    return SUIT_CODES[_SUIT_LETTERS[text[0]]] * 13 + _RANK_LETTERS.index(text[1])
+
+
+def _card_text(idx: int) -> str:
+    card = CARDS[idx]
+    letter = next(letter for letter, suit in _SUIT_LETTERS.items() if suit == card.suit)
+    return letter + _RANK_LETTERS[RANKS.index(card.rank)]
+
+
+def parse_pbn_deal(text: str) -> List[int]:
+    """PBN の Deal 文字列（'N:AKQ.T98.. ...'、座席から時計回り、スートは ♠.♥.♦.♣）-> 座席順のマスク"""
+    text = text.strip()
+    if text.startswith('[Deal'):
+        text = text.split('"')[1]
+    first, _, body = text.partition(':')
+    start = _PBN_ORDER.index(_PBN_SEATS[first.strip().upper()])
+    hands = [0, 0, 0, 0]
+    for offset, hand in enumerate(body.split()):
+        seat = SEAT_INDEX[_PBN_ORDER[(start + offset) % 4]]
+        for suit, holding in zip(SUITS, hand.split('.')):
+            for rank in holding.upper():
+                hands[seat] |= 1 << (SUIT_CODES[suit] * 13 + _RANK_LETTERS.index(rank))
+    encode_deal(hands)  # 52枚をちょうど分けているか確かめる
+    return hands
+
+
+def format_pbn_deal(hands: Sequence[int]) -> str:
+    """座席順のマスク -> PBN の Deal 文字列（North から）"""
+    return 'N:' + ' '.join('.'.join(_holding(hands[SEAT_INDEX[seat]], suit) for suit in SUITS)
+                           for seat in _PBN_ORDER)
+
+
+def _call_text(code: int) -> str:
+    call = CALLS[code]
+    if call['type'] == 'bid':
+        return f"{call['level']}{_STRAIN_LETTERS[STRAINS.index(call['suit'])]}"
+    return {'pass': 'Pass', 'double': 'X', 'redouble': 'XX'}[call['type']]
+
+
+def _parse_call(token: str) -> Optional[int]:
+    token = token.upper().rstrip('!')
+    if token in ('PASS', 'P'):
+        return call_code({'type': 'pass'})
+    if token in ('X', 'D', 'DBL'):
+        return call_code({'type': 'double'})
+    if token in ('XX', 'R', 'RDBL'):
+        return call_code({'type': 'redouble'})
+    match = re.fullmatch(r'([1-7])(NT|N|C|D|H|S)', token)
+    if match is None:
+        return None
+    strain = 4 if match.group(2) in ('NT', 'N') else _STRAIN_LETTERS.index(match.group(2))
+    return bid_code(int(match.group(1)), strain)
+
+
+def to_pbn(record: BoardRecord, event: str = 'Contract Bridge') -> str:
+    """1ボードの PBN（タグとオークション・プレイのセクション）"""
+    vul = {(False, False): 'None', (True, False): 'NS', (False, True): 'EW', (True, True): 'All'}[
+        (record.vulnerable['NS'], record.vulnerable['EW'])]
+    lines = [f'[Event "{event}"]', f'[Board "{record.board}"]', f'[Dealer "{_SEAT_LETTERS[record.dealer]}"]',
+             f'[Vulnerable "{vul}"]', f'[Deal "{format_pbn_deal(record.hands)}"]']
+    contract = record.contract
+    if contract is not None:
+        level, strain, doubled, declarer = contract
+        if level == 0:
+            lines += ['[Declarer ""]', '[Contract "Pass"]', '[Result ""]']
+        else:
+            lines += [f'[Declarer "{_SEAT_LETTERS[declarer]}"]',
+                      f'[Contract "{level}{_STRAIN_LETTERS[strain]}{"X" * doubled}"]',
+                      f'[Result "{record.tricks}"]']
+        lines.append(f'[Score "NS {record.ns_score}"]')
+    if record.auction:
+        lines.append(f'[Auction "{_SEAT_LETTERS[record.dealer]}"]')
+        calls = [_call_text(code) for code in record.auction]
+        lines += [' '.join(calls[i:i + 4]) for i in range(0, len(calls), 4)]
+    if contract is not None and contract[0] and record.plays:
+        # 各行は1トリックで、列はオープニング・リーダーから時計回りの座席順
+        leaders, _ = trick_leaders(record.hands, contract, record.plays)
+        first = leaders[0]
+        lines.append(f'[Play "{_SEAT_LETTERS[SEATS[first]]}"]')
+        owners = {idx: seat for seat in range(4) for idx in range(52) if record.hands[seat] >> idx & 1}
+        for start in range(0, len(record.plays), 4):
+            by_seat = {owners[idx]: _card_text(idx) for idx in record.plays[start:start + 4]}
+            lines.append(' '.join(by_seat.get((first + k) % 4, '-') for k in range(4)))
+        lines.append('*')
+    return '\n'.join(lines) + '\n'
+
+
+def write_pbn(records: Iterable[BoardRecord], f: TextIO, event: str = 'Contract Bridge'):
+    f.write('% PBN 2.1\n% EXPORT\n\n')
+    for record in records:
+        f.write(to_pbn(record, event) + '\n')
+
+
+_TAG = re.compile(r'\[(\w+)\s+"([^"]*)"\]')
+
+
+def _pbn_games(f: TextIO) -> Iterator[List[Tuple[str, str, List[str]]]]:
+    """PBN をゲームごとの [(タグ, 値, 続くセクションのトークン)] に分ける"""
+    game: List[Tuple[str, str, List[str]]] = []
+    in_comment = False
+    for line in f:
+        line = line.strip()
+        if in_comment:
+            in_comment = '}' not in line
+            line = line.split('}', 1)[1] if not in_comment else ''
+        if '{' in line:
+            head, _, rest = line.partition('{')
+            in_comment = '}' not in rest
+            line = head + (rest.split('}', 1)[1] if not in_comment else '')
+        if line.startswith('%'):
+            continue
+        if not line:
+            if game:
+                yield game
+                game = []
+            continue
+        match = _TAG.match(line)
+        if match:
+            game.append((match.group(1), match.group(2), []))
+        elif game:
+            game[-1][2].extend(token for token in line.split() if not token.startswith(('=', '$')))
+    if game:
+        yield game
+
+
+def read_pbn(f: TextIO) -> Iterator[BoardRecord]:
+    """PBN のゲームを順に BoardRecord にする（Deal のないゲームは飛ばす）"""
+    for game in _pbn_games(f):
+        tags = {name: value for name, value, _ in game}
+        sections = {name: tokens for name, _, tokens in game}
+        if not tags.get('Deal'):
+            continue
+        hands = parse_pbn_deal(tags['Deal'])
+        dealer = _PBN_SEATS.get(tags.get('Dealer', 'N')[:1].upper(), 'North')
+        ns_vul, ew_vul = _VULNERABLE.get(tags.get('Vulnerable', 'None'), (False, False))
+        vulnerable = {'NS': ns_vul, 'EW': ew_vul}
+
+        auction: List[int] = []
+        state = AuctionState(dealer)
+        for token in sections.get('Auction', []):
+            if token == '*':
+                break
+            if token.upper() == 'AP':
+                while not state.finished:
+                    state.apply(call_code({'type': 'pass'}))
+                    auction.append(call_code({'type': 'pass'}))
+                break
+            code = _parse_call(token)
+            if code is not None and not state.finished:
+                state.apply(code)
+                auction.append(code)
+
+        contract = contract_from_auction(dealer, auction) if state.finished else None
+        text = tags.get('Contract', '').upper().lstrip('^')
+        if contract is None and text:
+            if text == 'PASS':
+                contract = PASSED_OUT
+            else:
+                match = re.fullmatch(r'([1-7])(NT|N|C|D|H|S)(X{0,2})', text)
+                declarer = _PBN_SEATS.get(tags.get('Declarer', '').lstrip('^')[:1].upper())
+                if match and declarer:
+                    strain = 4 if match.group(2) in ('NT', 'N') else _STRAIN_LETTERS.index(match.group(2))
+                    contract = (int(match.group(1)), strain, len(match.group(3)), declarer)
+
+        plays: List[int] = []
+        if contract is not None and contract[0] and 'Play' in tags:
+            plays = _pbn_plays(hands, contract, tags['Play'], sections.get('Play', []))
+        tricks = 0
+        if contract is not None and contract[0]:
+            result = tags.get('Result', '')
+            tricks = int(result) if result.isdigit() else trick_leaders(hands, contract, plays)[1]
+        board = int(tags['Board']) if tags.get('Board', '').isdigit() else 0
+        yield BoardRecord(hands, dealer, vulnerable, auction, plays, contract, tricks,
+                          score_for(contract, vulnerable, tricks), board)
+
+
+def _pbn_plays(hands: Sequence[int], contract: Contract, first: str, tokens: List[str]) -> List[int]:
+    """PBN の Play セクション（列は最初のリーダーからの座席順）-> プレイ順のカード"""
+    first_seat = SEAT_INDEX[_PBN_SEATS[first[:1].upper()]]
+    plays: List[int] = []
+    for start in range(0, len(tokens), 4):
+        row = tokens[start:start + 4]
+        if '*' in row:
+            row = row[:row.index('*')]
+        by_seat = {(first_seat + k) % 4: token for k, token in enumerate(row) if token != '-'}
+        leaders, _ = trick_leaders(hands, contract, plays)
+        leader = leaders[-1]
+        for k in range(4):
+            token = by_seat.get((leader + k) % 4)
+            if token is None:
+                return plays
+            plays.append(_card_index(token))
+        if len(row) < 4:
+            break
+    return plays
+
+
+# --- LIN（BBO のハンドレコード。1行1ボード） ---
+
+_LIN_DEALER = {'1': 'South', '2': 'West', '3': 'North', '4': 'East'}
+_LIN_VUL = {'o': (False, False), '0': (False, False), '-': (False, False), 'n': (True, False),
+            'e': (False, True), 'b': (True, True)}
+
+
+def to_lin(record: BoardRecord) -> str:
+    """1ボードの LIN（md の手は South, West, North, East の順）"""
+    dealer_digit = next(digit for digit, seat in _LIN_DEALER.items() if seat == record.dealer)
+    hands = ','.join(''.join(letter + _holding(record.hands[SEAT_INDEX[seat]], suit)
+                             for letter, suit in _SUIT_LETTERS.items())
+                     for seat in ('South', 'West', 'North', 'East'))
+    vul = {(False, False): 'o', (True, False): 'n', (False, True): 'e', (True, True): 'b'}[
+        (record.vulnerable['NS'], record.vulnerable['EW'])]
+    parts = [f"pn|South,West,North,East|st||md|{dealer_digit}{hands}|rh||ah|Board {record.board}|sv|{vul}|"]
+    for code in record.auction:
+        call = CALLS[code]
+        text = {'pass': 'p', 'double': 'd', 'redouble': 'r'}.get(call['type'])
+        if text is None:
+            text = f"{call['level']}{'N' if call['suit'] == 'NT' else _STRAIN_LETTERS[STRAINS.index(call['suit'])]}"
+        parts.append(f"mb|{text}|")
+    parts += [f"pc|{_card_text(idx)}|" for idx in record.plays]
+    if record.contract is not None and record.contract[0] and len(record.plays) < 52:
+        parts.append(f"mc|{record.tricks}|")
+    return ''.join(parts)
+
+
+def from_lin(line: str) -> BoardRecord:
+    tokens = line.strip().split('|')
+    pairs = list(zip(tokens[0::2], tokens[1::2]))
+    hands, dealer, vulnerable, board, claim = None, 'South', {'NS': False, 'EW': False}, 0, None
+    auction: List[int] = []
+    plays: List[int] = []
+    for key, value in pairs:
+        key = key.strip().lower()
+        if key == 'md':
+            dealer = _LIN_DEALER.get(value[:1], 'South')
+            hands = [0, 0, 0, 0]
+            for seat, text in zip(('South', 'West', 'North', 'East'), value[1:].split(',')):
+                suit = None
+                for ch in text.upper():
+                    if ch in _SUIT_LETTERS:
+                        suit = _SUIT_LETTERS[ch]
+                    elif suit is not None:
+                        hands[SEAT_INDEX[seat]] |= 1 << (SUIT_CODES[suit] * 13 + _RANK_LETTERS.index(ch))
+            # 4人目が省略されていれば残りのカード
+            hands[SEAT_INDEX['East']] = ((1 << 52) - 1) & ~(hands[0] | hands[1] | hands[2])
+        elif key == 'sv':
+            ns_vul, ew_vul = _LIN_VUL.get(value[:1].lower(), (False, False))
+            vulnerable = {'NS': ns_vul, 'EW': ew_vul}
+        elif key == 'ah':
+            digits = re.findall(r'\d+', value)
+            board = int(digits[0]) if digits else 0
+        elif key == 'mb':
+            code = _parse_call(value)
+            if code is not None:
+                auction.append(code)
+        elif key == 'pc':
+            plays.append(_card_index(value))
+        elif key == 'mc':
+            claim = int(value)
+    if hands is None:
+        raise ValueError("LIN record has no md (deal)")
+    contract = contract_from_auction(dealer, auction)
+    tricks = 0
+    if contract is not None and contract[0]:
+        tricks = claim if claim is not None else trick_leaders(hands, contract, plays)[1]
+    return BoardRecord(hands, dealer, vulnerable, auction, plays, contract, tricks,
+                       score_for(contract, vulnerable, tricks), board)
+
+
+def read_lin(f: TextIO) -> Iterator[BoardRecord]:
+    for line in f:
+        if 'md|' in line:
+            yield from_lin(line)
+
+
+def write_lin(records: Iterable[BoardRecord], f: TextIO):
+    for record in records:
+        f.write(to_lin(record) + '\n')
+
+
+# --- 形式の自動判別と CLI ---
+
+def load_records(path: str) -> Iterator[BoardRecord]:
+    """拡張子（.pbn / .lin / それ以外はバイナリ・アーカイブ）で形式を決めて読む"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.pbn', '.lin'):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            yield from (read_pbn(f) if ext == '.pbn' else read_lin(f))
+    else:
+        yield from DealArchive(path)
+
+
+def save_records(path: str, records: Iterable[BoardRecord]):
+    """.pbn / .lin は書き直し、それ以外はバイナリ・アーカイブに追記する"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.pbn', '.lin'):
+        with open(path, 'w', encoding='utf-8') as f:
+            (write_pbn if ext == '.pbn' else write_lin)(records, f)
+    else:
+        DealArchive(path).extend(records)
+
+
+def summarize(records: np.ndarray) -> Dict[str, object]:
+    """アーカイブの列を走査した集計（レコードをデコードしない）"""
+    has_result = (records['flags'] & 16) != 0
+    played = has_result & ((records['contract'] & 7) > 0)
+    strains = (records['contract'] >> 3) & 7
+    return {
+        'boards': int(len(records)),
+        'with_result': int(has_result.sum()),
+        'passed_out': int((has_result & ~played).sum()),
+        'mean_ns_score': float(records['ns_score'][has_result].mean()) if has_result.any() else 0.0,
+        'contracts_by_strain': {STRAINS[i]: int((played & (strains == i)).sum()) for i in range(5)},
+        'mean_calls': float(records['n_calls'].mean()) if len(records) else 0.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Convert and inspect board records (.pbn / .lin / binary archive)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    convert = sub.add_parser('convert', help='convert between formats (chosen by extension)')
+    convert.add_argument('source')
+    convert.add_argument('target')
+    info = sub.add_parser('info', help='summarize a binary archive without decoding records')
+    info.add_argument('archive')
+    args = parser.parse_args(argv)
+
+    if args.command == 'convert':
+        records = list(load_records(args.source))
+        save_records(args.target, records)
+        print(f"{len(records)} boards: {args.source} -> {args.target}")
+    else:
+        archive = DealArchive(args.archive)
+        print(summarize(archive.records))
+
+
+if __name__ == '__main__':
+    main()
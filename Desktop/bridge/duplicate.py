@@ -0,0 +1,263 @@
+"""デュプリケート・トーナメント（マッチポイントと IMP）
+
+同じボード（配札はボード番号のシードで決まり、ディーラーとバルネラビリティはボード番号の標準）を
+何卓でも対局し、ボードごとに卓の NS の点数を比べてマッチポイント（MP）とクロス IMP をつける。
+配札の運を除いて AI の設定（エントリー = オークション戦略とプレイ戦略の組）を比べるためのもの。
+
+- 卓 t の NS / EW のエントリーは `schedule` で決まる（2エントリーなら卓ごとに向きを入れ替える）
+- ボード範囲を ProcessPoolExecutor に投げ、ボード順に受け取ってすぐ集計する。保持するのは
+  エントリーごとの合計（`Standings`）と投入中のチャンクだけなので、ボード数 × 卓数に比例したメモリは使わない
+- MP は1卓に勝つごとに1、引き分けで0.5（トップは卓数 - 1）。IMP は他の全卓との点差の IMP の平均
+
+    python duplicate.py -n 1000 --tables 8 --entrant rules:heuristic --entrant rules:random --workers 0
+    python duplicate.py -n 100 --tables 4 --entrant sim=simulation:heuristic --entrant rules=rules:heuristic
+"""
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from deal_archive import BoardRecord, DealArchive
+from game import BridgeGame
+from scoring import imps_batch
+from simulate import AUCTION_STRATEGIES, PLAY_STRATEGIES, board_seed
+
+
+class Entrant(NamedTuple):
+    """卓につく AI の設定（戦略は simulate の名前。ワーカーへ送るので関数ではなく名前で持つ）"""
+    name: str
+    auction: str = 'rules'
+    play: str = 'heuristic'
+
+
+def parse_entrant(spec: str) -> Entrant:
+    """'name=auction:play' か 'auction:play'（名前は省略するとそのまま）"""
+    name, _, strategies = spec.rpartition('=')
+    auction, _, play = strategies.partition(':')
+    entrant = Entrant(name or strategies, auction, play or 'heuristic')
+    if entrant.auction not in AUCTION_STRATEGIES or entrant.play not in PLAY_STRATEGIES:
+        raise ValueError(f"unknown strategy in {spec!r} (auction: {sorted(AUCTION_STRATEGIES)}, "
+                         f"play: {sorted(PLAY_STRATEGIES)})")
+    return entrant
+
+
+def schedule(num_entrants: int, tables: int) -> List[Tuple[int, int]]:
+    """卓ごとの (NS のエントリー, EW のエントリー)。エントリーが2つ以上なら同じエントリー同士は当たらない"""
+    pairs = []
+    for table in range(tables):
+        ns = table % num_entrants
+        if num_entrants == 1:
+            pairs.append((ns, ns))
+            continue
+        # 一巡するごとに相手を1つずらす（2エントリーなら NS/EW が交互になる）
+        offset = 1 + (table // num_entrants) % (num_entrants - 1)
+        pairs.append((ns, (ns + offset) % num_entrants))
+    return pairs
+
+
+# --- 1ボード・1卓の進行 ---
+
+def play_table(board: int, seed: int, ns: Entrant, ew: Entrant,
+               dd_time_limit: Optional[float] = None) -> BridgeGame:
+    """1卓で1ボードを最後まで進めたゲーム（配札は卓に依らずボード番号だけで決まる）"""
+    game = BridgeGame(use_gemini=False, seed=board_seed(seed, board), record_events=False)
+    game.duplicate = True
+    game.current_round = board
+    if dd_time_limit is not None:
+        game.dd_time_limit = dd_time_limit if dd_time_limit > 0 else None
+    game.determine_partnerships_and_dealer()
+    game.deal_cards()
+    game.start_auction()
+
+    def entrant_for(player: str) -> Entrant:
+        return ns if game.get_partnership(player) == 'NS' else ew
+
+    while game.game_phase == 'auction':
+        player = game.current_bidder
+        game.make_auction_call(AUCTION_STRATEGIES[entrant_for(player).auction](game, player))
+
+    while game.game_phase == 'play':
+        # ダミーの手はディクレアラーのエントリーが決める（同じサイドなので entrant_for で足りる）
+        player = game.get_current_player()
+        game.play_card(player, PLAY_STRATEGIES[entrant_for(player).play](game, player))
+        if len(game.current_trick) == 4:
+            game.complete_trick()
+    return game
+
+
+class BoardResult(NamedTuple):
+    board: int
+    ns_scores: np.ndarray                  # 卓ごとの NS の点数
+    records: Optional[List[BoardRecord]]   # keep_records のときだけ
+
+
+def _play_boards(first_board: int, count: int, seed: int, entrants: Sequence[Entrant],
+                 pairs: Sequence[Tuple[int, int]], dd_time_limit: Optional[float],
+                 keep_records: bool) -> List[BoardResult]:
+    """ワーカープロセスで実行する単位（連続したボード範囲 × 全卓）"""
+    results = []
+    for board in range(first_board, first_board + count):
+        scores = np.zeros(len(pairs), dtype=np.int32)
+        records = [] if keep_records else None
+        for table, (ns, ew) in enumerate(pairs):
+            game = play_table(board, seed, entrants[ns], entrants[ew], dd_time_limit)
+            record = game.board_records[-1]
+            scores[table] = record.ns_score
+            if records is not None:
+                records.append(record)
+        results.append(BoardResult(board, scores, records))
+    return results
+
+
+def iter_boards(num_boards: int, entrants: Sequence[Entrant], tables: int, seed: int = 0,
+                first_board: int = 1, dd_time_limit: Optional[float] = None, workers: int = 1,
+                chunk_size: Optional[int] = None, keep_records: bool = False) -> Iterator[BoardResult]:
+    """ボードごとの全卓の結果をボード順に逐次返す（投入中のチャンクは workers * 4 まで）"""
+    pairs = schedule(len(entrants), tables)
+    last_board = first_board + num_boards
+    if workers <= 1:
+        for board in range(first_board, last_board):
+            yield from _play_boards(board, 1, seed, entrants, pairs, dd_time_limit, keep_records)
+        return
+
+    if chunk_size is None:
+        chunk_size = max(1, min(64, num_boards // (workers * 8)))
+    starts = iter(range(first_board, last_board, chunk_size))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        def submit(start):
+            return pool.submit(_play_boards, start, min(chunk_size, last_board - start), seed,
+                               entrants, pairs, dd_time_limit, keep_records)
+
+        pending = deque(submit(start) for start in islice(starts, workers * 4))
+        while pending:
+            results = pending.popleft().result()
+            start = next(starts, None)
+            if start is not None:
+                pending.append(submit(start))
+            yield from results
+
+
+# --- 採点と集計 ---
+
+def score_board(ns_scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """1ボードの卓ごとの NS の (MP, IMP)。EW はそれぞれ (トップ - MP, -IMP)"""
+    scores = np.asarray(ns_scores, dtype=np.int64)
+    others = len(scores) - 1
+    if others <= 0:
+        return np.zeros(len(scores)), np.zeros(len(scores))
+    diff = scores[:, None] - scores[None, :]
+    mp = (diff > 0).sum(axis=1) + 0.5 * ((diff == 0).sum(axis=1) - 1)
+    cross = imps_batch(diff).sum(axis=1) / others
+    return mp, cross
+
+
+class Standings:
+    """エントリーごとの MP・IMP・点数の合計（ボードを1つずつ足していく）"""
+
+    def __init__(self, entrants: Sequence[Entrant], tables: int):
+        self.entrants = list(entrants)
+        self.pairs = np.array(schedule(len(entrants), tables), dtype=np.intp).reshape(-1, 2)
+        self.top = max(tables - 1, 0)
+        size = len(entrants)
+        self.boards = 0
+        self.played = np.zeros(size, dtype=np.int64)    # (ボード, 卓, サイド) の数
+        self.mp = np.zeros(size)
+        self.imps = np.zeros(size)
+        self.score = np.zeros(size, dtype=np.int64)     # 自分のサイドから見た点数の合計
+
+    def add(self, ns_scores: np.ndarray):
+        mp, cross = score_board(ns_scores)
+        ns, ew = self.pairs[:, 0], self.pairs[:, 1]
+        np.add.at(self.played, ns, 1)
+        np.add.at(self.played, ew, 1)
+        np.add.at(self.mp, ns, mp)
+        np.add.at(self.mp, ew, self.top - mp)
+        np.add.at(self.imps, ns, cross)
+        np.add.at(self.imps, ew, -cross)
+        np.add.at(self.score, ns, ns_scores)
+        np.add.at(self.score, ew, -np.asarray(ns_scores, dtype=np.int64))
+        self.boards += 1
+
+    def table(self) -> List[Dict[str, object]]:
+        """MP の割合の高い順"""
+        rows = []
+        for i, entrant in enumerate(self.entrants):
+            played = int(self.played[i])
+            rows.append({
+                'entrant': entrant.name,
+                'auction': entrant.auction,
+                'play': entrant.play,
+                'boards': played,
+                'mp_pct': 100.0 * self.mp[i] / (played * self.top) if played and self.top else 50.0,
+                'imps_per_board': float(self.imps[i] / played) if played else 0.0,
+                'score_per_board': float(self.score[i] / played) if played else 0.0,
+            })
+        return sorted(rows, key=lambda row: -row['mp_pct'])
+
+
+def run_tournament(num_boards: int, entrants: Sequence[Entrant], tables: int, seed: int = 0,
+                   first_board: int = 1, dd_time_limit: Optional[float] = None, workers: int = 1,
+                   chunk_size: Optional[int] = None, archive: Optional[str] = None) -> Dict:
+    """num_boards ボード × tables 卓を対局して順位表を返す（archive を渡すと全卓の記録を追記する）"""
+    if tables < 2:
+        raise ValueError("a duplicate tournament needs at least 2 tables")
+    started = time.perf_counter()
+    standings = Standings(entrants, tables)
+    store = DealArchive(archive) if archive else None
+    for result in iter_boards(num_boards, entrants, tables, seed, first_board, dd_time_limit,
+                              workers, chunk_size, keep_records=store is not None):
+        standings.add(result.ns_scores)
+        if store is not None:
+            store.extend(result.records)
+    elapsed = time.perf_counter() - started
+    return {
+        'standings': standings.table(),
+        'boards': standings.boards,
+        'tables': tables,
+        'elapsed': elapsed,
+        'boards_per_sec': standings.boards / elapsed if elapsed > 0 else float('inf'),
+    }
+
+
+def format_standings(summary: Dict) -> str:
+    lines = [f"{'entrant':<24} {'auction':<11} {'play':<13} {'MP%':>6} {'IMP/b':>7} {'score/b':>8}"]
+    for row in summary['standings']:
+        lines.append(f"{row['entrant']:<24} {row['auction']:<11} {row['play']:<13} {row['mp_pct']:>6.2f} "
+                     f"{row['imps_per_board']:>+7.2f} {row['score_per_board']:>+8.1f}")
+    lines.append(f"boards={summary['boards']} tables={summary['tables']} elapsed={summary['elapsed']:.1f}s "
+                 f"boards/sec={summary['boards_per_sec']:.2f}")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Duplicate tournament with matchpoint and IMP scoring')
+    parser.add_argument('-n', '--boards', type=int, default=32)
+    parser.add_argument('--tables', type=int, default=4)
+    parser.add_argument('--entrant', action='append', default=[],
+                        help="[name=]auction:play, e.g. rules:heuristic (repeat; default rules:heuristic and rules:random)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--first-board', type=int, default=1)
+    parser.add_argument('--dd-time-limit', type=float, default=None,
+                        help="seconds per card for dd play (0 = no limit)")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes (0 = all cores)")
+    parser.add_argument('--chunk-size', type=int, default=None)
+    parser.add_argument('--archive', help="append every table's board record to this binary deal archive")
+    args = parser.parse_args(argv)
+
+    try:
+        entrants = [parse_entrant(spec) for spec in args.entrant or ['rules:heuristic', 'rules:random']]
+    except ValueError as e:
+        parser.error(str(e))
+    workers = args.workers or os.cpu_count() or 1
+    summary = run_tournament(args.boards, entrants, args.tables, args.seed, args.first_board,
+                             args.dd_time_limit, workers, args.chunk_size, args.archive)
+    print(format_standings(summary))
+
+
+if __name__ == '__main__':
+    main()
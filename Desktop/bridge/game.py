@@ -0,0 +1,570 @@
+"""ゲームエンジン（Streamlit に依存しない）
+
+`BridgeGame` はオークション・プレイ・スコア計算の状態機械。UI（app.py）からも
+ヘッドレスのシミュレーション（simulate.py）からも同じように使える。
+"""
+import os
+import random
+import re
+from typing import List, Dict, Optional
+from ai_cache import decision_key, get_default_cache
+from auction import AuctionState, call_code
+from bid_simulation import choose_call_by_simulation
+from bidding import choose_call
+from cards import (Card, DECK, Hand, SUITS, RANKS, CARDS, NUM_DEALS, legal_mask, trick_winner_index, cards_from_mask,
+                   card_mask, unrank_deal)
+from deal_archive import DealArchive, record_from_game
+from game_log import GameLog, logged, replay_events
+from hand_features import HandFeatures
+from metrics import span, timed
+from model_pool import get_model_pool
+from prompts import DEFAULT_TOKEN_BUDGET, compile_for
+from scoring import board_dealer, board_vulnerability, declarer_score, split_score
+from single_dummy import choose_card as single_dummy_card, resolve_workers
+from solver import DoubleDummySolver, SolverTimeout, SEATS, SEAT_INDEX, hands_from_game, trump_code
+
+# 対局の進行ではなく設定の属性（ログには記録しないので、ログの位置を移動・分岐しても今の値を保つ）
+SETTINGS = ('dd_time_limit', 'play_mode', 'sd_samples', 'sd_time_budget', 'sd_workers', 'sd_objective',
+            'bid_mode', 'bid_sim_samples', 'bid_sim_time_budget', 'model_timeout', 'prompt_token_budget',
+            'archive_path', 'table_id')
+
+
+class BridgeGame:
+    def __init__(self, use_gemini: bool = True, seed: Optional[int] = None, record_events: bool = True):
+        # ゲームの基本設定
+        self.suits = SUITS
+        self.ranks = RANKS
+        self.deck = []
+        self.deal_number = None  # 今のディールの番号（cards.unrank_deal で配札を再現できる）
+        self.rng = random.Random(seed)  # 配札とディーラー決定用（シード指定で再現可能）
+        # 各ハンドはビットマスク上の Hand ビュー（List[Card] と同じように扱える）
+        self.players = {'North': Hand(), 'South': Hand(), 'East': Hand(), 'West': Hand()}
+        # 席ごとのハンドの特徴量（配札時に作り、play_card で1枚ぶん更新する。hand_features で取り出す）
+        self.features: Dict[str, HandFeatures] = {}
+        
+        # ゲーム進行状態
+        self.game_phase = 'partnership'  # partnership -> deal -> auction -> play -> scoring
+        self.current_round = 1
+        self.max_rounds = 5
+        # デュプリケート: current_round をボード番号として、ディーラーとバルネラビリティをボード番号で決める
+        self.duplicate = False
+        
+        # パートナーシップとディーラー
+        self.partnerships = {}
+        self.dealer = None
+        
+        # オークション関連（合法手の判定とディクレアラーは auction_state がインクリメンタルに持つ）
+        self.auction_history = []
+        self.auction_state = AuctionState()
+        self.current_bidder = None
+        self.pass_count = 0
+        self.contract = None
+        self.declarer = None
+        self.dummy = None
+        self.trump_suit = None
+        self.contract_level = 0
+        self.doubled = 0  # 0: Undoubled, 1: Doubled, 2: Redoubled
+        
+        # プレイ関連
+        self.tricks = []
+        self.current_trick = []
+        self.trick_leader = None
+        self.tricks_won = {'NS': 0, 'EW': 0}
+        self.dummy_revealed = False
+        
+        # ダブルダミー・ソルバー（プレイフェーズごとに作り直す）
+        self.dd_solver = None
+        self.dd_total_ns = None  # 最善プレイ時に NS が取るこのディールの総トリック数
+        self.dd_time_limit = 0.5
+        # AI のカードプレイ: 'dd'（全員のハンドを見たダブルダミー）か 'single_dummy'（見えない手をサンプルする）
+        self.play_mode = 'dd'
+        self.sd_samples = 32
+        self.sd_time_budget = 2.0   # 1枚あたりの秒数（None は無制限）
+        self.sd_workers = 0         # 0 は全コア
+        self.sd_objective = 'tricks'  # 'tricks' | 'score'
+        self.last_play_stats = None
+        # AI のビッド: 'model' は Gemini（使えなければルール）、'simulation' は候補をロールアウトで比べる
+        self.bid_mode = 'model'
+        self.bid_sim_samples = 48
+        self.bid_sim_time_budget = 1.0  # 1コールあたりの秒数（None は無制限）
+        self.last_bid_stats = None
+        
+        # スコア関連
+        self.round_scores = []
+        self.total_scores = {'NS': 0, 'EW': 0}
+        self.vulnerable = {'NS': False, 'EW': False}
+        # 直前に終わったボード（配札・ディーラー・そのボードのバルネラビリティ・NS の得点）。分析用
+        self.last_board = None
+        # 終わったボードの記録（BoardRecord）。BRIDGE_ARCHIVE を指定するとバイナリ・アーカイブにも追記する
+        self.board_records = []
+        self.archive_path = os.getenv('BRIDGE_ARCHIVE') or None
+        
+        # AIモデルはプロセス共有のプールへのハンドルだけを持つ（クライアントの生成は最初の問い合わせで一度だけ）
+        # 応答が遅い・失敗したときはルールベースのビッドに切り替える
+        self.model = get_model_pool() if use_gemini else None
+        self.model_timeout = 10.0
+        self.prompt_token_budget = DEFAULT_TOKEN_BUDGET
+        self.last_prompt = None  # 直前に送ったプロンプト（CompiledPrompt。大きさの確認用）
+
+        # 状態を変える操作のイベント・ログ（アンドゥ/リドゥ・リプレイ・分岐。game_log を参照）
+        # 1ボードごとに捨てるバッチのシミュレーションは record_events=False で記録しない
+        self.log = GameLog() if record_events else None
+        self.replaying = False  # ログの再生中（アーカイブへの追記など外への副作用を出さない）
+        # 置かれているストアの卓 ID（ストアが設定する。先読みの投機を卓ごとに分けるのに使う。フォークも引き継ぐ）
+        self.table_id = None
+
+    @property
+    def ai_cache(self):
+        """モデルへの問い合わせはプロセス共有のキャッシュ越しに行う"""
+        return get_default_cache()
+
+    @property
+    def state_version(self) -> tuple:
+        """進行のたびに必ず変わる値の組（画面の描画結果をメモ化するキー）"""
+        return (self.current_round, self.game_phase, self.deal_number, len(self.auction_history),
+                len(self.tricks), len(self.current_trick), self.log.revision if self.log is not None else 0)
+
+    def __getstate__(self):
+        """pickle 用の状態（共有のモデル・プールと、作り直せるソルバーの TT は含めない）"""
+        state = self.__dict__.copy()
+        state['model'] = self.model is not None
+        state['dd_solver'] = None
+        state['last_prompt'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.replaying = False
+        self.model = get_model_pool() if state['model'] else None
+        if self.game_phase == 'play':
+            self.dd_solver = DoubleDummySolver(trump_code(self.trump_suit))
+
+    def fork(self) -> 'BridgeGame':
+        """以後の進行が元に影響しない探索用の軽いコピー（ログは持たない）
+
+        ソルバーは同じストレインの空の TT で作り直す。先読みのフォークは別スレッドで探索するので、
+        TT（ロックのない dict）を元と共有すると、挿入中の走査で壊れ、サイズの上限も効かなくなる。
+        """
+        # copy.copy は __getstate__ を通るので、属性をそのまま写す
+        other = BridgeGame.__new__(BridgeGame)
+        other.__dict__.update(self.__dict__)
+        other.log = None
+        other.deck = list(self.deck)
+        other.players = {player: hand.copy() for player, hand in self.players.items()}
+        other.features = {player: features.copy() for player, features in self.features.items()}
+        other.auction_history = list(self.auction_history)
+        other.auction_state = self.auction_state.copy()
+        other.tricks = list(self.tricks)
+        other.current_trick = list(self.current_trick)
+        other.tricks_won = dict(self.tricks_won)
+        other.round_scores = list(self.round_scores)
+        other.board_records = list(self.board_records)
+        other.total_scores = dict(self.total_scores)
+        other.vulnerable = dict(self.vulnerable)
+        # random.Random() は OS の乱数で初期化するので、作るだけにして状態を写す
+        other.rng = random.Random.__new__(random.Random)
+        other.rng.setstate(self.rng.getstate())
+        if self.dd_solver is not None:
+            other.dd_solver = DoubleDummySolver(self.dd_solver.trump, self.dd_solver.max_tt_size)
+        return other
+
+    # --- ログの位置の移動 ---
+
+    def travel(self, position: int):
+        """ログの position 番目のイベントまで適用した局面にする（先へは再生、前へはスナップショットから作り直す）"""
+        log = self.log
+        if position > log.position and position - log.position < log.interval:
+            log.depth += 1
+            try:
+                replay_events(self, log.events[log.position:position])
+            finally:
+                log.depth -= 1
+        elif position != log.position:
+            restored = log.restore(position)
+            settings = self.settings()
+            self.__dict__.clear()
+            self.__dict__.update(restored.__dict__)
+            self.__dict__.update(settings)
+            self.log = log
+        log.position = position
+        log.revision += 1
+
+    def undo(self) -> bool:
+        if not self.log.position:
+            return False
+        self.travel(self.log.position - 1)
+        return True
+
+    def redo(self) -> bool:
+        if self.log.position >= len(self.log):
+            return False
+        self.travel(self.log.position + 1)
+        return True
+
+    def branch(self, position: Optional[int] = None) -> 'BridgeGame':
+        """position（省略時は今）の局面から別に進められるゲーム（そこまでのログを引き継ぐ）"""
+        if position is None:
+            position = self.log.position
+        other = self.log.restore(position)
+        other.__dict__.update(self.settings())
+        other.log = self.log.truncated(position)
+        return other
+
+    def settings(self) -> dict:
+        """今の設定（SETTINGS の属性）"""
+        return {name: getattr(self, name) for name in SETTINGS}
+
+    def create_deck(self):
+        self.deck = list(DECK)
+        self.rng.shuffle(self.deck)
+
+    @logged
+    def determine_partnerships_and_dealer(self):
+        self.partnerships = {'NS': ['North', 'South'], 'EW': ['East', 'West']}
+        self.dealer = self.rng.choice(list(self.players.keys()))
+        self.apply_board_conditions()
+        self.game_phase = 'deal'
+
+    def apply_board_conditions(self):
+        """デュプリケートなら、ボード番号（current_round）の標準のディーラーとバルネラビリティにする"""
+        if self.duplicate:
+            self.dealer = board_dealer(self.current_round)
+            self.vulnerable = board_vulnerability(self.current_round)
+
+    @timed('game.deal_cards')
+    @logged
+    def deal_cards(self, deal_number: Optional[int] = None):
+        """ディール番号（`cards.unrank_deal`）のディールを配る。None なら rng で一様に番号を選ぶ"""
+        if deal_number is None:
+            deal_number = self.rng.randrange(NUM_DEALS)
+        self.deal_number = deal_number
+        # Hand は常に ♠A→♣2 の順で列挙されるのでソート不要
+        for player, mask in zip(SEATS, unrank_deal(deal_number)):
+            self.players[player] = Hand(mask=mask)
+        self.features = {player: HandFeatures(hand.mask) for player, hand in self.players.items()}
+
+    def get_next_player(self, current_player):
+        order = ['South', 'West', 'North', 'East']
+        return order[(order.index(current_player) + 1) % 4]
+
+    def get_partnership(self, player):
+        return 'NS' if player in ['North', 'South'] else 'EW'
+
+    def get_bid_rank(self, bid):
+        if bid['type'] != 'bid': return -1
+        return bid['level'] * 5 + {'♣': 0, '♦': 1, '♥': 2, '♠': 3, 'NT': 4}[bid['suit']]
+
+    def is_valid_bid(self, bid):
+        return call_code(bid) in self.auction_state.legal_calls()
+    
+    def can_double(self):
+        # 最後のビッドが敵のもので、まだダブルされていない
+        return self.auction_state.can_double
+
+    def can_redouble(self):
+        # 味方のビッドが敵にダブルされている
+        return self.auction_state.can_redouble
+
+    @timed('game.make_auction_call')
+    @logged
+    def make_auction_call(self, call):
+        self.auction_state.apply(call_code(call))  # 不正なコールは ValueError
+        self.auction_history.append({'player': self.current_bidder, **call})
+        self.pass_count = self.auction_state.passes
+        self.doubled = self.auction_state.doubled  # 新しいビッドでダブル/リダブルはリセットされる
+
+        if self.auction_state.finished:
+            self.end_auction()
+        else:
+            self.current_bidder = SEATS[self.auction_state.turn]
+
+    @timed('game.end_auction')
+    @logged
+    def end_auction(self):
+        contract = self.auction_state.contract()
+        if contract is None:
+            self.record_passout_round()
+            return
+
+        final_bid = next(call for call in reversed(self.auction_history) if call['type'] == 'bid')
+        self.contract = final_bid
+        self.contract_level, self.trump_suit, self.doubled, declarer_seat = contract
+        self.declarer = SEATS[declarer_seat]
+        declarer_partnership = self.get_partnership(self.declarer)
+        self.dummy = [p for p in self.partnerships[declarer_partnership] if p != self.declarer][0]
+        self.start_play_phase()
+
+    @timed('game.start_play_phase')
+    @logged
+    def start_play_phase(self):
+        self.game_phase = 'play'
+        self.trick_leader = self.get_next_player(self.declarer)
+        self.current_trick = []
+        self.tricks = []
+        self.tricks_won = {'NS': 0, 'EW': 0}
+        self.dummy_revealed = False
+        self.dd_solver = DoubleDummySolver(trump_code(self.trump_suit))
+        self.dd_total_ns = None
+
+    @logged
+    def play_card(self, player, card):
+        features = self.hand_features(player)
+        self.players[player].remove(card)
+        features.play(card, self.current_trick[0]['card'].suit if self.current_trick else None)
+        self.current_trick.append({'player': player, 'card': card})
+        if not self.dummy_revealed:
+            self.dummy_revealed = True
+            if self.dummy is not None: self.hand_features(self.dummy).revealed = True
+        return True
+
+    def hand_features(self, player) -> HandFeatures:
+        """席の特徴量（players が直接置き換えられていたらトリックの記録から作り直す）"""
+        features = self.features.get(player)
+        if features is None or features.mask != self.players[player].mask:
+            features = self.features[player] = HandFeatures.from_game(self, player)
+        return features
+
+    @timed('game.complete_trick')
+    @logged
+    def complete_trick(self):
+        winner = self.determine_trick_winner()
+        self.tricks_won[self.get_partnership(winner)] += 1
+        self.tricks.append({'winner': winner, 'cards': self.current_trick.copy()})
+        self.trick_leader = winner
+        self.current_trick = []
+        if len(self.tricks) == 13: self.end_round()
+
+    def determine_trick_winner(self):
+        led_suit = self.current_trick[0]['card'].suit
+        trick_mask = 0
+        owners = {}
+        for play in self.current_trick:
+            trick_mask |= play['card'].bit
+            owners[play['card'].index] = play['player']
+        # 切り札があればその最上位、なければリードスートの最上位
+        return owners[trick_winner_index(trick_mask, led_suit, self.trump_suit)]
+
+    def get_current_player(self):
+        if not self.current_trick: return self.trick_leader
+        return self.get_next_player(self.current_trick[-1]['player'])
+
+    def get_valid_mask(self, player) -> int:
+        hand = self.players.get(player)
+        if hand is None: return 0
+        led_suit = self.current_trick[0]['card'].suit if self.current_trick else None
+        return legal_mask(card_mask(hand), led_suit)
+
+    def get_valid_cards(self, player):
+        return cards_from_mask(self.get_valid_mask(player))
+    
+    def deal_masks(self) -> List[int]:
+        """配られたときの4人のハンド（座席順のマスク）。プレイ中・終了後でもプレイ済みのカードを戻して求める"""
+        hands = hands_from_game(self.players)
+        for play in [play for trick in self.tricks for play in trick['cards']] + list(self.current_trick):
+            hands[SEAT_INDEX[play['player']]] |= play['card'].bit
+        return hands
+
+    def record_board(self, ns_score: int, ew_score: int):
+        """終わったボードを last_board と board_records に残す（バルネラビリティは次のラウンド用に変わる前に記録する）"""
+        self.last_board = {
+            'round': self.current_round,
+            'hands': self.deal_masks(),
+            'dealer': self.dealer,
+            'vulnerable': dict(self.vulnerable),
+            'ns_score': ns_score - ew_score,
+        }
+        record = record_from_game(self)
+        self.board_records.append(record)
+        if self.archive_path and not self.replaying:
+            # アーカイブへの書き込みはおまけなので、失敗しても対局は止めない（再生では書かない）
+            try:
+                DealArchive(self.archive_path).append(record)
+            except (OSError, ValueError) as e:
+                print(f"Warning: board {record.board} was not archived: {e}")
+
+    @timed('game.end_round')
+    @logged
+    def end_round(self):
+        ns_score, ew_score = self.calculate_score()
+        self.record_board(ns_score, ew_score)
+        self.round_scores.append({
+            'round': self.current_round,
+            'contract': f"{self.contract_level}{self.trump_suit}{'x'*self.doubled if self.doubled else ''}",
+            'declarer': self.declarer,
+            'made': self.tricks_won[self.get_partnership(self.declarer)] if self.declarer else 0,
+            'ns_score': ns_score,
+            'ew_score': ew_score
+        })
+        self.total_scores['NS'] += ns_score
+        self.total_scores['EW'] += ew_score
+        self.game_phase = 'scoring'
+        if self.duplicate:
+            return
+        if self.current_round == 2 or self.current_round == 3:
+            self.vulnerable['NS'] = True
+        elif self.current_round == 4:
+            self.vulnerable['EW'] = True
+        elif self.current_round == 5:
+            self.vulnerable['NS'] = True
+            self.vulnerable['EW'] = True
+    
+    def calculate_score(self):
+        """(NS, EW) の獲得点。点数は scoring の事前計算テーブルを引くだけ"""
+        if not self.contract: return 0, 0
+        declarer_partnership = self.get_partnership(self.declarer)
+        score = declarer_score(self.contract_level, self.trump_suit, self.doubled,
+                               self.vulnerable[declarer_partnership], self.tricks_won[declarer_partnership])
+        return split_score(score, declarer_partnership == 'NS')
+
+    @timed('game.start_new_round')
+    @logged
+    def start_new_round(self):
+        if self.current_round < self.max_rounds:
+            self.current_round += 1
+            self.reset_for_new_deal()
+            self.game_phase = 'deal'
+            return True
+        self.game_phase = 'game_over'
+        return False
+        
+    @logged
+    def reset_for_new_deal(self):
+        self.auction_history = []
+        self.auction_state = AuctionState()
+        self.pass_count = 0
+        self.contract = None
+        self.declarer = None
+        self.dummy = None
+        self.trump_suit = None
+        self.contract_level = 0
+        self.doubled = 0
+        self.dealer = self.get_next_player(self.dealer)
+        self.apply_board_conditions()
+        self.current_bidder = self.dealer
+        for player in self.players: self.players[player] = Hand()
+        self.features = {}
+            
+    @timed('game.start_auction')
+    @logged
+    def start_auction(self):
+        self.game_phase = 'auction'
+        self.current_bidder = self.dealer
+        self.auction_history = []
+        self.auction_state = AuctionState(self.dealer)
+        self.pass_count = 0
+
+    @timed('game.record_passout_round')
+    @logged
+    def record_passout_round(self):
+        self.record_board(0, 0)
+        self.round_scores.append({
+            'round': self.current_round, 'contract': "Pass Out", 'declarer': None,
+            'made': 0, 'ns_score': 0, 'ew_score': 0
+        })
+        self.game_phase = 'scoring'
+        if self.current_round >= 2 and not self.duplicate:
+            self.vulnerable['NS'] = True; self.vulnerable['EW'] = True
+
+    ### AI思考ロジック (改善済み) ###
+    def get_ai_auction_call(self, player: str) -> Dict:
+        """Gemini が使えればキャッシュ越しに問い合わせ、使えない・失敗・不正ならルールベースで決める
+
+        bid_mode が 'simulation' なら Gemini は使わず、候補のコールをロールアウトで比べて決める。
+        """
+        if self.bid_mode == 'simulation':
+            with span('ai.auction', backend='simulation'):
+                return self.get_simulated_auction_call(player)
+        if self.model is not None and self.model.available:
+            with span('ai.auction', backend='gemini') as timing:
+                key = decision_key(self, player, 'auction')
+                call = self.ai_cache.get(key)
+                timing.set(cache='hit' if call is not None else 'miss')
+                if call is None:
+                    call = self.query_model_call(player)
+                    if call is not None:  # 失敗はキャッシュしない
+                        self.ai_cache.put(key, call)
+            if call is not None and self.is_legal_call(call):
+                return call
+        with span('ai.auction', backend='rules'):
+            return choose_call(self, player)
+
+    def get_simulated_auction_call(self, player: str) -> Dict:
+        """見えないハンドをサンプルして候補のコールごとにオークションを最後まで進め、期待スコアで選ぶ"""
+        call, self.last_bid_stats = choose_call_by_simulation(
+            self, player, samples=self.bid_sim_samples, time_budget=self.bid_sim_time_budget)
+        return call
+
+    def is_legal_call(self, call: Dict) -> bool:
+        if call['type'] == 'bid': return self.is_valid_bid(call)
+        if call['type'] == 'double': return self.can_double()
+        if call['type'] == 'redouble': return self.can_redouble()
+        return call['type'] == 'pass'
+
+    def query_model_call(self, player: str) -> Optional[Dict]:
+        """Gemini にコールを問い合わせる（応答が解釈できなければ None）"""
+        hand = self.players[player]
+        hand_str = ' '.join(f"{suit}:{''.join(c.rank for c in hand.suit_cards(suit)) or '-'}" for suit in SUITS)
+        history = ', '.join(f"{c['player']}:{c['level']}{c['suit']}" if c['type'] == 'bid'
+                            else f"{c['player']}:{c['type']}" for c in self.auction_history) or 'なし'
+        situation = (f"あなたはコントラクトブリッジの{player}です。ディーラーは{self.dealer}、"
+                     f"バルネラビリティは NS={self.vulnerable['NS']} EW={self.vulnerable['EW']}。\n"
+                     f"手札: {hand_str}（{hand.hcp}HCP）\nオークション: {history}")
+        instruction = "次のコールを PASS / DOUBLE / REDOUBLE / 4♠ や 3NT の形式で1つだけ答えてください。"
+        # 局面に関係する戦略セクションだけを予算内で付ける
+        self.last_prompt = compile_for(self, player, 'auction', situation, instruction, self.prompt_token_budget)
+        text = self.model.generate(self.last_prompt.text, self.model_timeout)
+        if text is None:
+            return None
+        return parse_call(text)
+
+    def get_ai_card_play(self, player: str) -> Optional[Card]:
+        valid_cards = self.get_valid_cards(player)
+        if not valid_cards: return None
+        if len(valid_cards) == 1: return valid_cards[0]
+        if self.play_mode == 'single_dummy':
+            with span('ai.play', backend='single_dummy'):
+                return self.get_single_dummy_card_play(player)
+        with span('ai.play', backend='dd'):
+            return self.get_dd_card_play(player)
+
+    def get_single_dummy_card_play(self, player: str) -> Card:
+        """見えないハンドをサンプルして各配置をダブルダミーで解き、期待値が最大のカードを選ぶ"""
+        card, self.last_play_stats = single_dummy_card(
+            self, player, samples=self.sd_samples, time_budget=self.sd_time_budget,
+            workers=resolve_workers(self.sd_workers), objective=self.sd_objective)
+        return card
+
+    def get_dd_card_play(self, player: str) -> Card:
+        """ダブルダミー探索で最善のカードを選ぶ（時間切れなら探索の並べ替えの先頭を使う）"""
+        if self.dd_solver is None:
+            self.dd_solver = DoubleDummySolver(trump_code(self.trump_suit))
+        hands = hands_from_game(self.players)
+        leader = SEAT_INDEX[self.trick_leader]
+        trick = [(SEAT_INDEX[play['player']], play['card'].index) for play in self.current_trick]
+        guess = self.dd_total_ns - self.tricks_won['NS'] if self.dd_total_ns is not None else None
+        try:
+            idx, side_value = self.dd_solver.best_card(hands, leader, trick, guess=guess,
+                                                       time_limit=self.dd_time_limit)
+        except SolverTimeout:
+            return CARDS[self.dd_solver.heuristic_card(hands, leader, trick)]
+        ns_value = side_value if self.get_partnership(player) == 'NS' else len(self.players[player]) - side_value
+        self.dd_total_ns = self.tricks_won['NS'] + ns_value
+        return CARDS[idx]
+
+
+_CALL_PATTERN = re.compile(r'\b(REDOUBLE|DOUBLE|PASS|XX|X)\b|([1-7])\s*(NT|N|♣|♦|♥|♠|C|D|H|S)(?![A-Za-z])', re.IGNORECASE)
+_STRAIN_LETTERS = {'C': '♣', 'D': '♦', 'H': '♥', 'S': '♠', 'N': 'NT', 'NT': 'NT'}
+
+
+def parse_call(text: str) -> Optional[Dict]:
+    """モデルの応答から最初に現れたコールを取り出す"""
+    match = _CALL_PATTERN.search(text or '')
+    if not match: return None
+    word, level, strain = match.groups()
+    if word:
+        word = word.upper()
+        if word in ('REDOUBLE', 'XX'): return {'type': 'redouble'}
+        if word in ('DOUBLE', 'X'): return {'type': 'double'}
+        return {'type': 'pass'}
+    strain = _STRAIN_LETTERS.get(strain.upper(), strain)
+    return {'type': 'bid', 'level': int(level), 'suit': strain}
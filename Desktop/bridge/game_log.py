@@ -0,0 +1,247 @@
+"""ゲームのイベント・ログ（スナップショットつき。アンドゥ/リドゥ・リプレイ・分岐）
+
+`BridgeGame` の状態を変えるメソッド（`@logged`）は、呼ばれるたびに小さなタプルのイベントを
+`game.log` に追記する。記録するのは一番外側の呼び出しだけ（`make_auction_call` の中の `end_auction` などは
+そのイベントの一部）。AI の判断もコール／カードとして記録するので、再生に AI は要らない。
+
+- イベント: ('make_auction_call', コード, 座席) / ('play_card', 座席, カード番号, 判断した座席) / ('deal_cards', 指定, 配った番号) など
+- スナップショット: `interval` イベントごとに、そのイベントを適用する前の状態の `BridgeGame.fork`
+  （変えない中身は共有する浅いコピー。ソルバーは持たず、戻すときに作り直す）。乱数の状態も入るので、
+  番号を指定しない `deal_cards` も同じディールを配り直す
+- 位置 p の局面 = p 以下で最も近いスナップショット + そこからのイベント（高々 interval - 1 個）の再生
+- 途中の位置に戻ってから新しいイベントを記録すると、その先（リドゥできたイベント）は捨てる
+- 再生（`replay_events`）の間は `game.replaying` が立ち、外への副作用（アーカイブへの追記・計測）は出さない
+- 設定（`game.SETTINGS`。AI のモードや時間など）はイベントにしないので、位置を移動・分岐しても今の値のまま
+
+ログの位置の移動は `BridgeGame.travel` / `undo` / `redo`、別のゲームとして切り出すのは `branch`。
+探索用の `BridgeGame.fork` はログを持たず記録もしない。
+
+    python game_log.py -n 3 --seed 1     # 対局してから全体を再生し、同じ結果になるか確かめる
+"""
+import argparse
+import random
+import time
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+from auction import CALLS, call_code
+from cards import CARDS
+from metrics import suspended
+from solver import DoubleDummySolver, SEATS, SEAT_INDEX, trump_code
+
+Event = Tuple
+
+
+class ReplayError(RuntimeError):
+    """再生した結果が記録と食い違う"""
+
+
+# --- イベントの詰め方と戻し方 ---
+
+def _encode_call(game, call):
+    return (call_code(call), SEAT_INDEX[game.current_bidder])
+
+
+def _replay_call(game, code, bidder):
+    game.make_auction_call(dict(CALLS[code]))
+
+
+def _encode_play(game, player, card):
+    # ダミーのカードはディクレアラーが決める（アンドゥで戻る先を判断した座席で探すため）
+    controller = game.declarer if player == game.dummy else player
+    return (SEAT_INDEX[player], card.index, SEAT_INDEX[controller])
+
+
+def _replay_play(game, seat, index, controller):
+    game.play_card(SEATS[seat], CARDS[index])
+
+
+def _encode_deal(game, deal_number=None):
+    return (deal_number,)
+
+
+def _replay_deal(game, requested, dealt):
+    game.deal_cards(requested)
+    if game.deal_number != dealt:
+        raise ReplayError(f"deal {game.deal_number} replayed, {dealt} recorded")
+
+
+# メソッド名 -> (呼び出しの引数をイベントに詰める, 実行後に結果を足す, イベントを適用する)
+# 表にないメソッドは引数なしの呼び出しとして記録する
+CODECS: Dict[str, Tuple[Callable, Optional[Callable], Callable]] = {
+    'make_auction_call': (_encode_call, None, _replay_call),
+    'play_card': (_encode_play, None, _replay_play),
+    'deal_cards': (_encode_deal, lambda game: (game.deal_number,), _replay_deal),
+}
+
+
+def _encode_none(game):
+    return ()
+
+
+def replay_event(game, event: Event):
+    name = event[0]
+    codec = CODECS.get(name)
+    if codec is None:
+        getattr(game, name)()
+    else:
+        codec[2](game, *event[1:])
+
+
+def replay_events(game, events):
+    """イベントを順に適用する（その間は game.replaying を立て、計測もしない）"""
+    game.replaying = True
+    try:
+        with suspended():
+            for event in events:
+                replay_event(game, event)
+    finally:
+        game.replaying = False
+
+
+def logged(method):
+    """状態を変えるメソッドを、一番外側の呼び出しだけイベントとして game.log に記録するデコレータ"""
+    name = method.__name__
+    encode, outcome, _ = CODECS.get(name, (_encode_none, None, None))
+
+    @wraps(method)
+    def wrapper(game, *args, **kwargs):
+        log = game.__dict__.get('log')
+        if log is None or log.depth:
+            return method(game, *args, **kwargs)
+        event = (name,) + encode(game, *args, **kwargs)
+        log.before(game)
+        log.depth += 1
+        try:
+            result = method(game, *args, **kwargs)
+        finally:
+            log.depth -= 1
+        log.append(event + outcome(game) if outcome is not None else event)
+        return result
+    return wrapper
+
+
+# --- ログ ---
+
+def snapshot(game):
+    """ログとソルバーを持たないコピー（以後は書き換えない）"""
+    copy = game.fork()
+    copy.dd_solver = None
+    return copy
+
+
+def load_snapshot(copy):
+    """スナップショットから進められるゲームを作る（スナップショット自体は変えない）"""
+    game = copy.fork()
+    if game.game_phase == 'play':
+        game.dd_solver = DoubleDummySolver(trump_code(game.trump_suit))
+    return game
+
+
+class GameLog:
+    """イベントの列・今の位置・スナップショット"""
+
+    def __init__(self, interval: int = 64):
+        self.interval = interval
+        self.events: List[Event] = []
+        self.position = 0                    # 今の局面までに適用したイベントの数
+        self.snapshots: Dict[int, object] = {}  # 位置 -> その位置の状態（snapshot）
+        self.depth = 0                       # 記録中・再生中のメソッドの入れ子（内側は記録しない）
+        self.revision = 0                    # 記録・移動のたびに増える（表示のメモ化のキー）
+
+    def __len__(self):
+        return len(self.events)
+
+    def before(self, game):
+        if self.position % self.interval == 0 and self.position not in self.snapshots:
+            self.snapshots[self.position] = snapshot(game)
+
+    def append(self, event: Event):
+        if self.position < len(self.events):
+            # 戻った位置から別の進行を始めたので、リドゥできた先を捨てる
+            del self.events[self.position:]
+            for position in [p for p in self.snapshots if p > self.position]:
+                del self.snapshots[position]
+        self.events.append(event)
+        self.position += 1
+        self.revision += 1
+
+    def restore(self, position: int, from_start: bool = False):
+        """位置 position の局面を新しいゲームとして作る（ログは持たない）。from_start なら最初の状態から全部再生する"""
+        if not 0 <= position <= len(self.events):
+            raise IndexError(f"position {position} is outside 0..{len(self.events)}")
+        base = 0 if from_start else max(p for p in self.snapshots if p <= position)
+        game = load_snapshot(self.snapshots[base])
+        replay_events(game, self.events[base:position])
+        return game
+
+    def truncated(self, position: int) -> 'GameLog':
+        """position までのイベントだけを持つコピー（branch 用）"""
+        other = GameLog(self.interval)
+        other.events = self.events[:position]
+        other.position = position
+        other.snapshots = {p: data for p, data in self.snapshots.items() if p <= position}
+        return other
+
+    def decisions(self, seat: str) -> List[int]:
+        """seat が判断したコール／カードのイベントの位置（その位置に戻ると seat の手番）"""
+        index = SEAT_INDEX[seat]
+        return [p for p, event in enumerate(self.events)
+                if event[0] in ('make_auction_call', 'play_card') and event[-1] == index]
+
+
+# --- 検証用 CLI ---
+
+def _play_match(boards: int, seed: int):
+    from game import BridgeGame
+    from simulate import heuristic_card_play, rule_auction_call
+
+    game = BridgeGame(use_gemini=False, seed=seed)
+    game.max_rounds = boards
+    game.determine_partnerships_and_dealer()
+    while game.game_phase != 'game_over':
+        game.deal_cards()
+        game.start_auction()
+        while game.game_phase == 'auction':
+            game.make_auction_call(rule_auction_call(game, game.current_bidder))
+        while game.game_phase == 'play':
+            player = game.get_current_player()
+            game.play_card(player, heuristic_card_play(game, player))
+            if len(game.current_trick) == 4:
+                game.complete_trick()
+        game.start_new_round()
+    return game
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Record a match as events, then replay and time travel through it')
+    parser.add_argument('-n', '--boards', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--probes', type=int, default=200, help='random positions to rebuild')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    game = _play_match(args.boards, args.seed)
+    played = time.perf_counter() - started
+    log = game.log
+    print(f"{len(log)} events, {len(log.snapshots)} snapshots, played in {played:.2f}s")
+
+    started = time.perf_counter()
+    replayed = log.restore(len(log), from_start=True)
+    print(f"full replay in {time.perf_counter() - started:.3f}s: "
+          f"{'identical' if replayed.board_records == game.board_records else 'DIFFERENT'} board records, "
+          f"scores {replayed.total_scores}")
+
+    rng = random.Random(args.seed)
+    times = []
+    for _ in range(args.probes):
+        position = rng.randrange(len(log) + 1)
+        started = time.perf_counter()
+        log.restore(position)
+        times.append(time.perf_counter() - started)
+    times.sort()
+    print(f"rebuild a random position: median {times[len(times) // 2] * 1e3:.2f}ms, max {times[-1] * 1e3:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
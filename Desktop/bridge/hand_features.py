@@ -0,0 +1,159 @@
+"""席ごとのハンドの特徴量（配札時に作り、カードを出すたびに1枚ぶんだけ更新する）
+
+HCP・スートの枚数・配分点・ルーザーズトリックカウント・ストッパー・クイックトリックを、13ビットの
+スートの持ち札（2^13 通り）ごとに事前計算した表から引いて持つ。カードを出したときに変わるのは
+そのスートの持ち札だけなので、表を2回引いて差分を足すだけで済む（手札全体を数え直さない）。
+
+他の席から見えている情報も一緒に持つ。
+- played: この席が出したカード
+- shown_out: フォローできなかった（ボイドだと分かった）スート
+- revealed: ダミーとして公開済み（残りの手札も全員に見えている）
+
+`BridgeGame.hand_features(player)` で取り出す。`players` が直接置き換えられていれば（記録からの
+復元など）、その場でトリックの記録から作り直す。
+"""
+from typing import List, Optional
+
+from bidding import SUIT_ORDER, HandEvaluation, losing_trick_count
+from cards import FULL_SUIT, SUIT_CODES
+
+_ACE, _KING, _QUEEN, _JACK = (1 << 12), (1 << 11), (1 << 10), (1 << 9)
+
+# 配分点（ボイド3・シングルトン2・ダブルトン1）
+DISTRIBUTION_POINTS = {0: 3, 1: 2, 2: 1}
+
+
+def _holding_hcp(holding: int) -> int:
+    return (4 * bool(holding & _ACE) + 3 * bool(holding & _KING) + 2 * bool(holding & _QUEEN)
+            + bool(holding & _JACK))
+
+
+def _holding_quick_tricks(holding: int) -> int:
+    """クイックトリック（0.5 単位の整数）: AK=2, AQ=1.5, A=1, KQ=1, Kx=0.5"""
+    if holding & _ACE:
+        return 4 if holding & _KING else 3 if holding & _QUEEN else 2
+    if holding & _KING:
+        if holding & _QUEEN:
+            return 2
+        return 1 if holding.bit_count() >= 2 else 0
+    return 0
+
+
+def _holding_stopper(holding: int) -> bool:
+    """A, Kx, Qxx, Jxxx 以上（HandEvaluation.stopper と同じ基準）"""
+    n = holding.bit_count()
+    return bool(holding & _ACE or (holding & _KING and n >= 2) or (holding & _QUEEN and n >= 3)
+                or (holding & _JACK and n >= 4))
+
+
+# 13ビットの持ち札 -> 値（LTC は ♣ の位置に置いたマスクで bidding の定義をそのまま使う）
+HOLDING_HCP = [_holding_hcp(h) for h in range(FULL_SUIT + 1)]
+HOLDING_LTC = [losing_trick_count(h) for h in range(FULL_SUIT + 1)]
+HOLDING_QUICK_TRICKS = [_holding_quick_tricks(h) for h in range(FULL_SUIT + 1)]
+HOLDING_STOPPER = [_holding_stopper(h) for h in range(FULL_SUIT + 1)]
+
+
+class HandFeatures:
+    """1席の特徴量。スートは SUIT_CODES の番号（♣0 ♦1 ♥2 ♠3）で持つ"""
+    __slots__ = ('dealt', 'mask', 'holdings', 'hcp', 'ltc', 'quick_tricks_x2', 'stoppers',
+                 'played', 'shown_out', 'revealed', '_evaluation')
+
+    def __init__(self, mask: int):
+        self.dealt = mask   # 配られた13枚
+        self.mask = mask    # 今の手札
+        c, d, h, s = mask & FULL_SUIT, (mask >> 13) & FULL_SUIT, (mask >> 26) & FULL_SUIT, mask >> 39
+        self.holdings = [c, d, h, s]
+        self.hcp = HOLDING_HCP[c] + HOLDING_HCP[d] + HOLDING_HCP[h] + HOLDING_HCP[s]
+        self.ltc = HOLDING_LTC[c] + HOLDING_LTC[d] + HOLDING_LTC[h] + HOLDING_LTC[s]
+        self.quick_tricks_x2 = (HOLDING_QUICK_TRICKS[c] + HOLDING_QUICK_TRICKS[d] + HOLDING_QUICK_TRICKS[h]
+                                + HOLDING_QUICK_TRICKS[s])
+        self.stoppers = (HOLDING_STOPPER[c] | HOLDING_STOPPER[d] << 1 | HOLDING_STOPPER[h] << 2
+                         | HOLDING_STOPPER[s] << 3)
+        self.played = 0
+        self.shown_out = 0
+        self.revealed = False
+        self._evaluation: Optional[HandEvaluation] = None
+
+    @classmethod
+    def from_game(cls, game, player: str) -> 'HandFeatures':
+        """今の手札と、トリックの記録（出したカードとショウアウト）から作り直す"""
+        plays = [(trick['cards'][0]['card'].suit, play['card'])
+                 for trick in list(game.tricks) + [{'cards': game.current_trick}]
+                 for play in trick['cards'] if play['player'] == player]
+        features = cls(game.players[player].mask | sum(card.bit for _, card in plays))
+        for led_suit, card in plays:
+            features.play(card, led_suit)
+        features.revealed = game.dummy_revealed and player == game.dummy
+        return features
+
+    def copy(self) -> 'HandFeatures':
+        other = HandFeatures.__new__(HandFeatures)
+        other.dealt, other.mask, other.holdings = self.dealt, self.mask, list(self.holdings)
+        other.hcp, other.ltc = self.hcp, self.ltc
+        other.quick_tricks_x2, other.stoppers = self.quick_tricks_x2, self.stoppers
+        other.played, other.shown_out, other.revealed = self.played, self.shown_out, self.revealed
+        other._evaluation = self._evaluation
+        return other
+
+    # --- 更新 ---
+
+    def play(self, card, led_suit: Optional[str] = None):
+        """card を出した（led_suit はトリックの最初のスート。リードなら None か card のスート）"""
+        code = SUIT_CODES[card.suit]
+        old = self.holdings[code]
+        new = old & ~(card.bit >> (13 * code))
+        self.holdings[code] = new
+        self.mask &= ~card.bit
+        self.hcp += HOLDING_HCP[new] - HOLDING_HCP[old]
+        self.ltc += HOLDING_LTC[new] - HOLDING_LTC[old]
+        self.quick_tricks_x2 += HOLDING_QUICK_TRICKS[new] - HOLDING_QUICK_TRICKS[old]
+        self.stoppers = (self.stoppers & ~(1 << code)) | (HOLDING_STOPPER[new] << code)
+        self.played |= card.bit
+        if led_suit is not None and led_suit != card.suit:
+            self.shown_out |= 1 << SUIT_CODES[led_suit]
+
+    # --- 今の手札 ---
+
+    def length(self, suit: str) -> int:
+        return self.holdings[SUIT_CODES[suit]].bit_count()
+
+    @property
+    def lengths(self):
+        return {suit: self.length(suit) for suit in SUIT_ORDER}
+
+    @property
+    def distribution_points(self) -> int:
+        return sum(DISTRIBUTION_POINTS.get(h.bit_count(), 0) for h in self.holdings)
+
+    @property
+    def quick_tricks(self) -> float:
+        return self.quick_tricks_x2 / 2
+
+    def stopper(self, suit: str) -> bool:
+        return bool(self.stoppers >> SUIT_CODES[suit] & 1)
+
+    @property
+    def evaluation(self) -> HandEvaluation:
+        """配られた13枚の評価（オークション用。最初に使われたときに一度だけ作る）"""
+        if self._evaluation is None:
+            self._evaluation = HandEvaluation(self.dealt)
+        return self._evaluation
+
+    # --- 他の席から見えている情報 ---
+
+    @property
+    def known_mask(self) -> int:
+        """他の席に見えているカード（出したカードと、公開済みのダミーなら残りの手札）"""
+        return self.played | (self.mask if self.revealed else 0)
+
+    def shown_out_of(self, suit: str) -> bool:
+        return bool(self.shown_out >> SUIT_CODES[suit] & 1)
+
+    @property
+    def void_codes(self) -> List[int]:
+        """ショウアウトしたスートの番号"""
+        return [code for code in range(4) if self.shown_out >> code & 1]
+
+    def __repr__(self):
+        return (f"HandFeatures(hcp={self.hcp}, lengths={self.lengths}, ltc={self.ltc}, "
+                f"quick_tricks={self.quick_tricks}, shown_out={[SUIT_ORDER[c] for c in self.void_codes]})")
@@ -0,0 +1,204 @@
+"""ホットパスの計測（スパンとレイテンシのヒストグラム）
+
+`span` / `timed` で囲んだ区間の経過時間を、名前とラベル（AI のバックエンド・キャッシュのヒット/ミスなど）
+ごとのヒストグラムに集計する。p50/p95/p99 はバケットの中で線形補間して求める。
+集計は JSON と Prometheus のテキスト形式で書き出せる。
+
+計測は既定で無効（`BRIDGE_METRICS=1` か `set_enabled(True)` で有効）。無効の間は `span` が共有の
+何もしないオブジェクトを返し、`timed` はフラグを1つ見て元の関数を呼ぶだけなので、ほぼコストがかからない。
+`suspended()` の中（そのスレッドだけ）は有効でも計測しない（ログの再生など、実際の操作ではない呼び出し用）。
+
+    with span('ai.auction', backend='gemini') as timing:
+        ...
+        timing.set(cache='hit')
+"""
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+
+# バケットの上限（秒）: 1µs から2倍ずつ約134秒まで。最後は +Inf
+BUCKETS = [1e-6 * 2 ** k for k in range(28)]
+QUANTILES = (0.5, 0.95, 0.99)
+
+_enabled = os.getenv('BRIDGE_METRICS', '') not in ('', '0')
+_local = threading.local()  # suspended: このスレッドでは計測しない
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """固定バケットのレイテンシ・ヒストグラム"""
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """q 分位点（バケット内は線形補間、最大値を超えない）"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+
+class Metrics:
+    """(名前, ラベル) -> Histogram の集計（スレッドセーフ）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+    def observe(self, name: str, seconds: float, labels: Optional[Dict[str, str]] = None):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def summary(self) -> List[Dict[str, object]]:
+        """スパンごとの件数・平均・p50/p95/p99・最大（秒）。名前とラベルの順"""
+        with self._lock:
+            items = sorted(self._histograms.items())
+            rows = []
+            for (name, labels), histogram in items:
+                row = {'span': name, 'labels': dict(labels), 'count': histogram.count,
+                       'mean': histogram.total / histogram.count if histogram.count else 0.0}
+                for q in QUANTILES:
+                    row[f'p{round(q * 100)}'] = histogram.quantile(q)
+                row['max'] = histogram.max
+                rows.append(row)
+            return rows
+
+    def to_json(self) -> str:
+        return json.dumps({'enabled': _enabled, 'spans': self.summary()}, ensure_ascii=False, indent=2)
+
+    def to_prometheus(self, metric: str = 'bridge_span_seconds') -> str:
+        """Prometheus のテキスト形式（ヒストグラム。スパン名は span ラベル）"""
+        lines = [f'# HELP {metric} Latency of instrumented spans.', f'# TYPE {metric} histogram']
+        with self._lock:
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                base = ','.join(f'{key}="{_escape(value)}"' for key, value in (('span', name),) + labels)
+                cumulative = 0
+                for bound, count in zip(BUCKETS + [math.inf], histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == math.inf else f'{bound:.6g}'
+                    lines.append(f'{metric}_bucket{{{base},le="{le}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{{base}}} {histogram.total:.9g}')
+                lines.append(f'{metric}_count{{{base}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _Span:
+    __slots__ = ('metrics', 'name', 'labels', 'started')
+
+    def __init__(self, metrics: Metrics, name: str, labels: Dict[str, str]):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def set(self, **labels):
+        """区間の途中で分かったラベル（キャッシュのヒット/ミスなど）を足す"""
+        self.labels.update(labels)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.started, self.labels)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **labels):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """プロセス内で共有する集計"""
+    return _metrics
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(flag: bool):
+    global _enabled
+    _enabled = bool(flag)
+
+
+@contextmanager
+def suspended():
+    """この中（このスレッド）の span / timed を計測しない"""
+    previous = getattr(_local, 'suspended', False)
+    _local.suspended = True
+    try:
+        yield
+    finally:
+        _local.suspended = previous
+
+
+def span(name: str, **labels):
+    """区間を計測するコンテキストマネージャ（無効・停止中なら何もしない共有オブジェクト）"""
+    if not _enabled or getattr(_local, 'suspended', False):
+        return _NOOP
+    return _Span(_metrics, name, labels)
+
+
+def timed(name: str):
+    """関数の呼び出し全体を name のスパンとして計測するデコレータ"""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled or getattr(_local, 'suspended', False):
+                return func(*args, **kwargs)
+            with _Span(_metrics, name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
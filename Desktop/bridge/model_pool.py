@@ -0,0 +1,179 @@
+"""プロセス共有の Gemini クライアント・プール
+
+`google.generativeai` のインポート・`.env` の読み込み・`genai.configure` とクライアントの生成は、
+最初に使われたときにプロセスで一度だけ行う（ゲームやセッションごとには行わない）。
+`BridgeGame` はこのプールへのハンドルだけを持ち、問い合わせは `generate` を通す。
+
+- 同時に投げるリクエストは `max_concurrency` まで（先読みのスレッドや複数セッションが重なっても増えない）。
+  空きを `acquire_timeout` 秒待っても取れなければ、その判断はルールベースに任せる（None を返す）
+- ヘルスチェック（サーキット・ブレーカー）: 連続 `failure_threshold` 回失敗したら `cooldown` 秒は
+  問い合わせず None を返す（open）。その後は1件だけ試しに通し（half-open。その間の他の問い合わせは None）、
+  成功すれば元に戻し（closed）、失敗すればまた `cooldown` 秒遮断する
+- Streamlit では `st.cache_resource` 越しに同じプールを全セッションで共有する
+
+    BRIDGE_MODEL_CONCURRENCY=4   # 同時リクエスト数の上限
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from metrics import span
+
+DEFAULT_MODEL = 'gemini-pro'
+
+
+class ModelPool:
+    """遅延初期化・同時実行数の上限・失敗時の遮断つきのモデル・クライアント"""
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, max_concurrency: int = 4,
+                 acquire_timeout: float = 5.0, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.model_name = model_name
+        self.max_concurrency = max_concurrency
+        self.acquire_timeout = acquire_timeout
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._client = None
+        self.warnings: List[str] = []
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.rejected = 0           # 空きがない・遮断中で問い合わせなかった数
+        self.consecutive_failures = 0
+        self.open_until = 0.0       # この時刻までは遮断中
+        self._probing = False       # 遮断明けの試しのリクエストが1件出ている
+        self.last_latency: Optional[float] = None
+
+    # --- 初期化 ---
+
+    def initialize(self):
+        """インポート・設定・クライアント生成（初回だけ。失敗は warnings に残して使えない状態にする）"""
+        with self._lock:
+            if self._initialized:
+                return
+            self._initialized = True
+            try:
+                import google.generativeai as genai
+            except ImportError:
+                self.warnings.append("Google Generative AI not available. AI features will be disabled.")
+                return
+            from dotenv import load_dotenv
+            load_dotenv()
+            api_key = os.getenv('GEMINI_API_KEY')
+            if not api_key:
+                self.warnings.append("GEMINI_API_KEY not found in .env file. AI features will use fallback logic.")
+                return
+            try:
+                genai.configure(api_key=api_key)
+                self._client = genai.GenerativeModel(self.model_name)
+            except Exception as e:
+                self.warnings.append(f"Failed to configure Gemini API: {e}. AI features will use fallback logic.")
+                self._client = None
+
+    @property
+    def available(self) -> bool:
+        """設定済みで使えるクライアントがあるか（初回の呼び出しで初期化する）"""
+        if not self._initialized:
+            self.initialize()
+        return self._client is not None
+
+    @property
+    def breaker_state(self) -> str:
+        """'closed'（通常）/ 'open'（遮断中）/ 'half_open'（遮断明け。試しの1件だけ通す）"""
+        if self.consecutive_failures < self.failure_threshold:
+            return 'closed'
+        return 'open' if time.monotonic() < self.open_until else 'half_open'
+
+    @property
+    def healthy(self) -> bool:
+        """今問い合わせを受け付けるか（half-open で試しのリクエストが出ている間は受け付けない）"""
+        if not self.available:
+            return False
+        state = self.breaker_state
+        return state == 'closed' or (state == 'half_open' and not self._probing)
+
+    def _admit(self) -> Optional[bool]:
+        """問い合わせてよいか。None は不可、True は half-open の試しの1件、False は通常"""
+        with self._lock:
+            state = self.breaker_state
+            if state == 'closed':
+                return False
+            if state == 'open' or self._probing:
+                return None
+            self._probing = True
+            return True
+
+    # --- 問い合わせ ---
+
+    def generate(self, text: str, timeout: float) -> Optional[str]:
+        """応答のテキスト（使えない・遮断中・空きがない・失敗なら None）"""
+        probe = self._admit() if self.available else None
+        if probe is None or not self._slots.acquire(timeout=self.acquire_timeout):
+            with self._lock:
+                self.rejected += 1
+                if probe:
+                    self._probing = False  # 試せなかったので次の問い合わせに譲る
+            return None
+        started = time.perf_counter()
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+        try:
+            with span('ai.model_request', backend='gemini'):
+                response = self._client.generate_content(text, request_options={'timeout': timeout}).text
+        except Exception as e:
+            print(f"Warning: Gemini request failed: {e}")
+            self._record(ok=False, probe=probe)
+            return None
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+            self.last_latency = time.perf_counter() - started
+        self._record(ok=True, probe=probe)
+        return response
+
+    def _record(self, ok: bool, probe: bool = False):
+        with self._lock:
+            if probe:
+                self._probing = False
+            if ok:
+                # 遮断中に返ってきた（遮断前に出した）リクエストの成功では戻さない。戻すのは試しの1件だけ
+                if probe or self.consecutive_failures < self.failure_threshold:
+                    self.consecutive_failures = 0
+                return
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.failure_threshold:
+                self.open_until = time.monotonic() + self.cooldown
+
+    def health(self) -> Dict[str, object]:
+        """サイドバー表示用の状態"""
+        return {
+            'available': self._client is not None,
+            'healthy': self._client is not None and self.breaker_state != 'open',
+            'breaker': self.breaker_state,
+            'in_flight': self.in_flight,
+            'max_concurrency': self.max_concurrency,
+            'requests': self.requests,
+            'failures': self.failures,
+            'rejected': self.rejected,
+            'consecutive_failures': self.consecutive_failures,
+            'last_latency': self.last_latency,
+        }
+
+
+_default_pool: Optional[ModelPool] = None
+_default_lock = threading.Lock()
+
+
+def get_model_pool() -> ModelPool:
+    """プロセス内で共有する既定のプール（作るだけで、初期化は最初に使われたとき）"""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = ModelPool(max_concurrency=int(os.getenv('BRIDGE_MODEL_CONCURRENCY', '4')))
+        return _default_pool
@@ -0,0 +1,224 @@
+"""AI 手番の投機的な先読み（asyncio）
+
+座席の判断に必要な局面が確定した時点で、その座席の判断をバックグラウンドで始めておく。
+- AI の手番が表示された時点（実行ボタンを押す前）にその座席の判断を始める
+- 人間（South）が考えている間に、候補が少なければ各候補を指した後の次の AI の判断を始める
+- 判断が出たら、その手を適用した局面で続く AI 座席の判断を連鎖的に始める
+手番が来たら `take` で結果を受け取り、実際の進行と合わなくなった投機はキャンセルする。
+投機は卓（`BridgeGame.table_id`）ごとに分けて持ち、キャンセルもその卓の中だけで行う
+（別のセッションの卓の投機は消さない）。最近使った `max_tables` 卓を超えたら古い卓の投機から捨てる。
+`auto_advance` は次に人間が判断する局面まで AI の手をまとめて進める（1回の再実行で済ませる早送り）。
+
+イベントループは専用スレッドで回し、判断自体（Gemini への問い合わせや DD 探索）は
+スレッドプールで実行する。投機は `BridgeGame.fork` したコピーの上で行うので元の局面は変わらない。
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from ai_cache import decision_key
+
+HUMAN_SEAT = 'South'
+
+
+def next_ai_turn(game) -> Optional[Tuple[str, str]]:
+    """次に AI が判断する (座席, 'auction' | 'play')。人間の手番や終局なら None"""
+    if game.game_phase == 'auction':
+        player = game.current_bidder
+        return (player, 'auction') if player != HUMAN_SEAT else None
+    if game.game_phase == 'play':
+        if len(game.current_trick) == 4:
+            return None
+        player = game.get_current_player()
+        # UI と同じく、South がディクレアラーならダミーも人間が操作する
+        if player == HUMAN_SEAT or (player == game.dummy and game.declarer == HUMAN_SEAT):
+            return None
+        return player, 'play'
+    return None
+
+
+def decide(game, player: str, kind: str):
+    if kind == 'auction':
+        return game.get_ai_auction_call(player)
+    return game.get_ai_card_play(player)
+
+
+def apply_action(game, player: str, kind: str, action):
+    """コール／カードを局面に適用する（トリックが埋まれば完了させる）"""
+    if kind == 'auction':
+        game.make_auction_call(action)
+    else:
+        game.play_card(player, action)
+        if len(game.current_trick) == 4:
+            game.complete_trick()
+
+
+def auto_advance(game, take=decide, delay: float = 0.0,
+                 on_step: Optional[Callable[[Any], None]] = None) -> int:
+    """人間の判断が要るところ（South の手番、South がディクレアラーのときのダミー）まで AI の手と
+    トリックの完了を続けて適用し、進めた手数を返す。on_step は1手ごと（表示の更新用）、delay はその後の待ち秒数"""
+    steps = 0
+    while game.game_phase in ('auction', 'play'):
+        if game.game_phase == 'play' and len(game.current_trick) == 4:
+            game.complete_trick()
+        else:
+            turn = next_ai_turn(game)
+            if turn is None:
+                break
+            action = take(game, *turn)
+            if action is None:
+                break
+            apply_action(game, *turn, action)
+        steps += 1
+        if on_step is not None:
+            on_step(game)
+        if delay > 0:
+            time.sleep(delay)
+    return steps
+
+
+def state_path(game) -> tuple:
+    """ディールとそこまでの全アクションの列（投機が現在の進行の先にあるかの判定用）"""
+    played = [play for trick in game.tricks for play in trick['cards']] + list(game.current_trick)
+    original = dict((player, hand.mask) for player, hand in game.players.items())
+    for play in played:
+        original[play['player']] |= play['card'].bit
+    calls = tuple((c['type'], c.get('level'), c.get('suit')) for c in game.auction_history)
+    return (tuple(sorted(original.items())),) + calls + tuple(play['card'].index for play in played)
+
+
+class PrefetchScheduler:
+    def __init__(self, max_workers: int = 2, max_branches: int = 6, chain_depth: int = 3, max_tables: int = 64):
+        self.max_branches = max_branches
+        self.chain_depth = chain_depth
+        self.max_tables = max_tables
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prefetch')
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='prefetch-loop', daemon=True)
+        self._thread.start()
+        self._lock = threading.Lock()
+        # 卓 ID -> 判断キー -> (Future, その投機の局面のパス)
+        self._pending: 'OrderedDict[Optional[str], Dict[str, Tuple[Future, tuple]]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.cancelled = 0
+
+    # --- 投機の開始 ---
+
+    def speculate(self, game, player: str, kind: str, depth: int = 0):
+        """game の現在局面での player の判断を先に始める"""
+        fork = game.fork()
+        key = decision_key(fork, player, kind)
+        with self._lock:
+            pending = self._table(fork.table_id)
+            if key in pending:
+                return
+            future = asyncio.run_coroutine_threadsafe(self._run(fork, player, kind, depth), self._loop)
+            pending[key] = (future, state_path(fork))
+
+    def _table(self, table_id: Optional[str]) -> Dict[str, Tuple[Future, tuple]]:
+        """卓の投機（ロックを持って呼ぶ）。卓が多すぎれば一番長く使っていない卓の投機を捨てる"""
+        pending = self._pending.get(table_id)
+        if pending is None:
+            pending = self._pending[table_id] = {}
+            while len(self._pending) > self.max_tables:
+                _, dropped = self._pending.popitem(last=False)
+                self._cancel(dropped.values())
+        else:
+            self._pending.move_to_end(table_id)
+        return pending
+
+    def _cancel(self, entries: Iterable[Tuple[Future, tuple]]):
+        for future, _ in entries:
+            if future.cancel():
+                self.cancelled += 1
+
+    def speculate_next(self, game):
+        """今が AI の手番ならその判断を始める"""
+        turn = next_ai_turn(game)
+        if turn is not None:
+            self.speculate(game, *turn)
+
+    def speculate_options(self, game, player: str, kind: str, options: Iterable[Any]):
+        """人間の候補手が少なければ、各候補の後に来る AI の判断を始める"""
+        options = list(options)
+        self.prune(game)
+        if len(options) > self.max_branches:
+            return
+        for option in options:
+            fork = game.fork()
+            apply_action(fork, player, kind, option)
+            turn = next_ai_turn(fork)
+            if turn is not None:
+                self.speculate(fork, *turn, depth=1)
+
+    async def _run(self, fork, player: str, kind: str, depth: int):
+        action = await self._loop.run_in_executor(self._executor, decide, fork, player, kind)
+        if action is not None and depth < self.chain_depth:
+            # 判断が出た手を適用した先で、続く AI の判断も始めておく
+            apply_action(fork, player, kind, action)
+            turn = next_ai_turn(fork)
+            if turn is not None:
+                self.speculate(fork, *turn, depth=depth + 1)
+        return action
+
+    # --- 結果の受け取り ---
+
+    def take(self, game, player: str, kind: str, timeout: Optional[float] = None):
+        """手番が来た判断を返す。投機済みならその結果、なければその場で判断する"""
+        key = decision_key(game, player, kind)
+        with self._lock:
+            entry = self._pending.get(game.table_id, {}).pop(key, None)
+        self.prune(game)
+        action = None
+        if entry is not None:
+            try:
+                action = entry[0].result(timeout)
+            except Exception:  # キャンセル・タイムアウト・判断中の例外はその場での判断に回す
+                action = None
+        if action is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            action = decide(game, player, kind)
+        return action
+
+    def prune(self, game):
+        """game の卓の投機のうち、現在の進行の先にない（別の手が選ばれた）ものをキャンセルする"""
+        path = state_path(game)
+        with self._lock:
+            pending = self._pending.get(game.table_id)
+            if not pending:
+                return
+            stale = [key for key, (_, spec_path) in pending.items() if spec_path[:len(path)] != path]
+            self._cancel(pending.pop(key) for key in stale)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pending = sum(map(len, self._pending.values()))
+        return {'pending': pending, 'hits': self.hits, 'misses': self.misses, 'cancelled': self.cancelled}
+
+    def shutdown(self):
+        with self._lock:
+            for pending in self._pending.values():
+                for future, _ in pending.values():
+                    future.cancel()
+            self._pending.clear()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._executor.shutdown(wait=False)
+
+
+_default_scheduler: Optional[PrefetchScheduler] = None
+_default_lock = threading.Lock()
+
+
+def get_scheduler() -> PrefetchScheduler:
+    """プロセス内で共有する既定のスケジューラ"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = PrefetchScheduler()
+        return _default_scheduler
@@ -0,0 +1,381 @@
+"""フェーズ別のプロンプト・コンパイラ
+
+戦略ドキュメント（`ADVANCED_BRIDGE_PROMPT`）をタグ付きのセクション（オープニング・応答・
+競り合い・スラム・約束事・デクレアラープレイ・ディフェンスなど）に分けて持ち、
+問い合わせごとに今の局面に関係するセクションだけをトークン予算の範囲で組み立てる。
+毎回ドキュメント全体を送らないので、1回の問い合わせのトークン数と応答待ちが数分の一になる。
+
+トークン数はローカルの見積もり（`estimate_tokens`）で数えるので、オフラインで確認できる:
+
+    python prompts.py              # 局面ごとのプロンプトの大きさ
+    python prompts.py --budget 600
+"""
+import argparse
+import math
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from bidding import AuctionView
+
+# 既定のトークン予算（局面の説明と指示を含めた全体）
+DEFAULT_TOKEN_BUDGET = 1500
+
+
+class Section(NamedTuple):
+    """ドキュメントの1セクション。tags がすべて局面のタグに含まれるときに候補になる"""
+    name: str
+    tags: Tuple[str, ...]
+    text: str
+
+
+# ドキュメント順。'core' は常に入る。'review'（対局後の振り返り）と 'explain'（理由の説明）は
+# 明示的に求めたときだけ使う
+SECTIONS: List[Section] = [
+    Section('basics', ('core',), """\
+【ブリッジAI戦略ドキュメント（詳細・具体例付き）】
+あなたはコントラクトブリッジの上級者として、以下の原則・戦略・人間的な思考パターンを常に意識して判断してください。
+■ 基本原則
+- パートナーとの協調・情報伝達（ビディング・プレイ）を重視する。
+- 状況ごとに最善手を考え、安易な決め打ちや機械的な判断を避ける。
+- すべての判断に「なぜその選択をするのか」という根拠を持つ。
+"""),
+    Section('bidding', ('auction',), """\
+■ ハンド評価・ビディング戦略
+- HCP（High Card Point）だけでなく、配分点（分散点）、ロングスート・ショートスートの価値も加味して総合的に評価する。
+- 例：ダブルフィットやシングルトン・ボイドの価値を積極的に評価。
+- パートナーのビッド意図・意味（システムやコンベンション）を常に推測し、協力的な応答を心がける。
+- 例：パートナーが1NTオープン→バランス型・15-17HCPと推測し、Staymanやトランスファーを活用。
+- 競争的な場面では、犠牲ビッド・妨害ビッド・ダブル/リダブルの意図を明確に持つ。
+- 例：敵が高いレベルで契約しそうな場合、妨害的に高めのビッドを検討。
+- 人間らしい「迷い」や「バランス感覚」も再現し、常に最も合理的な選択肢だけでなく、時にリスクを取る判断も許容する。
+- 直近のビディング履歴・パートナー/敵の傾向も考慮し、過去のビッドから相手の手の特徴を推理する。
+- 例：敵が積極的にダブルを多用→攻撃的なスタイルと推測し、慎重な応札を心がける。
+- 競りの途中で「パートナーの意図が不明瞭な場合」は、無理に高い契約を目指さず安全策を取る。
+"""),
+    Section('opening', ('opening',), """\
+1. オープニングビッド：手札の「物語」を語る
+オープニングビッドは、あなたの手札が持つ最も重要な情報をパートナーに伝える最初のチャンスです。単なるHCPの合計だけでなく、ハンドのシェイプ（形状）と各スートの品質を正確に伝える意識を持ちましょう。
+1NTオープン (15-17HCP、バランスハンド):
+これは非常に強力なオープニングです。パートナーに「私の手札はバランスが取れていて、主要なスートに致命的な弱点はない」という安心感を与えます。相手からの攻撃を予測しやすく、ノートランプゲームは点数が高いため、まずはこれを検討できるハンドを目指しましょう。
+1メジャーオープン (1♥, 1♠):
+HCPが12-21で、5枚以上の良質なメジャースートがある場合に行います。良質とは、トップランクのカード（A, K, Q）が含まれているか、枚数が多いことによるトリック確保の可能性が高いことを指します。メジャーゲームはパートスコアでも点数が高く、ゲームメイクの可能性も高いため、最優先で開示すべき情報です。パートナーが適切なサポートを見つければ、すぐにゲーム、あるいはスラムへと進む準備ができます。
+1マイナーオープン (1♣, 1♦):
+HCPが12-21で、メジャーのオープニングができない場合に行います。通常、4枚以上のマイナーを少なくとも1つ持っているか、メジャーが4-4でHCPが十分にある場合です。特に1クラブオープンは、バランスハンドでHCPが12-14の場合や、21HCP以上の非常に強いハンドを2クラブオープン（強制ビッド）の代わりに使う場合もあります（これはコンベンションによります）。マイナーオープニングは、ゲーム契約が達成しにくいものの、パートナーとの情報交換の足がかりとなります。
+2クラブオープン (22HCP以上、または非常に強い片寄ったハンド):
+これは**ゲームフォース（Game Forcing）**のビッドであり、パートナーは手札の強さに関わらず何らかの応答をしなければなりません。あなたのハンドがゲームを約束していることを明確に伝え、スラムの可能性を探るための出発点となります。
+弱い2ビッド (2♥, 2♠, 2NT):
+HCPは少ないが、非常に長い（6枚以上）で、良質なトップトリックが期待できるスートがある場合に行います。これはプリエンプティブビッドと呼ばれ、相手のオークションを妨害する目的が強いです。相手に適切なレベルでコントラクトを見つけさせないように、高いレベルでビッドすることで、相手に「高いリスクを負ってゲームを宣言するか、諦めるか」の選択を迫ります。パートナーには「少ないHCPだが、このスートだけは強い」と伝え、無理なゲーム追求を避けるよう促します。
+"""),
+    Section('response', ('response',), """\
+2. パートナーのビッドへの応答：的確な情報交換
+パートナーのオープニングビッドに対する応答は、あなたの手札とパートナーの手札の**「フィット（適合性）」**を見つけるための重要なステップです。
+HCPとフィットの概念:
+ブリッジでは、単なるHCPの合計だけでなく、パートナーのスートと自分のスートがどれだけ噛み合うか（フィット）が重要です。HCPが少なくても、フィットがあることでトリックが増えることがあります（フィットポイントやシェイプポイント）。
+サポートビッド:
+パートナーが宣言したスートに3枚以上あり、そのスートをトランペット（切り札）にするのが有効だと判断した場合、そのスートを宣言します。レベルを上げることで、自身のHCPの範囲を示します。例：パートナーが1♠と宣言し、自分に♠が4枚あり9HCPなら2♠。もし12HCP以上あれば、いきなり3♠や4♠と宣言してゲームを約束することも考えられます。
+新しいスートの宣言:
+パートナーのスートにフィットがなく、自分に5枚以上のスートがある場合に行います。この時、レベルの上げ方が重要です。より高いレベルで宣言するほど、より多くのHCPがあることを示します。
+NTへの応答:
+パートナーが1NTオープンした場合、あなたのHCPと手札の形状に応じて応答します。
+パス: HCPが少ない（0-7HCP）場合。
+2NT (8-9HCP): パートナーにゲームの可能性を示唆します。
+3NT (10-12HCP): NTゲームへの到達を宣言します。
+ジャコビー2NT（コンベンション）やステイマン（コンベンション）などの使用で、さらに詳細な情報を引き出します。
+"""),
+    Section('competitive', ('competitive',), """\
+3. ディフェンシブビッド：相手のオークションをかく乱する
+相手チームがオークションに参加してきた場合、あなたのビッドはディフェンシブビッドとなります。相手を妨害しつつ、パートナーに有益な情報を伝えることを目指します。
+オーバーコール:
+相手がビッドした後に、あなたが独立した5枚以上の良いスートと**十分なHCP（通常10HCP以上）**を持っている場合に行います。これはパートナーに、あなたのサイドにもゲームの可能性があり、ディフェンスにも自信があることを伝えます。ただし、オーバーコールしたスートでトリックを取れないと、大きなペナルティを受けるリスクもあります。
+テイクアウトダブル:
+相手のビッドに対して「ダブル」を宣言します。これは通常、あなたのHCPがオープニングハンドに匹敵し（12HCP以上）、相手の宣言したスートに短い（0～2枚）が、残りの3つのスートにバランスよくサポートがあることを示します。パートナーに「好きなスートを宣言してほしい」という明確なメッセージになります。相手をディフェンスで打ち負かす自信がある、または自分のサイドでゲームを達成する可能性を探るための強力なツールです。
+競争ビッド:
+相手チームとあなたのチームがゲームコントラクトを目指して競り合っている状況です。この時、「これはパートスコアの戦いなのか、ゲームの戦いなのか」を意識することが重要です。相手にゲームを達成させないために、あえて無理なレベルまでビッドするサクリファイスビッドも戦略の一つですが、その見極めは非常に難しいです。
+"""),
+    Section('slam', ('slam',), """\
+4. スラムの探索：完璧なハンドの追求
+非常に強いハンドを持った時、12トリックのスモールスラムや、13トリックのグランドスラムを目指すためのビッドは、まさにブリッジの醍醐味です。
+強制ビッド（フォースイングビッド）の理解:
+特定のビッドは、パートナーにパスを許さず、何らかの応答を強制します。これにより、オークションが途切れることなく、より詳細な情報交換が行われます。例えば、2クラブオープン後の応答、ジャンプビッド（通常のレベルを飛び越えて高いレベルで宣言する）などがこれにあたります。
+エース・キングの確認（ブラックウッド、ガーバーなど）:
+スラムを達成するためには、通常、トップトリック（エースやキング）の枚数が重要になります。ブラックウッドやガーバーといったコンベンションは、パートナーが持っているエースやキングの枚数を問い合わせるための決められたビッドシーケンスです。これにより、安全にスラムを宣言できるか、あるいはトップトリックが足りずに失敗するかを判断できます。
+具体的なキュービッド:
+相手のスートを宣言するなどして、特定のキーカードを持っているかを確認したり、セカンダリーコントロール（キング、クイーン、ジャックなど）の有無を伝えたりするビッドです。これは、スラムの安全性をさらに高めるための高度なテクニックです。
+"""),
+    Section('conventions', ('convention',), """\
+5. コンベンションの活用：共通言語の構築
+上級者になるためには、パートナーとの間で**「コンベンション（約束事）」**を共有し、それらを適切に活用することが不可欠です。コンベンションは、限られたビッドの枠の中で、より多くの情報を交換するための「共通言語」です。
+ステイマン: 1NTオープン後の2クラブビッドで、パートナーにメジャー4枚スーツの有無を問い合わせるコンベンション。
+ジャコビー2NT: 1メジャーオープン後の2NTビッドで、パートナーにゲームフォースのフィットがあることを示すコンベンション。
+トランスファー: 1NTオープン後、パートナーに特定のメジャーを強制的に宣言させることで、ディクレアラー（プレイする側）をコントロールするコンベンション。
+その他の多くのコンベンション: スプリンター、ガブリエル、ライトナーなど、状況に応じた様々なコンベンションが存在します。これらを学ぶことで、あなたのオークションは格段に洗練されます。
+"""),
+    Section('declarer', ('declarer',), """\
+■ プレイ戦略（デクレアラー）
+- トリックプランを必ず立てる。危険スートの管理、エントリーの確保、フィネスの活用、スーツブレイクのタイミングを考える。
+- 例：トランプコントロールが必要な場合、まずトランプを抜き切る。
+- 例：フィネスが有効な場合、リスクとリターンを天秤にかけて実行。
+- ダミーの手札を最大限活用し、エントリーの順序やスイッチを工夫する。
+- 例：ダミーのAでエントリーし、手札のロングスートを伸ばす。
+- 敵の守備シグナルや捨て札から分布・持ち札を推理し、プレイ順を調整する。
+- 例：敵が特定スートを早めに捨てた→そのスートが短いと推測。
+"""),
+    Section('declarer_planning', ('declarer',), """\
+1. デクレアラープレイ：コントラクト達成の指揮者
+デクレアラー（宣言側）は、決められたコントラクトを達成する責任を負います。プレイを始める前に、徹底したプランニングが必要です。
+初期プランニングの徹底
+ルーザーズカウント (Losers Count): まず、手札にある失う可能性のあるトリック（ルーザー）の数を数えます。特に、切り札スートとサイドスート（切り札以外のスート）の両方でルーザーを見積もることが重要です。これがゲームの成功に必要なトリック数を明確にします。
+トップトリックの確定 (Counting Top Tricks): エースやキングなど、確実に取れるトリックの数を数えます。これにより、足りないトリックをどこで補うかが見えてきます。
+トリックの発展 (Developing Tricks): トップトリック以外でトリックを増やす方法を考えます。これは通常、より低いランクのカード（クイーン、ジャックなど）でトリックを取るために、相手のトップカードを抜く（フォースアウトする）ことを含みます。
+フィネス (Finesse): 相手の持っているかもしれないトップカードを避けて、自分の低いカードでトリックを取るテクニックです。例えば、A-Qと持っていてKが相手にある場合、Qを出して相手のKを引かせ、その後Aでトリックを取る、といったことを指します。フィネスのリスクとリターンを常に評価しましょう。
+ダミーのリソース評価: パートナー（ダミー）の手札が持つ価値を最大限に引き出すプランを立てます。ダミーのどのスートを伸ばすか、いつダミーにリードを渡すかなどを考えます。
+"""),
+    Section('trump_management', ('declarer', 'trump'), """\
+切り札の管理 (Trump Management)
+切り札の抜き方 (Drawing Trumps): コントラクトが切り札スートである場合、通常は相手から切り札を抜き切ることが最優先です。相手に切り札が残っていると、あなたのサイドスートが切り札で潰されてしまうリスクがあるからです。ただし、切り札をすぐに抜かない方が良い場合もあります（後述のクロストランプなど）。
+切り札の配分 (Trump Distribution): 相手の切り札がどのように配分されているかを推測し、それに基づいてプレイを進めます。
+切り札のタイミング (Timing of Trump Play): 切り札を抜くタイミングは非常に重要です。サイドスートのトリックを伸ばすために切り札を温存することもありますし、逆に早期に切り札を抜いて安全を確保することもあります。
+"""),
+    Section('declarer_timing', ('declarer',), """\
+リードとタイミングの調整 (Lead and Timing)
+リードの重要性: どのスートからプレイを開始するか（オープニングリード）は、その後のゲーム展開を大きく左右します。ディクレアラーとして、自分のプランに沿って最適なスートをリードしましょう。
+テンポ (Tempo): プレイの「テンポ」をコントロールします。例えば、相手にリードを渡すことで、相手に不利なスートからリードさせるといった戦略もあります。
+ディスカードとスクイーズ (Discard and Squeeze)
+ディスカード (Discard): 不要なカードを捨てることで、手札の形を整え、後続のトリックで有利になるようにします。相手のディスカードからも情報を読み取ることができます。
+スクイーズ (Squeeze): 相手に選択を迫り、どちらのスートを捨ててもディクレアラーがトリックを取れるように仕向ける高度なテクニックです。これは非常に難易度が高いですが、成功すると大きな達成感があります。
+安全なプレイ (Safety Play)
+コントラクト達成を確実にするために、あえて全てのトリックを取ろうとせず、最低限必要なトリックを確保するプレイです。例えば、特定のカードが相手のどちらにあるかわからない場合、リスクを最小限に抑える方法を選択します。
+"""),
+    Section('defense', ('defense',), """\
+■ プレイ戦略（ディフェンス）
+- パートナーのシグナル（Encourage/Discourage, Count, Suit Preference）を読み取り、協力的な守備を行う。
+- 例：パートナーが高いカードを出した→そのスートを続けて欲しいサイン。
+- ディフェンス時は「危険なスート」を意識し、安易にエントリーを与えない。
+- 例：デクレアラーのロングスートにエントリーを与えないよう注意。
+- カードの出し方・順番・テンポにも意味を持たせ、ブラフや情報隠しも時に活用。
+- 例：本当はシングルトンだが、テンポを変えて相手に誤解を与える。
+"""),
+    Section('opening_lead', ('defense', 'lead'), """\
+オープニングリードの選択
+最も重要な瞬間: プレイ全体を通して最も重要なディフェンスの判断の一つです。適切なオープニングリードは、宣言者のプランを崩し、ディフェンスにトリックをもたらします。
+パートナーのビッドからヒントを得る: オークション中にパートナーが宣言したスートや、オーバーコール、ダブルなどから、パートナーが強いスートや枚数を持っているスートを推測し、そこからリードを検討します。
+危険なスートを避ける: 宣言者が得意そうなスートや、宣言者がトリックを伸ばしそうなスートへのリードは避けましょう。
+エースからリードしない: 通常、エースからリードすると相手のキングをフリーにしてしまう可能性があるため、避けるべきです。例外として、切り札スートで相手をフォースしたい場合などがあります。
+トップオブシーケンス (Top of Sequence): 連続した高位カード（例: K-Q-J）がある場合、一番高いカードからリードすることで、パートナーにそのスートの状況を知らせ、トリックを確保する可能性が高まります。
+"""),
+    Section('defense_signals', ('defense',), """\
+2. ディフェンスプレイ：宣言者を阻止する守護者
+ディフェンス（守備側）は、宣言者のコントラクト達成を阻止するために協力します。パートナーとのコミュニケーションが特に重要になります。
+シグナルとディスカード (Signaling and Discarding)
+シグナル (Signaling): プレイ中にカードを出す順序や、どのカードを出すかによって、パートナーに自分の手札の状況を伝えます。
+アティチュードシグナル (Attitude Signal): そのスートへの好意（ハイカードを出す）か嫌悪（ローカードを出す）を示す。
+カウンティングシグナル (Counting Signal): そのスートに何枚持っているかを示す（偶数枚か奇数枚かなど）。
+リターンシグナル (Return Signal): 相手のスートをリードする際に、特定のカードでパートナーにリターンしてほしいスートを要求する。
+ディスカード (Discard): 宣言者がサイドスートを伸ばしてきた時に、不要なカードを捨てることでパートナーに情報を伝えます。捨てたスートは、通常、そのスートに興味がないか、そのスートでのトリックを期待していないことを示します。
+テンポの理解とコントロール
+ディフェンス側もプレイのテンポを意識することが重要です。相手にリードを渡すことで、不利なスートからのリードを強要したり、自分のサイドスートを伸ばす時間を稼いだりします。
+"""),
+    Section('trump_defense', ('defense', 'trump'), """\
+切り札のディフェンス
+アンダートランプ (Undertrump): 宣言者の切り札を低い切り札で切ることで、切り札を消耗させます。
+オーバートランプ (Overtrump): 宣言者が出した切り札を、より高い切り札で切ることでトリックを奪います。
+切り札を温存する： 自分のサイドスートに切り札を切られないように、切り札を温存することも重要です。
+"""),
+    Section('inference', ('defense',), """\
+読解と推測 (Reading and Inference)
+オークションでのビッド、プレイ中のカードの出し方、ディスカードなど、相手とパートナーのあらゆる動きから情報を読み取り、相手の手札やプランを推測します。これがディフェンスの成功の鍵となります。
+"""),
+    Section('risk', ('risk',), """\
+■ その他の高度な戦略
+- バルネラビリティ（脆弱/非脆弱）や得点状況を常に意識し、リスク管理を徹底する。
+- 例：脆弱時は無理な犠牲ビッドを避ける。
+- ゲームやスラムの可能性がある場合は、積極的に探るが、無理なジャンプビッドは避ける。
+- 例：パートナーが強い手を示唆した場合のみスラムトライ。
+- AIらしさを抑え、人間の熟練者のような自然な思考・説明・判断を心がける。
+- 迷った場合は「人間らしい」バランス感覚・直感も反映し、時に安全策・時にチャレンジングな選択も行う。
+"""),
+    Section('review', ('review',), """\
+上級者への道：実践と振り返り
+ブリッジのプレイは、知識だけでなく経験が大きく影響します。
+徹底的な分析: プレイが終わった後、そのボードを振り返り、なぜコントラクトが成功したのか、失敗したのかを分析しましょう。別のプレイ方法があったか、ディフェンスは最適だったか、などを考察します。
+パートナーシップの深化: パートナーとの間で、プレイ中のシグナルやディスカードの約束事を確認し、プレイの意図を共有することで、チームとしての精度が高まります。
+上級者のプレイを学ぶ: 経験豊富なプレイヤーのプレイを観察したり、ブリッジの書籍やオンラインリソースで上級者のテクニックを学んだりすることも有効です。
+"""),
+    Section('explain', ('explain',), """\
+【出力形式・注意】
+- 指示されたフォーマット・制約を厳守。
+- 必要に応じて理由や根拠も簡潔に説明する。
+- 迷った場合は「人間らしい」バランス感覚・直感も反映する。
+- 具体的な判断理由や、考慮した要素（例：HCP, 配分, パートナーの意図, 敵の傾向, 得点状況など）を1-2文で補足すること。
+"""),
+]
+
+SECTION_BY_NAME: Dict[str, Section] = {section.name: section for section in SECTIONS}
+
+# 全体を1つの文字列にしたもの（以前の `advanced_bridge_prompt` に相当）
+ADVANCED_BRIDGE_PROMPT = '\n'.join(section.text for section in SECTIONS)
+
+
+def estimate_tokens(text: str) -> int:
+    """ローカルのトークン数の見積もり（かな・漢字などは1文字1トークン、ASCII は4文字で1トークン）"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (len(text) - ascii_chars) + math.ceil(ascii_chars / 4)
+
+
+FULL_DOCUMENT_TOKENS = estimate_tokens(ADVANCED_BRIDGE_PROMPT)
+
+
+class CompiledPrompt(NamedTuple):
+    text: str
+    tokens: int
+    sections: Tuple[str, ...]   # 入れたセクション名（入れた順）
+    dropped: Tuple[str, ...]    # 関係はあるが予算に入らなかったセクション名
+    budget: int
+
+    @property
+    def over_budget(self) -> bool:
+        return self.tokens > self.budget
+
+
+def situation_tags(game, player: str, kind: str) -> List[str]:
+    """局面のタグを重要な順に並べる（先にあるタグのセクションほど優先して入れる）"""
+    if kind == 'auction':
+        view = AuctionView(game, player)
+        tags: List[str] = []
+        partner_bids = [c for c in view.our_bids if c['player'] == view.partner]
+        if view.their_bids and not view.our_bids:
+            tags.append('competitive')  # 相手が先に始めた: 参加するかどうか
+        elif partner_bids:
+            tags.append('response')
+        else:
+            tags.append('opening')  # オープン、または自分だけがビッドしていればオープナーのリビッド
+        if view.their_bids and 'competitive' not in tags:
+            tags.append('competitive')
+        opening = view.opening if view.we_opened else None
+        top_level = max((c['level'] for c in view.our_bids), default=0)
+        strong_opening = opening is not None and opening['level'] == 2 and opening['suit'] == '♣'
+        if (top_level >= 4 or strong_opening or any(c['suit'] == 'NT' and c['level'] >= 4 for c in view.bids)
+                or (partner_bids and game.players[player].hcp >= 16)):
+            tags.append('slam')
+        if (opening is not None and opening['player'] == view.partner
+                and (opening['suit'] == 'NT' or opening['level'] == 1 and opening['suit'] in ('♥', '♠'))) \
+                or 'slam' in tags:
+            tags.append('convention')
+        tags.append('auction')
+        if view.their_bids or 'slam' in tags:
+            tags.append('risk')
+        return tags
+    declaring = game.get_partnership(player) == game.get_partnership(game.declarer)
+    tags = ['declarer' if declaring else 'defense']
+    if not declaring and not game.tricks and not game.current_trick:
+        tags.insert(0, 'lead')
+    if game.trump_suit != 'NT':
+        tags.append('trump')
+    return tags
+
+
+def compile_prompt(tags: Sequence[str], situation: str = '', instruction: str = '',
+                   budget: int = DEFAULT_TOKEN_BUDGET, extra: Iterable[str] = ()) -> CompiledPrompt:
+    """タグに合うセクションを優先順に予算まで入れ、局面の説明と指示を後ろに付ける
+
+    'core' のセクションと situation / instruction は予算を超えても必ず入る（over_budget で分かる）。
+    extra に 'explain' や 'review' を渡すとそれらも候補になる。
+    """
+    tags = list(tags) + [tag for tag in extra if tag not in tags]
+    rank = {tag: i for i, tag in enumerate(tags)}
+    tail = [part for part in (situation, instruction) if part]
+    core = [section for section in SECTIONS if 'core' in section.tags]
+    candidates = [section for section in SECTIONS
+                  if 'core' not in section.tags and all(tag in rank for tag in section.tags)]
+    # セクションのタグのうち最も優先度の低いもので並べる（同じならドキュメント順）
+    candidates.sort(key=lambda section: max(rank[tag] for tag in section.tags))
+
+    used = sum(estimate_tokens(section.text) + 1 for section in core)
+    used += sum(estimate_tokens(part) + 1 for part in tail)
+    chosen = {section.name for section in core}
+    dropped = []
+    for section in candidates:
+        cost = estimate_tokens(section.text) + 1
+        if used + cost <= budget:
+            chosen.add(section.name)
+            used += cost
+        else:
+            dropped.append(section.name)
+    # 本文はドキュメント順に並べる
+    parts = [section.text for section in SECTIONS if section.name in chosen] + tail
+    text = '\n'.join(parts)
+    names = tuple(section.name for section in SECTIONS if section.name in chosen)
+    return CompiledPrompt(text, estimate_tokens(text), names, tuple(dropped), budget)
+
+
+class PromptStats:
+    """組み立てたプロンプトの大きさの記録（サイドバー表示用。投機スレッドからも呼ばれる）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_tokens = 0
+        self.last: Optional[CompiledPrompt] = None
+
+    def record(self, compiled: CompiledPrompt):
+        with self._lock:
+            self.count += 1
+            self.total_tokens += compiled.tokens
+            self.last = compiled
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                'count': self.count,
+                'mean_tokens': self.total_tokens / self.count if self.count else 0.0,
+                'last_tokens': self.last.tokens if self.last else 0,
+                'last_sections': self.last.sections if self.last else (),
+                'full_tokens': FULL_DOCUMENT_TOKENS,
+            }
+
+
+PROMPT_STATS = PromptStats()
+
+
+def compile_for(game, player: str, kind: str, situation: str = '', instruction: str = '',
+                budget: int = DEFAULT_TOKEN_BUDGET, extra: Iterable[str] = ()) -> CompiledPrompt:
+    """game の局面からタグを決めて compile_prompt し、大きさを PROMPT_STATS に記録する"""
+    compiled = compile_prompt(situation_tags(game, player, kind), situation, instruction, budget, extra)
+    PROMPT_STATS.record(compiled)
+    return compiled
+
+
+# --- オフラインでの確認 ---
+
+_SAMPLE_SITUATIONS: List[Tuple[str, Sequence[str]]] = [
+    ('opening', ['opening', 'auction']),
+    ('response to 1NT', ['response', 'convention', 'auction']),
+    ('competitive', ['competitive', 'auction', 'risk']),
+    ('slam try', ['response', 'slam', 'convention', 'auction', 'risk']),
+    ('declarer (suit)', ['declarer', 'trump']),
+    ('declarer (NT)', ['declarer']),
+    ('opening lead', ['lead', 'defense', 'trump']),
+    ('defense (NT)', ['defense']),
+]
+
+
+def format_report(budget: int) -> str:
+    full = FULL_DOCUMENT_TOKENS
+    rows = [f"full document: {full} tokens ({len(ADVANCED_BRIDGE_PROMPT)} chars) budget={budget}"]
+    for label, tags in _SAMPLE_SITUATIONS:
+        compiled = compile_prompt(tags, budget=budget)
+        rows.append(f"{label:<18} {compiled.tokens:>5} tokens ({compiled.tokens / full:.0%}) "
+                    f"sections={','.join(compiled.sections)}"
+                    + (f" dropped={','.join(compiled.dropped)}" if compiled.dropped else ''))
+    return '\n'.join(rows)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Report prompt sizes per game phase')
+    parser.add_argument('--budget', type=int, default=DEFAULT_TOKEN_BUDGET, help='token budget per prompt')
+    args = parser.parse_args(argv)
+    print(format_report(args.budget))
+
+
+if __name__ == '__main__':
+    main()
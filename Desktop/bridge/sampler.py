@@ -0,0 +1,313 @@
+"""見えていないハンドの制約つきサンプラー
+
+AI の座席から見えるのは自分のハンドと（公開後の）ダミーだけなので、判断には残りの座席の
+ハンドを「ここまでの情報と矛盾しない配置」として多数サンプルする必要がある。制約は:
+- 既にプレイされたカード（各座席が出したカードはその座席のもの）
+- ショウアウト（リードされたスートをフォローしなかった座席はそのスートを持っていない）
+- オークションから推定した HCP の範囲と各スートの枚数（`bidding.partner_profile` を各座席に適用）
+
+カードの制約はサンプリングの前に処理する（ショウアウトで1座席にしか行けないカードは先に配る）。
+残りのカードは NumPy で一度に多数の並べ替えを作って座席に切り分け、HCP と枚数の制約は
+ベクトル化した棄却で判定する。受理率が低すぎるとき（推定がハンドと合わないとき）は
+オークションの制約を段階的にゆるめ、そのことを `stats()` で報告する。
+
+    python sampler.py -n 5000 --seed 1    # 受理率とスループットの確認
+"""
+import argparse
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from bidding import AuctionView, SUIT_ORDER, partner_profile
+from cards import FULL_DECK, SUIT_CODES, iter_cards
+from solver import SEATS, SEAT_INDEX
+
+# カードインデックス（スート * 13 + ランク）ごとの HCP とスート
+_HCP_OF = np.array([max(rank - 8, 0) for _ in range(4) for rank in range(13)], dtype=np.int16)
+_SUIT_OF = np.repeat(np.arange(4, dtype=np.int8), 13)
+_BIT_OF = np.left_shift(np.uint64(1), np.arange(52, dtype=np.uint64))
+# 1スート分（13ビット）のパターンごとの HCP と枚数
+_PATTERN_HCP = np.array([sum(max(rank - 8, 0) for rank in range(13) if pattern >> rank & 1)
+                         for pattern in range(1 << 13)], dtype=np.int16)
+_PATTERN_LEN = np.array([pattern.bit_count() for pattern in range(1 << 13)], dtype=np.int8)
+
+
+def suit_patterns(masks: np.ndarray) -> np.ndarray:
+    """ハンドのマスクの配列（任意の形）-> 末尾にスート（♣♦♥♠）の軸を足した13ビットのパターン"""
+    masks = np.asarray(masks, dtype=np.uint64)
+    shifts = np.arange(0, 52, 13, dtype=np.uint64)
+    return ((masks[..., None] >> shifts) & np.uint64(0x1FFF)).astype(np.intp)
+
+
+def suit_lengths(masks: np.ndarray) -> np.ndarray:
+    """ハンドのマスクの配列 -> スートごとの枚数（末尾の軸が ♣♦♥♠）"""
+    return _PATTERN_LEN[suit_patterns(masks)]
+
+
+def hand_hcp(masks: np.ndarray) -> np.ndarray:
+    """ハンドのマスクの配列 -> HCP"""
+    return _PATTERN_HCP[suit_patterns(masks)].sum(axis=-1)
+
+# 制約のゆるめ方: (HCP の幅を広げる量, 最低枚数を減らす量, バランスの制約を使うか, オークションを使うか)
+RELAX_LEVELS = [(0, 0, True, True), (2, 1, False, True), (0, 0, False, False)]
+
+
+class SeatConstraint:
+    """1座席の元の13枚についての制約（スートは ♣♦♥♠ のコード順）"""
+    __slots__ = ('hcp_lo', 'hcp_hi', 'min_len', 'max_len')
+
+    def __init__(self):
+        self.hcp_lo, self.hcp_hi = 0, 37
+        self.min_len = [0, 0, 0, 0]
+        self.max_len = [13, 13, 13, 13]
+
+    def __repr__(self):
+        return f"SeatConstraint(hcp={self.hcp_lo}-{self.hcp_hi}, min={self.min_len}, max={self.max_len})"
+
+
+def partner_of(seat: str) -> str:
+    return SEATS[(SEAT_INDEX[seat] + 2) % 4]
+
+
+def auction_constraints(game, seat: str, relax: int = 0) -> SeatConstraint:
+    """seat のコールから推定した制約（パートナーから見た解釈。両サイドとも同じシステムとみなす）"""
+    hcp_slack, len_slack, use_balanced, use_auction = RELAX_LEVELS[relax]
+    constraint = SeatConstraint()
+    if not use_auction or not game.auction_history:
+        return constraint
+    profile = partner_profile(AuctionView(game, partner_of(seat)))
+    constraint.hcp_lo = max(profile.lo - hcp_slack, 0)
+    constraint.hcp_hi = min(profile.hi + hcp_slack, 37)
+    for suit in SUIT_ORDER:
+        code = SUIT_CODES[suit]
+        constraint.min_len[code] = max(profile.lengths[suit] - len_slack, 0)
+        if profile.balanced and use_balanced:
+            constraint.min_len[code] = max(constraint.min_len[code], 2)
+            constraint.max_len[code] = 5
+    return constraint
+
+
+class DealSampler:
+    """game の現在局面で player から見て矛盾しない配置をサンプルする"""
+
+    def __init__(self, game, player: str, seed: Optional[int] = None, use_auction: bool = True,
+                 min_acceptance: float = 0.002):
+        self.player = player
+        self.rng = np.random.default_rng(seed)
+        self.min_acceptance = min_acceptance
+        self.relax = 0 if use_auction else len(RELAX_LEVELS) - 1
+        self.generated = 0
+        self.accepted = 0
+        self.elapsed = 0.0
+        self._game = game
+
+        # 見えているハンド（自分と公開済みのダミー）
+        self.known = {player: game.players[player].mask}
+        if game.dummy_revealed and game.dummy is not None:
+            self.known[game.dummy] = game.players[game.dummy].mask
+        # 各座席がプレイしたカードとショウアウトしたスート（席ごとの特徴量がプレイのたびに更新している）
+        features = {seat: game.hand_features(seat) for seat in SEATS}
+        self.played = {seat: features[seat].played for seat in SEATS}
+        self.voids = {seat: set(features[seat].void_codes) for seat in SEATS}
+
+        self.hidden = [seat for seat in SEATS if seat not in self.known]
+        self.need = {seat: len(game.players[seat]) for seat in self.hidden}
+        unseen = FULL_DECK
+        for seat in SEATS:
+            unseen &= ~self.played[seat]
+        for mask in self.known.values():
+            unseen &= ~mask
+
+        # ショウアウトで1座席にしか行けないカードは先に配る
+        self.forced = {seat: 0 for seat in self.hidden}
+        free: List[int] = []
+        self._needs_void_check = False
+        for card in iter_cards(unseen):
+            code = SUIT_CODES[card.suit]
+            eligible = [seat for seat in self.hidden if code not in self.voids[seat]]
+            if not eligible:
+                raise ValueError(f"no hidden seat can hold {card}")
+            if len(eligible) == 1:
+                self.forced[eligible[0]] |= card.bit
+            else:
+                free.append(card.index)
+                self._needs_void_check |= len(eligible) < len(self.hidden)
+        self.free = np.array(free, dtype=np.int64)
+        self._free_mask = sum(1 << idx for idx in free)
+        self.capacity = [self.need[seat] - self.forced[seat].bit_count() for seat in self.hidden]
+        if any(c < 0 for c in self.capacity) or sum(self.capacity) != len(free):
+            raise ValueError("hand sizes are inconsistent with the cards still unseen")
+        self._set_constraints()
+
+    def _set_constraints(self):
+        """制約を配列にまとめる（プレイ済み＋先に配ったカードの分は固定の寄与として引いておく）"""
+        rows = []
+        for seat in self.hidden:
+            constraint = auction_constraints(self._game, seat, self.relax)
+            fixed = self.played[seat] | self.forced[seat]
+            fixed_hcp = int(_HCP_OF[[card.index for card in iter_cards(fixed)]].sum()) if fixed else 0
+            fixed_len = [(fixed >> (13 * code) & 0x1FFF).bit_count() for code in range(4)]
+            rows.append((constraint.hcp_lo - fixed_hcp, constraint.hcp_hi - fixed_hcp,
+                         [constraint.min_len[k] - fixed_len[k] for k in range(4)],
+                         [constraint.max_len[k] - fixed_len[k] for k in range(4)]))
+        self.constraints = rows
+
+    # --- サンプリング ---
+
+    def _batch(self, size: int) -> np.ndarray:
+        """size 個の候補を作り、制約を満たすものの各座席のマスク（size' × 座席数）を返す"""
+        free = self.free
+        if len(free):
+            order = np.argsort(self.rng.random((size, len(free))), axis=1)
+            cards = free[order]
+        else:
+            cards = np.zeros((size, 0), dtype=np.int64)
+        ok = np.ones(size, dtype=bool)
+        masks = np.zeros((size, len(self.hidden)), dtype=np.uint64)
+        start = 0
+        for i, seat in enumerate(self.hidden):
+            part = cards[:, start:start + self.capacity[i]]
+            start += self.capacity[i]
+            hcp_lo, hcp_hi, min_len, max_len = self.constraints[i]
+            if hcp_lo > 0 or hcp_hi < 37:
+                hcp = _HCP_OF[part].sum(axis=1)
+                ok &= (hcp >= hcp_lo) & (hcp <= hcp_hi)
+            suits = _SUIT_OF[part]
+            for code in range(4):
+                check_void = self._needs_void_check and code in self.voids[seat]
+                if min_len[code] > 0 or max_len[code] < self.capacity[i] or check_void:
+                    length = (suits == code).sum(axis=1)
+                    ok &= (length >= min_len[code]) & (length <= (0 if check_void else max_len[code]))
+            masks[:, i] = np.bitwise_or.reduce(_BIT_OF[part], axis=1) if part.shape[1] else 0
+            masks[:, i] |= np.uint64(self.forced[seat])
+        self.generated += size
+        accepted = masks[ok]
+        self.accepted += len(accepted)
+        return accepted
+
+    def sample(self, n: int, batch_size: int = 1024, max_batch: int = 65536, max_batches: int = 32) -> np.ndarray:
+        """n 個の配置を返す（n × 4 の uint64。列は SEATS 順で、今の各座席のハンド）
+
+        最初は batch_size 個ずつ作り、以後は観測した受理率から残りに必要な数を見積もって作る。
+        受理率が min_acceptance を下回ったらオークションの制約をゆるめて続ける。
+        max_batches 回試しても足りなければ、集まった分だけ返す。
+        """
+        started = time.perf_counter()
+        chunks: List[np.ndarray] = []
+        have = 0
+        generated_at_level, accepted_at_level = 0, 0
+        size = batch_size
+        for _ in range(max_batches):
+            if have >= n:
+                break
+            batch = self._batch(size)
+            chunks.append(batch)
+            have += len(batch)
+            generated_at_level += size
+            accepted_at_level += len(batch)
+            rate = max(accepted_at_level / generated_at_level, self.min_acceptance)
+            size = int(min(max((n - have) / rate * 1.2, batch_size), max_batch))
+            if (accepted_at_level < generated_at_level * self.min_acceptance
+                    and self.relax < len(RELAX_LEVELS) - 1):
+                self.relax += 1
+                self._set_constraints()
+                generated_at_level, accepted_at_level = 0, 0
+        hidden = np.concatenate(chunks)[:n] if chunks else np.zeros((0, len(self.hidden)), dtype=np.uint64)
+        deals = np.zeros((len(hidden), 4), dtype=np.uint64)
+        for seat, mask in self.known.items():
+            deals[:, SEAT_INDEX[seat]] = np.uint64(mask)
+        for i, seat in enumerate(self.hidden):
+            deals[:, SEAT_INDEX[seat]] = hidden[:, i]
+        self.elapsed += time.perf_counter() - started
+        return deals
+
+    def consistent(self, deals: np.ndarray) -> np.ndarray:
+        """sample と同じ形の配置が今の情報と矛盾しないか（bool の配列）
+
+        見えているハンドが一致し、見えない座席はまだ見えていないカードだけを正しい枚数持ち、
+        オークションの制約（今のゆるめ具合）とショウアウトを満たすものが True。
+        前の判断でサンプルした配置を次の判断で使い回すときに使う。
+        """
+        deals = np.asarray(deals, dtype=np.uint64)
+        ok = np.ones(len(deals), dtype=bool)
+        for seat, mask in self.known.items():
+            ok &= deals[:, SEAT_INDEX[seat]] == np.uint64(mask)
+        for i, seat in enumerate(self.hidden):
+            hand = deals[:, SEAT_INDEX[seat]]
+            forced = np.uint64(self.forced[seat])
+            ok &= (hand & ~np.uint64(self._free_mask | self.forced[seat])) == 0
+            ok &= (hand & forced) == forced
+            # 制約は先に配ったカードを除いた部分についての値になっている
+            part = hand & ~forced
+            lengths = suit_lengths(part)
+            ok &= lengths.sum(axis=1) == self.capacity[i]
+            hcp_lo, hcp_hi, min_len, max_len = self.constraints[i]
+            hcp = hand_hcp(part)
+            ok &= (hcp >= hcp_lo) & (hcp <= hcp_hi)
+            for code in range(4):
+                upper = 0 if code in self.voids[seat] else max_len[code]
+                ok &= (lengths[:, code] >= min_len[code]) & (lengths[:, code] <= upper)
+        return ok
+
+    def sample_hands(self, n: int, **kwargs) -> List[List[int]]:
+        """sample の結果を solver に渡せる形（座席順のマスクの list）で返す"""
+        return [[int(mask) for mask in row] for row in self.sample(n, **kwargs)]
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            'generated': self.generated,
+            'accepted': self.accepted,
+            'acceptance_rate': self.accepted / self.generated if self.generated else 0.0,
+            'relax_level': self.relax,
+            'deals_per_sec': self.accepted / self.elapsed if self.elapsed else 0.0,
+            'hidden': list(self.hidden),
+        }
+
+
+# --- 受理率とスループットの確認 ---
+
+def _describe(label: str, sampler: DealSampler) -> str:
+    s = sampler.stats()
+    return (f"{label:<22} accepted={s['accepted']:>6} generated={s['generated']:>7} "
+            f"acceptance={s['acceptance_rate']:.1%} relax={s['relax_level']} "
+            f"deals/sec={s['deals_per_sec']:.0f}")
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    from game import BridgeGame
+    from bidding import choose_call
+
+    parser = argparse.ArgumentParser(description='Report acceptance rate and throughput of the deal sampler')
+    parser.add_argument('-n', '--samples', type=int, default=5000, help='layouts per position')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--boards', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    for board in range(args.boards):
+        game = BridgeGame(use_gemini=False, seed=args.seed * 1000 + board)
+        game.determine_partnerships_and_dealer()
+        game.deal_cards()
+        game.start_auction()
+        while game.game_phase == 'auction':
+            # オークションの途中（3コール目）でも一度測る
+            if len(game.auction_history) == 3:
+                sampler = DealSampler(game, game.current_bidder, seed=args.seed)
+                sampler.sample(args.samples)
+                print(_describe(f"board {board} auction", sampler))
+            game.make_auction_call(choose_call(game, game.current_bidder))
+        if game.game_phase != 'play':
+            continue
+        # 数トリック進めてから、次の手番の座席から見て測る
+        for _ in range(3 * 4 + 1):
+            player = game.get_current_player()
+            game.play_card(player, game.get_valid_cards(player)[0])
+            if len(game.current_trick) == 4:
+                game.complete_trick()
+        sampler = DealSampler(game, game.get_current_player(), seed=args.seed)
+        sampler.sample(args.samples)
+        print(_describe(f"board {board} trick {len(game.tricks) + 1}", sampler))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""デュプリケート・スコアの事前計算テーブル
+
+スコアはレベル・ストレイン・ダブル状態・バルネラビリティ・取ったトリック数だけで決まるので、
+全組み合わせ（8 × 5 × 3 × 2 × 14、レベル0はパスアウト用の0行）を起動時に一度だけ計算しておく。
+`BridgeGame.calculate_score` はこの表を引くだけで、大量の結果は NumPy でまとめて引ける。
+
+ストレインのインデックスは `get_bid_rank` と同じ ♣=0, ♦=1, ♥=2, ♠=3, NT=4。
+表の値はディクレアラー側から見た点数（メイクなら正、ダウンなら負）。
+
+デュプリケートのボード番号ごとのディーラー・バルネラビリティと、点差の IMP 換算もここに置く。
+"""
+from typing import Tuple, Union
+
+import numpy as np
+
+STRAINS = ['♣', '♦', '♥', '♠', 'NT']
+STRAIN_INDEX = {strain: i for i, strain in enumerate(STRAINS)}
+
+# ダブル時のダウンのペナルティ（1つ目, 2-3つ目, 4つ目以降）
+_DOUBLED_UNDERTRICKS = {
+    (1, False): (100, 200, 300), (1, True): (200, 300, 300),
+    (2, False): (200, 400, 600), (2, True): (400, 600, 600),
+}
+
+
+def _compute_score(level: int, strain: int, doubled: int, vulnerable: bool, tricks: int) -> int:
+    """1つの結果の点数を規則どおりに計算する（テーブル作成用）"""
+    if level == 0:
+        return 0
+    tricks_needed = 6 + level
+    if tricks >= tricks_needed:
+        # ① トリック点
+        trick_base_points = 20 if strain <= 1 else 30
+        trick_score = level * trick_base_points + (10 if strain == 4 else 0)
+        trick_score *= 2 ** doubled
+
+        # ② ゲーム／パーシャルとスラムのボーナス（スラムはゲームボーナスに加算）
+        score = trick_score
+        if trick_score >= 100:
+            score += 500 if vulnerable else 300
+        else:
+            score += 50
+        if level == 7:
+            score += 1500 if vulnerable else 1000
+        elif level == 6:
+            score += 750 if vulnerable else 500
+
+        # ③ ダブル/リダブル成功ボーナス
+        score += 50 * doubled
+
+        # ④ オーバートリック点
+        overtricks = tricks - tricks_needed
+        if doubled == 0:
+            score += overtricks * trick_base_points
+        else:
+            score += overtricks * (100 if vulnerable else 50) * 2 ** doubled
+        return score
+
+    undertricks = tricks_needed - tricks
+    if doubled == 0:
+        return -undertricks * (100 if vulnerable else 50)
+    first, second, rest = _DOUBLED_UNDERTRICKS[(doubled, vulnerable)]
+    penalty = first + second * min(max(undertricks - 1, 0), 2) + rest * max(undertricks - 3, 0)
+    return -penalty
+
+
+# SCORE_TABLE[level, strain, doubled, vulnerable, tricks]
+SCORE_TABLE = np.array([[[[[_compute_score(level, strain, doubled, bool(vul), tricks)
+                            for tricks in range(14)]
+                           for vul in range(2)]
+                          for doubled in range(3)]
+                         for strain in range(5)]
+                        for level in range(8)], dtype=np.int32)
+SCORE_TABLE.setflags(write=False)
+
+# 1件ずつ引く用（NumPy スカラーを経由しない入れ子リスト）
+_SCORE_LIST = SCORE_TABLE.tolist()
+
+
+def declarer_score(level: int, strain: Union[int, str], doubled: int, vulnerable: bool, tricks: int) -> int:
+    """ディクレアラー側の点数（メイクなら正、ダウンなら負）"""
+    if isinstance(strain, str):
+        strain = STRAIN_INDEX[strain]
+    return _SCORE_LIST[level][strain][doubled][vulnerable][tricks]
+
+
+def split_score(score: int, declarer_is_ns: bool) -> Tuple[int, int]:
+    """ディクレアラー側の点数を (NS, EW) の獲得点に分ける"""
+    if (score >= 0) == declarer_is_ns:
+        return abs(score), 0
+    return 0, abs(score)
+
+
+def score_batch(levels, strains, doubled, vulnerable, tricks) -> np.ndarray:
+    """配列（ブロードキャスト可）をまとめてテーブル参照し、ディクレアラー側の点数を返す"""
+    return SCORE_TABLE[np.asarray(levels, dtype=np.intp), np.asarray(strains, dtype=np.intp),
+                       np.asarray(doubled, dtype=np.intp), np.asarray(vulnerable, dtype=np.intp),
+                       np.asarray(tricks, dtype=np.intp)]
+
+
+def split_score_batch(scores, declarer_is_ns) -> Tuple[np.ndarray, np.ndarray]:
+    """score_batch の結果を (NS, EW) の獲得点の配列に分ける"""
+    scores = np.asarray(scores)
+    ns_signed = np.where(np.asarray(declarer_is_ns, dtype=bool), scores, -scores)
+    return np.maximum(ns_signed, 0), np.maximum(-ns_signed, 0)
+
+
+# --- デュプリケートのボード条件と IMP ---
+
+# ボード番号 1..16 のディーラー（N, E, S, W の順に回る）とバルネラビリティ（16ボードで一巡）
+_BOARD_DEALERS = ['North', 'East', 'South', 'West']
+_BOARD_VULNERABILITY = ['None', 'NS', 'EW', 'All', 'NS', 'EW', 'All', 'None',
+                        'EW', 'All', 'None', 'NS', 'All', 'None', 'NS', 'EW']
+
+# IMP の境界（点差がこの値以上なら1 IMP ずつ増える。4000 以上で 24）
+IMP_BOUNDARIES = np.array([20, 50, 90, 130, 170, 220, 270, 320, 370, 430, 500, 600, 750, 900,
+                           1100, 1300, 1500, 1750, 2000, 2250, 2500, 3000, 3500, 4000])
+
+
+def board_dealer(board: int) -> str:
+    return _BOARD_DEALERS[(board - 1) % 4]
+
+
+def board_vulnerability(board: int) -> dict:
+    """ボード番号の標準のバルネラビリティ {'NS': bool, 'EW': bool}"""
+    vul = _BOARD_VULNERABILITY[(board - 1) % 16]
+    return {'NS': vul in ('NS', 'All'), 'EW': vul in ('EW', 'All')}
+
+
+def imps(difference: int) -> int:
+    """点差 -> IMP（符号つき）"""
+    value = int(np.searchsorted(IMP_BOUNDARIES, abs(difference), side='right'))
+    return value if difference >= 0 else -value
+
+
+def imps_batch(differences) -> np.ndarray:
+    """点差の配列 -> IMP の配列（符号つき）"""
+    differences = np.asarray(differences)
+    return np.sign(differences) * np.searchsorted(IMP_BOUNDARIES, np.abs(differences), side='right')
@@ -0,0 +1,228 @@
+"""多数の卓を1プロセスで持つためのゲーム・ストア
+
+`st.session_state` には卓の ID だけを置き、`BridgeGame` 本体はこのストアが持つ。卓は3段階で保持する。
+- live: そのままのオブジェクト（最近使った `max_live` 卓まで）
+- idle: 圧縮した pickle のバイト列（ソルバーの TT とモデルのハンドルは含めない。`BridgeGame.__getstate__`）
+- disk: idle の合計がメモリ予算を超えたら、古いものから `directory` のファイルに書き出す
+
+`checkout` した卓は使い終わるまで追い出さない（再実行の途中で別のセッションに圧縮されて更新が消えないように）。
+次に使うときは idle / disk から透過的に戻す。メモリは卓ごとに見積もる（live はオブジェクトを辿った
+おおよその大きさとソルバーの TT、idle は圧縮後のバイト数）。live の大きさは卓を置いたときと
+`checkout` を返したときにその卓だけ測り直して覚えておく（使用中の卓は辿らない）。
+
+    BRIDGE_STORE_DIR=/var/tmp/bridge-tables   # 追い出した卓の置き場（既定は一時ディレクトリ）
+    BRIDGE_STORE_BUDGET_MB=256                # live と idle の合計の目安
+"""
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+from cards import Card
+from game import BridgeGame
+
+# ソルバーの TT の1エントリのおおよその大きさ（キーのタプルと値のリスト）
+TT_ENTRY_BYTES = 300
+
+
+def compact(game: BridgeGame) -> bytes:
+    return zlib.compress(pickle.dumps(game, protocol=pickle.HIGHEST_PROTOCOL), 3)
+
+
+def expand(data: bytes) -> BridgeGame:
+    return pickle.loads(zlib.decompress(data))
+
+
+def estimate_size(obj, seen: Optional[set] = None) -> int:
+    """オブジェクトを辿ったおおよそのバイト数（Card は共有のフライウェイトなので数えない）"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, Card):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, seen) for item in obj)
+    return size
+
+
+def game_size(game: BridgeGame) -> int:
+    """live の卓のおおよそのバイト数（モデルのハンドルは共有なので除き、ソルバーの TT は件数から見積もる）"""
+    seen = {id(game.model), id(game.dd_solver), id(game.rng)}
+    size = sys.getsizeof(game) + estimate_size(game.__dict__, seen) + 2_500  # rng の状態
+    if game.log is not None:
+        # ログのスナップショット（今の局面と共有している部分は数えない）
+        size += sum(estimate_size(snapshot.__dict__, seen) + 2_500 for snapshot in game.log.snapshots.values())
+    if game.dd_solver is not None:
+        size += game.dd_solver.tt_entries * TT_ENTRY_BYTES
+    return size
+
+
+class GameStore:
+    """卓 ID -> BridgeGame の LRU ストア（スレッドセーフ）"""
+
+    def __init__(self, max_live: int = 32, memory_budget: int = 256 << 20, directory: Optional[str] = None,
+                 factory: Callable[[], BridgeGame] = BridgeGame):
+        self.max_live = max_live
+        self.memory_budget = memory_budget
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'bridge-tables')
+        os.makedirs(self.directory, exist_ok=True)
+        self.factory = factory
+        self._lock = threading.RLock()
+        self._live: 'OrderedDict[str, BridgeGame]' = OrderedDict()
+        self._idle: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._on_disk: set = set()
+        self._pins: Dict[str, int] = {}
+        self._live_sizes: Dict[str, int] = {}  # live の卓 -> 最後に測ったバイト数
+        self.evictions = 0       # live -> idle
+        self.spills = 0          # idle -> disk
+        self.rehydrations = 0    # idle / disk -> live
+
+    def new_table(self) -> str:
+        return uuid.uuid4().hex
+
+    def _path(self, table_id: str) -> str:
+        return os.path.join(self.directory, f'{table_id}.game')
+
+    # --- 取り出しと格納 ---
+
+    def get(self, table_id: str) -> BridgeGame:
+        """卓のゲーム（なければ factory で作る）。最近使ったものとして live に置く"""
+        with self._lock:
+            game = self._live.get(table_id)
+            if game is not None:
+                self._live.move_to_end(table_id)
+                return game
+            data = self._idle.pop(table_id, None)
+            if data is None and table_id in self._on_disk:
+                with open(self._path(table_id), 'rb') as f:
+                    data = f.read()
+                os.remove(self._path(table_id))
+                self._on_disk.discard(table_id)
+            if data is not None:
+                game = expand(data)
+                self.rehydrations += 1
+            else:
+                game = self.factory()
+            game.table_id = table_id
+            self._live[table_id] = game
+            self._live_sizes[table_id] = game_size(game)
+            self._enforce()
+            return game
+
+    def put(self, table_id: str, game: BridgeGame):
+        """卓のゲームを置き換える（新しいゲームの開始など）"""
+        with self._lock:
+            self._idle.pop(table_id, None)
+            if table_id in self._on_disk:
+                os.remove(self._path(table_id))
+                self._on_disk.discard(table_id)
+            game.table_id = table_id
+            self._live[table_id] = game
+            self._live.move_to_end(table_id)
+            if table_id not in self._pins:
+                self._live_sizes[table_id] = game_size(game)
+            self._enforce()
+
+    def drop(self, table_id: str):
+        with self._lock:
+            self._live.pop(table_id, None)
+            self._live_sizes.pop(table_id, None)
+            self._idle.pop(table_id, None)
+            if table_id in self._on_disk:
+                os.remove(self._path(table_id))
+                self._on_disk.discard(table_id)
+
+    @contextmanager
+    def checkout(self, table_id: str) -> Iterator[BridgeGame]:
+        """使っている間は追い出さない卓（with の中で put されたら次からはそちらを返す）"""
+        with self._lock:
+            self._pins[table_id] = self._pins.get(table_id, 0) + 1
+            game = self.get(table_id)
+        try:
+            yield game
+        finally:
+            with self._lock:
+                self._pins[table_id] -= 1
+                if not self._pins[table_id]:
+                    del self._pins[table_id]
+                    # 使い終わった卓だけ測り直す（その間に drop されていれば何もしない）
+                    if table_id in self._live:
+                        self._live_sizes[table_id] = game_size(self._live[table_id])
+                self._enforce()
+
+    # --- 追い出し ---
+
+    def _enforce(self):
+        """live の数とメモリ予算を守るように、古い順に live -> idle -> disk へ移す（大きさは覚えている値を使う）"""
+        for table_id in [t for t in self._live if t not in self._pins][:max(0, len(self._live) - self.max_live)]:
+            self._evict(table_id)
+        over = sum(self._live_sizes.values()) + sum(map(len, self._idle.values())) - self.memory_budget
+        for table_id in [t for t in self._live if t not in self._pins]:
+            if over <= 0:
+                break
+            size = self._live_sizes.get(table_id, 0)
+            over -= size - len(self._evict(table_id))
+        while over > 0 and self._idle:
+            table_id, data = self._idle.popitem(last=False)
+            with open(self._path(table_id), 'wb') as f:
+                f.write(data)
+            self._on_disk.add(table_id)
+            self.spills += 1
+            over -= len(data)
+
+    def _evict(self, table_id: str) -> bytes:
+        data = compact(self._live.pop(table_id))
+        self._idle[table_id] = data
+        self._live_sizes.pop(table_id, None)
+        self.evictions += 1
+        return data
+
+    # --- 計測 ---
+
+    def table_memory(self) -> Dict[str, Dict[str, object]]:
+        """卓ごとの状態（'live' / 'idle' / 'disk'）とメモリ上のおおよそのバイト数（live は最後に測った値）"""
+        with self._lock:
+            tables = {table_id: {'state': 'live', 'bytes': self._live_sizes.get(table_id, 0)}
+                      for table_id in self._live}
+            tables.update({table_id: {'state': 'idle', 'bytes': len(data)} for table_id, data in self._idle.items()})
+            tables.update({table_id: {'state': 'disk', 'bytes': 0} for table_id in self._on_disk})
+            return tables
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            live_bytes = sum(self._live_sizes.values())
+            idle_bytes = sum(map(len, self._idle.values()))
+            return {
+                'live': len(self._live),
+                'idle': len(self._idle),
+                'on_disk': len(self._on_disk),
+                'live_bytes': live_bytes,
+                'idle_bytes': idle_bytes,
+                'memory_budget': self.memory_budget,
+                'evictions': self.evictions,
+                'spills': self.spills,
+                'rehydrations': self.rehydrations,
+            }
+
+
+_default_store: Optional[GameStore] = None
+_default_lock = threading.Lock()
+
+
+def get_game_store() -> GameStore:
+    """プロセス内で共有する既定のストア"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = GameStore(memory_budget=int(os.getenv('BRIDGE_STORE_BUDGET_MB', '256')) << 20,
+                                       directory=os.getenv('BRIDGE_STORE_DIR') or None)
+        return _default_store
@@ -0,0 +1,235 @@
+"""ヘッドレスのバッチシミュレーション（Streamlit 不要）
+
+`BridgeGame` を UI と同じ順序（deal_cards → start_auction → make_auction_call →
+play_card / complete_trick → calculate_score）で最後まで自動進行させ、
+シード付きで N ディールを回してスループット（deals/sec, tricks/sec）を測る。
+`--workers` を指定するとボード範囲をプロセスプールに分割して並列に回す。
+各ボードの結果はボード番号のシードだけで決まり、ボード順に集計するので
+ワーカー数に関係なく同じ出力になる（dd プレイは --dd-time-limit 0 のとき）。
+
+    python simulate.py -n 1000 --seed 1 --play heuristic
+    python simulate.py -n 100000 --seed 1 --workers 0
+"""
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional
+
+from bidding import choose_call
+from cards import CARDS
+from deal_archive import save_records
+from game import BridgeGame
+from solver import SEAT_INDEX, hands_from_game
+
+AuctionStrategy = Callable[[BridgeGame, str], Dict]
+PlayStrategy = Callable[[BridgeGame, str], object]
+
+
+def board_seed(seed: int, board: int) -> int:
+    """ボード番号ごとのシード（同じ seed・board なら常に同じ配札になる）"""
+    return seed * 1_000_003 + board
+
+
+# --- オークション戦略 ---
+
+def rule_auction_call(game: BridgeGame, player: str) -> Dict:
+    """ルールベースのビッディング・エンジン"""
+    return choose_call(game, player)
+
+
+def ai_auction_call(game: BridgeGame, player: str) -> Dict:
+    game.bid_mode = 'model'
+    return game.get_ai_auction_call(player)
+
+
+def simulation_auction_call(game: BridgeGame, player: str) -> Dict:
+    """候補のコールをロールアウトで比べる（bid_sim_samples / bid_sim_time_budget に従う）"""
+    game.bid_mode = 'simulation'
+    return game.get_ai_auction_call(player)
+
+
+# --- プレイ戦略 ---
+
+def dd_card_play(game: BridgeGame, player: str):
+    """UI の AI と同じダブルダミー探索（dd_time_limit で1枚あたりの時間を制限）"""
+    game.play_mode = 'dd'
+    return game.get_ai_card_play(player)
+
+
+def heuristic_card_play(game: BridgeGame, player: str):
+    """探索せずソルバーの手の並べ替えの先頭を出す（高速）"""
+    valid_cards = game.get_valid_cards(player)
+    if len(valid_cards) == 1:
+        return valid_cards[0]
+    hands = hands_from_game(game.players)
+    trick = [(SEAT_INDEX[play['player']], play['card'].index) for play in game.current_trick]
+    return CARDS[game.dd_solver.heuristic_card(hands, SEAT_INDEX[game.trick_leader], trick)]
+
+
+def single_dummy_card_play(game: BridgeGame, player: str):
+    """見えないハンドをサンプルして決めるシングルダミーのプレイ（sd_samples / sd_time_budget に従う）"""
+    game.play_mode = 'single_dummy'
+    game.sd_workers = 1
+    return game.get_ai_card_play(player)
+
+
+def random_card_play(game: BridgeGame, player: str):
+    return game.rng.choice(game.get_valid_cards(player))
+
+
+AUCTION_STRATEGIES: Dict[str, AuctionStrategy] = {
+    'rules': rule_auction_call,
+    'ai': ai_auction_call,
+    'simulation': simulation_auction_call,
+}
+PLAY_STRATEGIES: Dict[str, PlayStrategy] = {
+    'dd': dd_card_play,
+    'heuristic': heuristic_card_play,
+    'single_dummy': single_dummy_card_play,
+    'random': random_card_play,
+}
+
+
+# --- 1ディールの進行 ---
+
+def play_board(board: int, seed: int = 0,
+               auction: AuctionStrategy = rule_auction_call,
+               play: PlayStrategy = heuristic_card_play,
+               dd_time_limit: Optional[float] = None) -> Dict:
+    """1ボードを配札からスコアまで進めて結果を返す"""
+    game = BridgeGame(use_gemini=False, seed=board_seed(seed, board), record_events=False)
+    if dd_time_limit is not None:
+        # 0 以下は時間制限なし（完全探索なので結果が実行環境に依存しない）
+        game.dd_time_limit = dd_time_limit if dd_time_limit > 0 else None
+    game.determine_partnerships_and_dealer()
+    game.deal_cards()
+    game.start_auction()
+
+    while game.game_phase == 'auction':
+        game.make_auction_call(auction(game, game.current_bidder))
+
+    while game.game_phase == 'play':
+        player = game.get_current_player()
+        game.play_card(player, play(game, player))
+        if len(game.current_trick) == 4:
+            game.complete_trick()
+
+    result = dict(game.round_scores[-1])
+    result['board'] = board
+    result['dealer'] = game.dealer
+    result['tricks'] = len(game.tricks)
+    result['hands'] = game.deal_masks()
+    result['record'] = game.board_records[-1]._replace(board=board)
+    return result
+
+
+def _play_range(first_board: int, count: int, seed: int, auction: AuctionStrategy,
+                play: PlayStrategy, dd_time_limit: Optional[float]) -> List[Dict]:
+    """ワーカープロセスで実行する単位（連続したボード範囲）"""
+    return [play_board(board, seed, auction, play, dd_time_limit)
+            for board in range(first_board, first_board + count)]
+
+
+def iter_results(num_deals: int, seed: int = 0, first_board: int = 1,
+                 auction: AuctionStrategy = rule_auction_call,
+                 play: PlayStrategy = heuristic_card_play,
+                 dd_time_limit: Optional[float] = None,
+                 workers: int = 1, chunk_size: Optional[int] = None) -> Iterator[Dict]:
+    """ボードごとの結果をボード番号順に逐次返す
+
+    workers > 1 ならボード範囲を chunk_size ずつ ProcessPoolExecutor に投げる。
+    戦略はワーカーへ pickle されるのでモジュールレベルの関数を渡すこと。
+    """
+    last_board = first_board + num_deals
+    if workers <= 1:
+        for board in range(first_board, last_board):
+            yield play_board(board, seed, auction, play, dd_time_limit)
+        return
+
+    if chunk_size is None:
+        # ワーカーあたり数チャンクにして負荷の偏りをならす
+        chunk_size = max(1, min(256, num_deals // (workers * 8)))
+    starts = iter(range(first_board, last_board, chunk_size))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        def submit(start):
+            return pool.submit(_play_range, start, min(chunk_size, last_board - start),
+                               seed, auction, play, dd_time_limit)
+
+        # 投入数を制限しつつ、完了順ではなく投入順（＝ボード順）に受け取る
+        pending = deque(submit(start) for start in islice(starts, workers * 4))
+        while pending:
+            results = pending.popleft().result()
+            start = next(starts, None)
+            if start is not None:
+                pending.append(submit(start))
+            yield from results
+
+
+def run_simulation(num_deals: int, seed: int = 0, first_board: int = 1,
+                   auction: AuctionStrategy = rule_auction_call,
+                   play: PlayStrategy = heuristic_card_play,
+                   dd_time_limit: Optional[float] = None,
+                   workers: int = 1, chunk_size: Optional[int] = None) -> Dict:
+    """num_deals ボードを回し、結果とスループットを返す"""
+    start = time.perf_counter()
+    results = list(iter_results(num_deals, seed, first_board, auction, play, dd_time_limit,
+                                workers, chunk_size))
+    elapsed = time.perf_counter() - start
+    summary = summarize(results, elapsed)
+    summary['workers'] = max(1, workers)
+    return summary
+
+
+def summarize(results: List[Dict], elapsed: float) -> Dict:
+    deals = len(results)
+    tricks = sum(r['tricks'] for r in results)
+    return {
+        'results': results,
+        'deals': deals,
+        'tricks': tricks,
+        'passed_out': sum(1 for r in results if r['declarer'] is None),
+        'ns_score': sum(r['ns_score'] for r in results),
+        'ew_score': sum(r['ew_score'] for r in results),
+        'elapsed': elapsed,
+        'deals_per_sec': deals / elapsed if elapsed > 0 else float('inf'),
+        'tricks_per_sec': tricks / elapsed if elapsed > 0 else float('inf'),
+    }
+
+
+def format_report(summary: Dict) -> str:
+    return (f"deals={summary['deals']} (passed out {summary['passed_out']}) "
+            f"tricks={summary['tricks']} elapsed={summary['elapsed']:.2f}s "
+            f"workers={summary.get('workers', 1)}\n"
+            f"deals/sec={summary['deals_per_sec']:.1f} tricks/sec={summary['tricks_per_sec']:.1f}\n"
+            f"NS={summary['ns_score']} EW={summary['ew_score']}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Headless Contract Bridge simulation")
+    parser.add_argument('-n', '--deals', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--first-board', type=int, default=1)
+    parser.add_argument('--auction', choices=sorted(AUCTION_STRATEGIES), default='rules')
+    parser.add_argument('--play', choices=sorted(PLAY_STRATEGIES), default='heuristic')
+    parser.add_argument('--dd-time-limit', type=float, default=None,
+                        help="seconds per card for --play dd (0 = no limit)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="worker processes (0 = all cores)")
+    parser.add_argument('--chunk-size', type=int, default=None)
+    parser.add_argument('--archive', help="save every board (.pbn / .lin, otherwise appended to a binary deal archive)")
+    args = parser.parse_args(argv)
+
+    workers = args.workers or os.cpu_count() or 1
+    summary = run_simulation(args.deals, args.seed, args.first_board,
+                             AUCTION_STRATEGIES[args.auction], PLAY_STRATEGIES[args.play],
+                             args.dd_time_limit, workers, args.chunk_size)
+    print(format_report(summary))
+    if args.archive:
+        save_records(args.archive, [r['record'] for r in summary['results']])
+
+
+if __name__ == "__main__":
+    main()
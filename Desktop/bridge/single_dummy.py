@@ -0,0 +1,162 @@
+"""モンテカルロ・シングルダミーのカードプレイ
+
+AI の座席から見えないハンドを `DealSampler` でオークション・プレイと矛盾しないように多数サンプルし、
+各配置をダブルダミーで解いて、手番の各カードの期待値が最大のカードを選ぶ。
+ダブルダミー・プレイ（`BridgeGame.get_dd_card_play`）と違い、他人のハンドを覗かない。
+
+- 目的は期待トリック数（'tricks'）か、`calculate_score` と同じ点数の期待値（'score'）
+- 時間予算: 予算内に解けた配置だけで決める（1枚も解けなければソルバーの手の並べ替えの先頭）
+- 配置はワーカープロセスに分けて並列に解く。各プロセスはストレインごとのソルバーを持ち続けるので、
+  TT は配置をまたいで（次のカードの判断でも）使い回される。TT のエントリは同等として省いたカードまで
+  固定するので、別の配置に当たっても値は変わらない（`python solver.py --check 200 --shared` で総当たりと確かめる）
+
+ダミーの手番はディクレアラーが（ディクレアラーから見えるものだけで）決める。
+"""
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ai_cache import decision_key
+from cards import CARDS, Card
+from sampler import DealSampler
+from scoring import declarer_score
+from solver import DoubleDummySolver, SolverTimeout, SEAT_INDEX, trump_code
+
+OBJECTIVES = ('tricks', 'score')
+
+# スレッドごとのソルバー（ストレイン -> ソルバー）。先読みのスレッドから同時に呼ばれても共有しない
+_local = threading.local()
+
+
+def _solver_for(trump: Optional[int]) -> DoubleDummySolver:
+    solvers = getattr(_local, 'solvers', None)
+    if solvers is None:
+        solvers = _local.solvers = {}
+    solver = solvers.get(trump)
+    if solver is None:
+        solver = solvers[trump] = DoubleDummySolver(trump)
+    return solver
+
+
+def evaluate_layouts(trump: Optional[int], layouts: Sequence[Sequence[int]], leader: int,
+                     trick: Sequence[Tuple[int, int]], time_budget: Optional[float]) -> List[Dict[int, int]]:
+    """各配置について手番の各カードの値（手番側の残りトリック）を求める（ワーカーで実行する単位）
+
+    時間予算を使い切ったら、そこまでに解けた配置の分だけ返す。
+    """
+    deadline = time.perf_counter() + time_budget if time_budget is not None else None
+    solver = _solver_for(trump)
+    results = []
+    for hands in layouts:
+        left = deadline - time.perf_counter() if deadline is not None else None
+        if left is not None and left <= 0:
+            break
+        try:
+            values = solver.card_values(hands, leader, trick, time_limit=left)
+        except SolverTimeout:
+            break
+        results.append(values)
+    return results
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    """プロセス内で共有するワーカープール（ワーカー数が変わったら作り直す）"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+def decider_for(game, player: str) -> str:
+    """その手番のカードを決める座席（ダミーはディクレアラーが決める）"""
+    return game.declarer if player == game.dummy else player
+
+
+def choose_card(game, player: str, samples: int = 32, time_budget: Optional[float] = 2.0,
+                workers: int = 1, objective: str = 'tricks', seed: Optional[int] = None) -> Tuple[Card, Dict]:
+    """player が出すカードと、判断の統計（解いた配置数・各カードの期待値など）を返す"""
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {OBJECTIVES}")
+    started = time.perf_counter()
+    valid = game.get_valid_cards(player)
+    stats: Dict = {'samples': 0, 'solved': 0, 'acceptance_rate': 0.0, 'elapsed': 0.0, 'values': {}}
+    if len(valid) == 1:
+        return valid[0], stats
+
+    decider = decider_for(game, player)
+    if seed is None:
+        # 同じ局面なら同じサンプルになるように、見えている情報から決める
+        seed = int(decision_key(game, decider, 'play')[:8], 16)
+    sampler = DealSampler(game, decider, seed=seed)
+    layouts = sampler.sample_hands(samples)
+    sampler_stats = sampler.stats()
+    stats['samples'] = len(layouts)
+    stats['acceptance_rate'] = sampler_stats['acceptance_rate']
+    stats['relax_level'] = sampler_stats['relax_level']
+
+    trump = trump_code(game.trump_suit)
+    leader = SEAT_INDEX[game.trick_leader]
+    trick = [(SEAT_INDEX[play['player']], play['card'].index) for play in game.current_trick]
+    budget = time_budget - (time.perf_counter() - started) if time_budget is not None else None
+    if budget is not None:
+        budget = max(budget, 0.0)
+    if workers > 1 and len(layouts) > 1:
+        chunks = [layouts[i::workers] for i in range(workers) if layouts[i::workers]]
+        futures = [get_pool(workers).submit(evaluate_layouts, trump, chunk, leader, trick, budget)
+                   for chunk in chunks]
+        results = [values for future in futures for values in future.result()]
+    else:
+        results = evaluate_layouts(trump, layouts, leader, trick, budget)
+    stats['solved'] = len(results)
+    stats['elapsed'] = time.perf_counter() - started
+
+    if not results:
+        # 1つも解けなかった: サンプルした配置でソルバーの並べ替えの先頭
+        if not layouts:
+            return valid[0], stats
+        return CARDS[_solver_for(trump).heuristic_card(layouts[0], leader, trick)], stats
+
+    utility = _utility(game, player, objective)
+    expected = {}
+    for card in valid:
+        tricks = sum(values[card.index] for values in results) / len(results)
+        value = sum(utility(values[card.index]) for values in results) / len(results)
+        expected[card.index] = (value, tricks)
+    stats['values'] = {str(CARDS[idx]): value for idx, (value, _) in expected.items()}
+    # 期待値、期待トリックの順に比べ、同じなら低いカードを出す
+    best = max(valid, key=lambda card: (expected[card.index], -card.index))
+    return best, stats
+
+
+def _utility(game, player: str, objective: str):
+    """手番側の残りトリック数 -> 手番側にとっての値"""
+    if objective == 'tricks':
+        return lambda tricks: tricks
+    side = game.get_partnership(player)
+    declaring = side == game.get_partnership(game.declarer)
+    declarer_side = game.get_partnership(game.declarer)
+    won = game.tricks_won[declarer_side]
+    remaining = 13 - len(game.tricks)
+    vulnerable = game.vulnerable[declarer_side]
+
+    def utility(tricks: int) -> int:
+        declarer_tricks = won + (tricks if declaring else remaining - tricks)
+        score = declarer_score(game.contract_level, game.trump_suit, game.doubled, vulnerable, declarer_tricks)
+        return score if declaring else -score
+    return utility
+
+
+def resolve_workers(workers: int) -> int:
+    """0 以下は全コア"""
+    return workers if workers > 0 else (os.cpu_count() or 1)
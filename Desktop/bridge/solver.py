@@ -0,0 +1,829 @@
+"""ダブルダミー・ソルバー
+
+全員のハンドが見えている前提で、残りトリックの最善プレイをアルファベータ探索で求める。
+- ヌルウィンドウ探索（「NS が残り target トリック取れるか」）を推定値から始めて正確な値を出す
+- トランスポジションテーブル: トリック開始時点の残りカードとリーダーをキーにする。
+  カードは相対ランクに詰め、さらに結果に効いたカード（ウィニングランク）より下の
+  カードは枚数だけを見るので、小さいカードの違いだけの局面は同じエントリに当たる
+- 同等カード（シーケンス）の枝刈り: 間のカードが既にプレイ済みなら1枚だけ探索する
+- クイックトリックと切り札のトップによる上下限のカット
+
+純 Python なので、52枚からの完全な解は数秒〜数十秒かかる（ランダムなディールで中央値 16 秒程度）。
+1秒以内に解くという目標には届いていない。カードを出すたびの探索は TT を引き継ぐので、残りが少なくなるほど
+速くなるが、1枚 0.5 秒の制限では1〜2トリック目は毎回時間切れで、カードはヒューリスティック（探索の
+並べ替えの先頭）で選んでいる。3トリック目は半分ほど、4トリック目でも少し時間切れになり、
+5トリック目以降は毎回解けている（`bench.py` の `dd_opening_lead` / `dd_solve_trick5` で計測）。
+
+座席インデックスは `BridgeGame.get_next_player` の順（South=0, West=1, North=2, East=3）で、
+偶数が NS、奇数が EW。ハンドとカードは `cards` モジュールのビット表現を使う。
+
+    python solver.py --check 300 --seed 1            # 小さな局面の列を1つのソルバーで解き、総当たりと突き合わせる
+    python solver.py --check 300 --seed 1 --shared   # ストレインごとに1つのソルバーを全ボードで使い回す
+"""
+import argparse
+import random
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from cards import SUIT_MASKS, SUIT_CODES
+
+SEATS = ['South', 'West', 'North', 'East']
+SEAT_INDEX = {seat: i for i, seat in enumerate(SEATS)}
+
+# ビット位置 -> そのカードのスート／スートのマスク
+_SUIT_OF = [i // 13 for i in range(52)]
+_SUIT_MASK_OF = [SUIT_MASKS[i // 13] for i in range(52)]
+
+# スート単位の局面表現のメモ: 4ハンドのスート部分を詰めた整数 -> (相対ランク・コード, 枚数, 各ハンドの枚数)
+_SUIT_KEYS: Dict[int, Tuple[int, int, int]] = {}
+
+
+def _suit_key(packed: int) -> Tuple[int, int, int]:
+    """1スートの残りカードを、上から順に持ち主の座席（2ビット）を並べたコードにする"""
+    hands = [packed >> (13 * seat) & 0x1FFF for seat in range(4)]
+    present = hands[0] | hands[1] | hands[2] | hands[3]
+    code = 1
+    while present:
+        bit = 1 << (present.bit_length() - 1)
+        code = code << 2 | next(seat for seat in range(4) if hands[seat] & bit)
+        present ^= bit
+    lengths = 0
+    for seat in range(4):
+        lengths = lengths << 4 | hands[seat].bit_count()
+    return code, (code.bit_length() - 1) // 2, lengths
+
+
+def trump_code(trump_suit: Optional[str]) -> Optional[int]:
+    """'♠' などのストレインをスートコードに変換（NT/None は None）"""
+    return SUIT_CODES.get(trump_suit) if trump_suit else None
+
+
+def hands_from_game(players: Dict[str, object]) -> List[int]:
+    """`BridgeGame.players` を座席インデックス順のマスクのリストに変換"""
+    return [players[seat].mask for seat in SEATS]
+
+
+class SolverTimeout(Exception):
+    """探索が制限時間を超えた"""
+
+
+class DoubleDummySolver:
+    """1ディール（1ストレイン）分のダブルダミー・ソルバー
+
+    TT は残りカードでキーされるので、同じストレインなら続きの局面にも別のディールにも使い回せる。
+    """
+
+    def __init__(self, trump: Optional[int], max_tt_size: int = 200_000):
+        self.trump = trump
+        self.trump_mask = SUIT_MASKS[trump] if trump is not None else 0
+        self.max_tt_size = max_tt_size
+        # (リーダー, 各スート・各ハンドの枚数) -> 各スートのシフト量 -> 各スートの上位カードの持ち主
+        #   -> [NS の下限, NS の上限, 最善リード]
+        self.tt: Dict[int, Dict[tuple, Dict[tuple, list]]] = {}
+        self.tt_entries = 0
+        self.nodes = 0
+        self.deadline: Optional[float] = None
+
+    # --- 公開API ---
+
+    def solve(self, hands: Sequence[int], leader: int, trick: Sequence[Tuple[int, int]] = (),
+              guess: Optional[int] = None, time_limit: Optional[float] = None) -> int:
+        """現在の局面から NS が取る残りトリック数（進行中のトリックを含む）
+
+        `trick` は進行中のトリックの (座席, ビット位置) の列、`leader` はそのトリックのリーダー。
+        `guess` を渡すとその値からヌルウィンドウ探索を始める（前回の値を渡すと速い）。
+        `time_limit` 秒を超えると `SolverTimeout` を送出する（それまでの探索結果は TT に残る）。
+        """
+        self.deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        try:
+            return self._solve(list(hands), leader, tuple(trick), guess)
+        finally:
+            self.deadline = None
+
+    def _solve(self, hands: List[int], leader: int, trick: Tuple[Tuple[int, int], ...], guess: Optional[int]) -> int:
+        hands = list(hands)
+        remaining = hands[leader].bit_count() + (1 if trick else 0)
+        return self._search(lambda target: self._root(hands, leader, trick, target), remaining, guess)
+
+    @staticmethod
+    def _search(test, remaining: int, guess: Optional[int]) -> int:
+        """test(target)（NS が target 以上取れるか）が真になる最大の target を求める"""
+        lo, hi = 0, remaining
+        if guess is not None and 0 < guess <= remaining:
+            if test(guess):
+                if guess == remaining or not test(guess + 1):
+                    return guess
+                lo = guess + 1
+            else:
+                hi = guess - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if test(mid):
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    def card_values(self, hands: Sequence[int], leader: int, trick: Sequence[Tuple[int, int]] = (),
+                    guess: Optional[int] = None, time_limit: Optional[float] = None) -> Dict[int, int]:
+        """手番の合法な各カード（ビット位置）をプレイした後に手番側が取る残りトリック数（進行中のトリックを含む）
+
+        同等カード（シーケンス）は1枚だけ探索して同じ値を入れる。`guess` は NS の値の推定。
+        先に局面の値（最善カードの値）を求め、各カードはそこから1トリックずつ下げて確かめるので、
+        最善と同じか1トリック落とすだけのカードはヌルウィンドウ探索1〜2回で済む。
+        """
+        self.deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        try:
+            hands = list(hands)
+            trick = tuple(trick)
+            seat = (leader + len(trick)) & 3
+            hand = hands[seat]
+            remaining = hands[leader].bit_count() + (1 if trick else 0)
+            ns_par = self._solve(hands, leader, trick, guess)
+            maximizing = seat & 1 == 0
+            side_par = ns_par if maximizing else remaining - ns_par
+            legal = hand & _SUIT_MASK_OF[trick[0][1]] if trick else 0
+            legal = legal or hand
+            values: Dict[int, int] = {}
+            by_rep: Dict[int, int] = {}
+            while legal:
+                idx = legal.bit_length() - 1
+                legal ^= 1 << idx
+                rep = self._lowest_equivalent(hands, seat, trick, idx)
+                if rep not in by_rep:
+                    hands[seat] = hand ^ (1 << rep)
+                    after = trick + ((seat, rep),)
+                    value = side_par
+                    while value > 0:
+                        # 手番側が value 取れるか（EW なら NS に remaining - value + 1 を許さないか）
+                        ns_target = value if maximizing else remaining - value + 1
+                        if self._after_play(hands, leader, after, ns_target) == maximizing:
+                            break
+                        value -= 1
+                    hands[seat] = hand
+                    by_rep[rep] = value
+                values[idx] = by_rep[rep]
+            return values
+        finally:
+            self.deadline = None
+
+    def best_card(self, hands: Sequence[int], leader: int, trick: Sequence[Tuple[int, int]] = (),
+                  guess: Optional[int] = None, time_limit: Optional[float] = None) -> Tuple[int, int]:
+        """手番のプレイヤーの最善カード（ビット位置）と、手番側が取る残りトリック数を返す
+
+        最善手が複数ある場合は探索順で最初に見つかったもの（のシーケンス中の最も低いカード）を選ぶ。
+        """
+        self.deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        try:
+            return self._best_card(list(hands), leader, tuple(trick), guess)
+        finally:
+            self.deadline = None
+
+    def heuristic_card(self, hands: Sequence[int], leader: int, trick: Sequence[Tuple[int, int]] = ()) -> int:
+        """探索せずに手の並べ替えの先頭（キャッシュ・2番手ロー・安い勝ち札など）を返す"""
+        hands = list(hands)
+        seat = (leader + len(trick)) & 3
+        return self._lowest_equivalent(hands, seat, trick, self._moves(hands, seat, trick)[0])
+
+    def _best_card(self, hands: List[int], leader: int, trick: Tuple[Tuple[int, int], ...],
+                   guess: Optional[int]) -> Tuple[int, int]:
+        seat = (leader + len(trick)) & 3
+        remaining = hands[seat].bit_count()
+        ns_value = self._solve(hands, leader, trick, guess)
+        # NS なら ns_value 以上を保つカード、EW なら NS に ns_value + 1 を許さないカードが最善
+        ns_target = ns_value if seat & 1 == 0 else ns_value + 1
+        hand = hands[seat]
+        best = None
+        for idx in self._moves(hands, seat, trick):
+            hands[seat] = hand ^ (1 << idx)
+            made = self._after_play(hands, leader, trick + ((seat, idx),), ns_target)
+            hands[seat] = hand
+            if made == (seat & 1 == 0):
+                best = idx
+                break
+        if best is None:
+            raise RuntimeError("double dummy search found no move")
+        best = self._lowest_equivalent(hands, seat, trick, best)
+        side_value = ns_value if seat & 1 == 0 else remaining - ns_value
+        return best, side_value
+
+    # --- 探索本体 ---
+    # 探索関数は (結果, 結果に効いたカードのマスク) を返す
+
+    def _root(self, hands: List[int], leader: int, trick: Tuple[Tuple[int, int], ...], target: int) -> bool:
+        if not trick:
+            return self._trick_start(hands, leader, target)[0]
+        win_seat, win_idx = self._trick_winner(trick)
+        trick_mask = 0
+        for _, idx in trick:
+            trick_mask |= 1 << idx
+        seat = (leader + len(trick)) & 3
+        return self._play(hands, seat, len(trick), trick_mask, _SUIT_MASK_OF[trick[0][1]],
+                          win_seat, win_idx, target)[0]
+
+    def _after_play(self, hands: List[int], leader: int, trick: Tuple[Tuple[int, int], ...], target: int) -> bool:
+        if len(trick) == 4:
+            win_seat, _ = self._trick_winner(trick)
+            return self._trick_start(hands, win_seat, target - (1 if win_seat & 1 == 0 else 0))[0]
+        return self._root(hands, leader, trick, target)
+
+    def _trick_winner(self, trick: Sequence[Tuple[int, int]]) -> Tuple[int, int]:
+        win_seat, win_idx = trick[0]
+        for seat, idx in trick[1:]:
+            if self._beats(idx, win_idx):
+                win_seat, win_idx = seat, idx
+        return win_seat, win_idx
+
+    def _beats(self, idx: int, win_idx: int) -> bool:
+        suit, win_suit = _SUIT_OF[idx], _SUIT_OF[win_idx]
+        if suit == win_suit:
+            return idx > win_idx
+        return suit == self.trump
+
+    def _trick_start(self, hands: List[int], leader: int, target: int) -> Tuple[bool, int]:
+        """トリック開始時: NS が残りから target トリック以上取れるか"""
+        if target <= 0:
+            return True, 0
+        remaining = hands[leader].bit_count()
+        if target > remaining:
+            return False, 0
+        if remaining == 1:
+            # 最終トリックは直接評価
+            trick_mask = hands[0] | hands[1] | hands[2] | hands[3]
+            win_seat, win_idx = leader, hands[leader].bit_length() - 1
+            for k in (1, 2, 3):
+                seat = (leader + k) & 3
+                idx = hands[seat].bit_length() - 1
+                if self._beats(idx, win_idx):
+                    win_seat, win_idx = seat, idx
+            return win_seat & 1 == 0, _rank_winner(trick_mask, win_idx)
+
+        # TT の参照
+        h0, h1, h2, h3 = hands
+        sig = leader
+        codes = []
+        for shift in (0, 13, 26, 39):
+            packed = ((h0 >> shift & 0x1FFF) | (h1 >> shift & 0x1FFF) << 13
+                      | (h2 >> shift & 0x1FFF) << 26 | (h3 >> shift & 0x1FFF) << 39)
+            info = _SUIT_KEYS.get(packed)
+            if info is None:
+                info = _SUIT_KEYS[packed] = _suit_key(packed)
+            codes.append(info)
+            sig = sig << 16 | info[2]
+        if self.tt_entries >= self.max_tt_size:
+            self.tt.clear()
+            self.tt_entries = 0
+        bucket = self.tt.get(sig)
+        best = -1
+        if bucket is not None:
+            c0, c1, c2, c3 = codes[0][0], codes[1][0], codes[2][0], codes[3][0]
+            for shifts, entries in bucket.items():
+                entry = entries.get((c0 >> shifts[0], c1 >> shifts[1], c2 >> shifts[2], c3 >> shifts[3]))
+                if entry is None:
+                    continue
+                if entry[0] >= target:
+                    return True, _top_cards(hands, shifts)
+                if entry[1] < target:
+                    return False, _top_cards(hands, shifts)
+                if entry[2] >= 0:
+                    best = entry[2]
+        else:
+            bucket = self.tt[sig] = {}
+
+        # 簡易な上下限でのカット
+        lo, hi, lo_rel, hi_rel = self._bounds(hands, leader, remaining)
+        if lo >= target:
+            self._store(hands, bucket, codes, lo_rel, lo, remaining, -1)
+            return True, lo_rel
+        if hi < target:
+            self._store(hands, bucket, codes, hi_rel, 0, hi, -1)
+            return False, hi_rel
+
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes & 127 and time.perf_counter() > self.deadline:
+            raise SolverTimeout()
+        maximizing = leader & 1 == 0
+        hand = hands[leader]
+        moves, runs = self._lead_moves(hands, leader)
+        if best >= 0:
+            first = self._decode_lead(hands, best)
+            if first in moves:
+                moves.remove(first)
+                moves.insert(0, first)
+        next_seat = (leader + 1) & 3
+        rel = 0
+        for idx in moves:
+            bit = 1 << idx
+            hands[leader] = hand ^ bit
+            made, child_rel = self._play(hands, next_seat, 1, bit, _SUIT_MASK_OF[idx], leader, idx, target)
+            hands[leader] = hand
+            if made == maximizing:
+                rel = child_rel
+                cut = self._encode_lead(hands, idx)
+                break
+            rel |= child_rel
+        else:
+            # どの手でもだめだった: 省いた同等カードも同じ結果なのは、その並びが同じときだけ
+            made = not maximizing
+            cut = best
+            rel |= runs
+        if made:
+            self._store(hands, bucket, codes, rel, target, remaining, cut)
+        else:
+            self._store(hands, bucket, codes, rel, 0, target - 1, cut)
+        return made, rel
+
+    def _play(self, hands: List[int], seat: int, n: int, trick_mask: int, led_mask: int,
+              win_seat: int, win_idx: int, target: int) -> Tuple[bool, int]:
+        """トリックの2〜4枚目"""
+        hand = hands[seat]
+        maximizing = seat & 1 == 0
+        next_seat = (seat + 1) & 3
+        trump = self.trump
+        win_suit = _SUIT_OF[win_idx]
+        rel = 0
+        moves, runs = self._follow_moves(hands, seat, n, trick_mask, led_mask, win_seat, win_idx)
+        for idx in moves:
+            bit = 1 << idx
+            suit = _SUIT_OF[idx]
+            if (idx > win_idx) if suit == win_suit else suit == trump:
+                new_seat, new_idx = seat, idx
+            else:
+                new_seat, new_idx = win_seat, win_idx
+            hands[seat] = hand ^ bit
+            if n == 3:
+                made, child_rel = self._trick_start(hands, new_seat, target - (1 if new_seat & 1 == 0 else 0))
+                child_rel |= _rank_winner(trick_mask | bit, new_idx)
+            else:
+                made, child_rel = self._play(hands, next_seat, n + 1, trick_mask | bit, led_mask,
+                                             new_seat, new_idx, target)
+            hands[seat] = hand
+            if made == maximizing:
+                return made, child_rel
+            rel |= child_rel
+        return not maximizing, rel | runs
+
+    # --- TT ---
+
+    def _store(self, hands: List[int], bucket: Dict[tuple, Dict[tuple, list]], codes: List[Tuple[int, int, int]],
+               rel: int, lo: int, hi: int, best: int):
+        """結果に効いたカード rel より下のカードは枚数だけを見るパターンとして登録する"""
+        present = hands[0] | hands[1] | hands[2] | hands[3]
+        shifts = []
+        patterns = []
+        for suit in range(4):
+            code, length, _ = codes[suit]
+            suit_rel = rel & SUIT_MASKS[suit]
+            if suit_rel:
+                # 効いたカードのうち最も低いものまでを持ち主ごと固定する
+                lowest = suit_rel & -suit_rel
+                depth = (present & SUIT_MASKS[suit] & ~(lowest - 1)).bit_count()
+            else:
+                depth = 0
+            shift = 2 * (length - depth)
+            shifts.append(shift)
+            patterns.append(code >> shift)
+        entries = bucket.setdefault(tuple(shifts), {})
+        patterns = tuple(patterns)
+        entry = entries.get(patterns)
+        if entry is None:
+            entries[patterns] = [lo, hi, best]
+            self.tt_entries += 1
+        else:
+            entry[0] = max(entry[0], lo)
+            entry[1] = min(entry[1], hi)
+            if best >= 0:
+                entry[2] = best
+
+    @staticmethod
+    def _encode_lead(hands: List[int], idx: int) -> int:
+        """リードをスートと「そのスートの残りカード中で上から何枚目か」で表す（相対ランクの TT と対応）"""
+        present = hands[0] | hands[1] | hands[2] | hands[3]
+        above = present & _SUIT_MASK_OF[idx] & ~((2 << idx) - 1)
+        return _SUIT_OF[idx] * 16 + above.bit_count()
+
+    @staticmethod
+    def _decode_lead(hands: List[int], code: int) -> int:
+        suit_present = (hands[0] | hands[1] | hands[2] | hands[3]) & SUIT_MASKS[code >> 4]
+        for _ in range(code & 15):
+            suit_present ^= 1 << (suit_present.bit_length() - 1)
+        return suit_present.bit_length() - 1
+
+    # --- 上下限 ---
+
+    def _bounds(self, hands: List[int], leader: int, remaining: int) -> Tuple[int, int, int, int]:
+        """NS が残りから取るトリック数の簡易な上下限と、それぞれの根拠になったカード"""
+        lo, hi, lo_rel, hi_rel = 0, remaining, 0, 0
+        quick, quick_rel = self._quick_tricks(hands, leader)
+        if leader & 1 == 0:
+            lo, lo_rel = quick, quick_rel
+        else:
+            hi, hi_rel = remaining - quick, quick_rel
+        if self.trump is not None:
+            # 切り札のトップの連続を持つ側は、それを1つのハンドが持つ枚数分は必ず取れる
+            trumps = [h & self.trump_mask for h in hands]
+            present = trumps[0] | trumps[1] | trumps[2] | trumps[3]
+            if present:
+                side = 0 if (trumps[0] | trumps[2]) >> (present.bit_length() - 1) & 1 else 1
+                own = [0, 0]
+                sure_rel = 0
+                while present:
+                    bit = 1 << (present.bit_length() - 1)
+                    if bit & trumps[side]:
+                        own[0] += 1
+                    elif bit & trumps[side + 2]:
+                        own[1] += 1
+                    else:
+                        break
+                    sure_rel |= bit
+                    present ^= bit
+                sure = max(own)
+                if side == 0 and sure > lo:
+                    lo, lo_rel = sure, sure_rel
+                elif side == 1 and remaining - sure < hi:
+                    hi, hi_rel = remaining - sure, sure_rel
+        return lo, hi, lo_rel, hi_rel
+
+    def _quick_tricks(self, hands: List[int], leader: int) -> Tuple[int, int]:
+        """リーダーが自分のハンドから続けて取れるトリック数の下限と、その根拠になったカード"""
+        hand = hands[leader]
+        partner = hands[(leader + 2) & 3]
+        lho = hands[(leader + 1) & 3]
+        rho = hands[(leader + 3) & 3]
+        present = hand | partner | lho | rho
+        trump = self.trump
+        opp_has_trumps = trump is not None and bool((lho | rho) & self.trump_mask)
+        quick = 0
+        side_quick = 0
+        rel = 0
+        for suit in range(4):
+            suit_mask = SUIT_MASKS[suit]
+            own = hand & suit_mask
+            if not own:
+                continue
+            suit_present = present & suit_mask
+            top = 0
+            top_rel = 0
+            while suit_present:
+                bit = 1 << (suit_present.bit_length() - 1)
+                if not own & bit:
+                    break
+                top += 1
+                top_rel |= bit
+                suit_present ^= bit
+            if not top:
+                continue
+            lho_len = (lho & suit_mask).bit_count()
+            rho_len = (rho & suit_mask).bit_count()
+            if trump is None or suit == trump or not opp_has_trumps:
+                # 相手が出し切った後のロングカードも、パートナーが追い越さなければ取れる
+                partner_suit = partner & suit_mask
+                partner_below = not partner_suit or partner_suit < (own & -own)
+                if top >= max(lho_len, rho_len) and partner_below:
+                    count = own.bit_count()
+                    top_rel = present & suit_mask
+                else:
+                    count = top
+            else:
+                # 切り札を持つ相手がフォローできる回数までしか取れない
+                limits = [length for length, opp in ((lho_len, lho), (rho_len, rho)) if opp & self.trump_mask]
+                count = min([top] + limits)
+            rel |= top_rel
+            if suit == trump:
+                quick += count
+            else:
+                side_quick += count
+        if trump is not None and partner & self.trump_mask:
+            # パートナーがサイドスートのカードを使い切ると強制的にラフしてリードを奪ってしまう
+            side_quick = min(side_quick, (partner & ~self.trump_mask).bit_count())
+        quick += side_quick
+        return min(quick, hand.bit_count()), rel
+
+    # --- 手の生成と並べ替え ---
+
+    def _moves(self, hands: List[int], seat: int, trick: Sequence[Tuple[int, int]]) -> List[int]:
+        if not trick:
+            return self._lead_moves(hands, seat)[0]
+        trick_mask = 0
+        for _, idx in trick:
+            trick_mask |= 1 << idx
+        win_seat, win_idx = self._trick_winner(trick)
+        return self._follow_moves(hands, seat, len(trick), trick_mask, _SUIT_MASK_OF[trick[0][1]],
+                                  win_seat, win_idx)[0]
+
+    @staticmethod
+    def _representatives(hand: int, legal: int, present: int) -> Tuple[List[int], int]:
+        """同等カードのうち最上位のものだけと、省いたカードのマスクを返す（間のカードが全員の手にもトリックにも無ければ同等）
+
+        省いたカードが同等なのは今の局面だけなので、全部の手を試した結果（省いた手も同じ結果になる）を TT に
+        入れるときは、そのカードまで持ち主を固定しないといけない（呼び出し側で rel に足す）。
+        """
+        reps = []
+        runs = 0
+        m = legal
+        while m:
+            i = m.bit_length() - 1
+            reps.append(i)
+            bit = 1 << i
+            m ^= bit
+            suit_mask = _SUIT_MASK_OF[i]
+            while True:
+                lower = present & (bit - 1) & suit_mask
+                if not lower:
+                    break
+                bit = 1 << (lower.bit_length() - 1)
+                if not hand & bit:
+                    break
+                m &= ~bit
+                runs |= bit
+        return reps, runs
+
+    def _lowest_equivalent(self, hands: List[int], seat: int, trick: Sequence[Tuple[int, int]], idx: int) -> int:
+        """idx と同じシーケンスに属する最も低いカードを返す"""
+        trick_mask = 0
+        for _, t in trick:
+            trick_mask |= 1 << t
+        hand = hands[seat]
+        present = hands[0] | hands[1] | hands[2] | hands[3] | trick_mask
+        bit = 1 << idx
+        while True:
+            lower = present & (bit - 1) & _SUIT_MASK_OF[idx]
+            if not lower:
+                break
+            nxt = 1 << (lower.bit_length() - 1)
+            if not hand & nxt:
+                break
+            bit = nxt
+        return bit.bit_length() - 1
+
+    def _lead_moves(self, hands: List[int], seat: int) -> Tuple[List[int], int]:
+        """リードの候補を有望な順に並べる（と、同等として省いたカードのマスク）"""
+        hand = hands[seat]
+        partner = hands[(seat + 2) & 3]
+        lho = hands[(seat + 1) & 3]
+        rho = hands[(seat + 3) & 3]
+        present = hand | partner | lho | rho
+        reps, runs = self._representatives(hand, hand, present)
+        if len(reps) == 1:
+            return reps, runs
+        trump_mask = self.trump_mask
+        opp_trumps = (lho | rho) & trump_mask
+        scored = []
+        for idx in reps:
+            suit_mask = _SUIT_MASK_OF[idx]
+            suit_present = present & suit_mask
+            top_bit = 1 << (suit_present.bit_length() - 1)
+            ruffable = opp_trumps and not suit_mask & trump_mask and (
+                (not lho & suit_mask and lho & trump_mask) or (not rho & suit_mask and rho & trump_mask))
+            if hand & top_bit:
+                # 自分がトップ: キャッシュ（相手がラフできるなら後回し）
+                score = 60 if idx == top_bit.bit_length() - 1 and not ruffable else 15
+            elif partner & top_bit:
+                # パートナーがトップ: パートナーへ低くリード
+                score = 50 - idx % 13 if not ruffable else 10
+            elif trump_mask and not partner & suit_mask and partner & trump_mask and not suit_mask & trump_mask:
+                # パートナーにラフさせる
+                score = 45 - idx % 13
+            else:
+                # それ以外はシーケンスのトップか低いカード
+                second = (suit_present ^ top_bit).bit_length() - 1
+                score = 20 if idx >= second else 5 - idx % 13 / 13
+                if ruffable:
+                    score -= 10
+            scored.append((score, idx))
+        scored.sort(reverse=True)
+        return [idx for _, idx in scored], runs
+
+    def _follow_moves(self, hands: List[int], seat: int, n: int, trick_mask: int, led_mask: int,
+                      win_seat: int, win_idx: int) -> Tuple[List[int], int]:
+        """トリックの2〜4枚目の候補を有望な順に並べる（と、同等として省いたカードのマスク）"""
+        hand = hands[seat]
+        legal = hand & led_mask or hand
+        present = hands[0] | hands[1] | hands[2] | hands[3] | trick_mask
+        reps, runs = self._representatives(hand, legal, present)
+        if len(reps) == 1:
+            return reps, runs
+        trump = self.trump
+        trump_mask = self.trump_mask
+        win_suit = _SUIT_OF[win_idx]
+        partner_winning = (win_seat & 1) == (seat & 1)
+        if n == 3:
+            # 4番手: パートナーが勝っていれば最も低いカード、そうでなければ最も安い勝ち札から
+            if partner_winning:
+                reps.sort(key=lambda idx: ((idx > win_idx) if _SUIT_OF[idx] == win_suit else _SUIT_OF[idx] == trump,
+                                           _SUIT_OF[idx] == trump, idx % 13))
+            else:
+                reps.sort(key=lambda idx: (not ((idx > win_idx) if _SUIT_OF[idx] == win_suit
+                                                else _SUIT_OF[idx] == trump),
+                                           _SUIT_OF[idx] == trump, idx % 13))
+            return reps, runs
+        # このトリックでまだ後に出す相手とパートナー
+        later_opps = [hands[(seat + k) & 3] for k in range(1, 4 - n) if k & 1]
+        later_partner = n == 1
+
+        def beaten_later(card: int) -> bool:
+            """後に出す相手が card を上回れるか"""
+            above = ~((2 << card) - 1)
+            for opp in later_opps:
+                if opp & led_mask:
+                    if _SUIT_MASK_OF[card] == led_mask and opp & led_mask & above:
+                        return True
+                elif opp & trump_mask:
+                    if _SUIT_OF[card] != trump or opp & trump_mask & above:
+                        return True
+            return False
+
+        partner_safe = partner_winning and not beaten_later(win_idx)
+        scored = []
+        for idx in reps:
+            suit = _SUIT_OF[idx]
+            beats = (idx > win_idx) if suit == win_suit else suit == trump
+            rank = idx % 13
+            if partner_winning:
+                if not beats:
+                    score = 20 - rank if partner_safe else 10 - rank
+                elif not partner_safe and not beaten_later(idx):
+                    # パートナーが負けそうなら確実に勝てるカードで追い越す
+                    score = 30 - rank
+                else:
+                    score = -20 - rank
+            elif beats:
+                # 確実に勝てる一番安いカードを優先
+                score = 40 - rank if not beaten_later(idx) else -rank
+            else:
+                # 負けるカードは低い順（2番手はパートナーに任せる）
+                score = 25 - rank if later_partner else 15 - rank
+                if suit == trump:
+                    score -= 10
+            scored.append((score, idx))
+        scored.sort(reverse=True)
+        return [idx for _, idx in scored], runs
+
+
+def _rank_winner(trick_mask: int, win_idx: int) -> int:
+    """勝ったカードが同じスートの他のカードにランクで勝った場合だけ、そのカードを「効いたカード」とする"""
+    if (trick_mask & _SUIT_MASK_OF[win_idx]).bit_count() > 1:
+        return 1 << win_idx
+    return 0
+
+
+# (スートの残りカード13ビット << 4 | 落とす枚数) -> 上位カードのマスク
+_TOP_CARDS: Dict[int, int] = {}
+
+
+def _top_cards(hands: List[int], shifts: Sequence[int]) -> int:
+    """各スートで下から shift/2 枚を除いた残りカードのマスク（TT エントリが固定しているカード）"""
+    present = hands[0] | hands[1] | hands[2] | hands[3]
+    rel = 0
+    for suit in range(4):
+        drop = shifts[suit] >> 1
+        if not drop:
+            rel |= present & SUIT_MASKS[suit]
+            continue
+        key = (present >> (13 * suit) & 0x1FFF) << 4 | drop
+        top = _TOP_CARDS.get(key)
+        if top is None:
+            top = key >> 4
+            for _ in range(drop):
+                top &= top - 1
+            _TOP_CARDS[key] = top
+        rel |= top << (13 * suit)
+    return rel
+
+
+# --- 検証用 CLI ---
+
+def brute_force(hands: Sequence[int], leader: int, trick: Sequence[Tuple[int, int]], trump: Optional[int]) -> int:
+    """枝刈りも抽象化もしない総当たりで、NS が取る残りトリック数（進行中のトリックを含む）
+
+    メモはトリック開始時の局面（4ハンドとリーダー）そのものをキーにするので、結果は変わらない。
+    """
+    trump_mask = SUIT_MASKS[trump] if trump is not None else 0
+    memo: Dict[tuple, int] = {}
+
+    def winner(cards: Sequence[Tuple[int, int]]) -> int:
+        win_seat, win_idx = cards[0]
+        for seat, idx in cards[1:]:
+            if (_SUIT_OF[idx] == _SUIT_OF[win_idx] and idx > win_idx) or (
+                    _SUIT_OF[idx] != _SUIT_OF[win_idx] and 1 << idx & trump_mask):
+                win_seat, win_idx = seat, idx
+        return win_seat
+
+    def search(hands: List[int], leader: int, cards: Tuple[Tuple[int, int], ...]) -> int:
+        if len(cards) == 4:
+            won = winner(cards)
+            return (won & 1 == 0) + search(hands, won, ())
+        if not cards:
+            key = (leader,) + tuple(hands)
+            if key not in memo:
+                memo[key] = play(hands, leader, cards)
+            return memo[key]
+        return play(hands, leader, cards)
+
+    def play(hands: List[int], leader: int, cards: Tuple[Tuple[int, int], ...]) -> int:
+        seat = (leader + len(cards)) & 3
+        hand = hands[seat]
+        if not hand:
+            return 0
+        legal = hand & _SUIT_MASK_OF[cards[0][1]] if cards else 0
+        legal = legal or hand
+        values = []
+        while legal:
+            idx = legal.bit_length() - 1
+            legal ^= 1 << idx
+            hands[seat] = hand ^ (1 << idx)
+            values.append(search(hands, leader, cards + ((seat, idx),)))
+            hands[seat] = hand
+        return max(values) if seat & 1 == 0 else min(values)
+
+    return search(list(hands), leader, tuple(trick))
+
+
+def _random_position(rng: random.Random, size: int) -> List[int]:
+    """各ハンド size 枚のランダムな局面"""
+    cards = rng.sample(range(52), 4 * size)
+    hands = [0, 0, 0, 0]
+    for i, idx in enumerate(cards):
+        hands[i % 4] |= 1 << idx
+    return hands
+
+
+# 見つかった食い違いの局面（ハンド, リーダー, 進行中のトリック, 切り札, 続けて出すカード）。ランダムな局面の前に確かめる
+# ♥が切り札で、先に解いた局面の TT（E: ♣J ♥J ♥A の ♥A だけを固定したエントリ）が、♥A を出した後の
+# E: ♣J ♥7 ♥J の局面に当たっていた（♥J と ♥A は間のカードが無いので同等だが、♥7 と ♥J はそうではない）
+REGRESSIONS = [
+    ([1 << 11 | 1 << 12 | 1 << 25 | 1 << 26,   # South: ♣K ♣A ♦A ♥2
+      1 << 0 | 1 << 2 | 1 << 34 | 1 << 45,    # West: ♣2 ♣4 ♥10 ♠8
+      1 << 4 | 1 << 32 | 1 << 43,             # North: ♣6 ♥8 ♠6
+      1 << 9 | 1 << 31 | 1 << 35 | 1 << 38],  # East: ♣J ♥7 ♥J ♥A
+     2, [(2, 17)], 2, [38]),
+]
+
+
+def _check_line(solver: 'DoubleDummySolver', rng: random.Random, hands: List[int], leader: int,
+                trick: List[Tuple[int, int]], label: str, plays: Sequence[int] = ()) -> int:
+    """局面から1枚ずつ（plays の後はランダムに）進め、各局面の値と各カードの値を共有のソルバーで求めて総当たりと比べる"""
+    mismatches = 0
+    plays = list(plays)
+    trump = solver.trump
+    while hands[leader].bit_count() + (1 if trick else 0):
+        seat = (leader + len(trick)) & 3
+        total = hands[leader].bit_count() + (1 if trick else 0)
+        got = solver.solve(hands, leader, trick)
+        expected = brute_force(hands, leader, trick, trump)
+        values = solver.card_values(hands, leader, trick)
+        for idx, value in values.items():
+            hands[seat] ^= 1 << idx
+            ns = brute_force(hands, leader, trick + [(seat, idx)], trump)
+            hands[seat] ^= 1 << idx
+            side = ns if seat & 1 == 0 else total - ns
+            if value != side:
+                got = f"{got} (card {idx}: {value}, brute force {side})"
+        if got != expected:
+            mismatches += 1
+            print(f"{label}: hands {[hex(h) for h in hands]} leader {SEATS[leader]} trick {trick} "
+                  f"trump {trump}: solver {got}, brute force {expected}")
+        idx = plays.pop(0) if plays else rng.choice(sorted(values))
+        hands[seat] ^= 1 << idx
+        trick = trick + [(seat, idx)]
+        if len(trick) == 4:
+            leader = solver._trick_winner(trick)[0]
+            trick = []
+    return mismatches
+
+
+def check(boards: int, seed: int, size: int = 5, shared: bool = False) -> int:
+    """ランダムな局面から1枚ずつ進めた各局面を、共有のソルバー（TT を使い回す）と総当たりで解いて食い違いの数を返す
+
+    shared なら同じストレインのソルバーを全ボードで使い回す（シングルダミーのサンプルや DD 表と同じく、
+    別のディールの局面も同じ TT に入る）。そうでなければボードごとに作る。
+    """
+    rng = random.Random(seed)
+    solvers: Dict[Optional[int], DoubleDummySolver] = {}
+    mismatches = 0
+    for n, (hands, leader, trick, trump, plays) in enumerate(REGRESSIONS):
+        mismatches += _check_line(DoubleDummySolver(trump), rng, list(hands), leader, list(trick),
+                                  f"regression {n}", plays)
+    for board in range(boards):
+        trump = rng.choice([None, 0, 1, 2, 3])
+        solver = solvers.setdefault(trump, DoubleDummySolver(trump)) if shared else DoubleDummySolver(trump)
+        mismatches += _check_line(solver, rng, _random_position(rng, size), rng.randrange(4), [], f"board {board}")
+    return mismatches
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Cross-check the double dummy solver against brute force')
+    parser.add_argument('--check', type=int, default=200, metavar='BOARDS', help='random positions to play out')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--size', type=int, default=5, help='cards per hand (brute force grows quickly)')
+    parser.add_argument('--shared', action='store_true', help='reuse one solver per strain across all boards')
+    args = parser.parse_args(argv)
+    started = time.perf_counter()
+    mismatches = check(args.check, args.seed, args.size, args.shared)
+    print(f"{args.check} boards checked in {time.perf_counter() - started:.1f}s: {mismatches} mismatches")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())